@@ -51,7 +51,11 @@ if [ "$WATCH" == "1" ]; then
         echo $PID > "$PID_FILE"
 
         echo ">> �berwache $SCRIPT und $REQUIREMENTS auf �nderungen..."
-        inotifywait -r -e modify,close_write,move,create,delete "$SCRIPT" "$REQUIREMENTS" &
+        # Konfigurationsdateien (*.json/*.yaml) werden vom Dienst selbst neu geladen,
+        # nur Code-Änderungen erfordern einen Neustart
+        inotifywait -r -e modify,close_write,move,create,delete \
+            --exclude '(/\.venv/|__pycache__|/user/|\.json$|\.ya?ml$)' \
+            "$PROJECT_DIR" "$REQUIREMENTS" &
         WID=$!
 
         # Warte darauf, dass einer der beiden Prozesse fertig wird
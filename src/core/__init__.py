@@ -0,0 +1,7 @@
+from .context import AppContext
+from .reload import ConfigWatcher
+from .scheduler import CycleScheduler
+from .loop_monitor import LoopLagMonitor
+from .offload import run_blocking
+from .timeseries import TimeSeriesBuffer, TimeSeriesStore
+from .energy import EnergyIntegrator
@@ -0,0 +1,188 @@
+## @file archive.py
+#  @brief Optional local Parquet archive of the raw samples.
+#
+#  The archive listens on the TimeSeriesStore and keeps the samples of the
+#  current hour in memory, per source (inverter, wallbox, ETA). Completed
+#  hours are written once as a zstd-compressed Parquet file, partitioned
+#  by UTC day:
+#
+#      user/archive/<source>/date=YYYY-MM-DD/HH_<first timestamp>.parquet
+#
+#  This replaces many small writes by one sequential write per source and
+#  hour, which is easy on SD cards. load() memory-maps the files of a time
+#  range and returns NumPy columns for offline analysis and backtesting.
+#  pyarrow is only needed when the archive is enabled ('--archive').
+
+import asyncio
+import math
+import os
+import threading
+import time
+from pathlib import Path
+import numpy as np
+
+## @name Defaults
+## @{
+ARCHIVE_DIR = "user/archive"
+COMPRESSION = "zstd"
+## @}
+
+
+def _partition(root: Path, source: str, hour: int) -> Path:
+    """@brief Day directory of a source for an hour index (unix time // 3600)."""
+    day = time.strftime("%Y-%m-%d", time.gmtime(hour * 3600))
+    return root / source.replace("/", "_") / f"date={day}"
+
+
+class SampleArchive:
+    """@brief Buffers samples per source and hour and writes completed hours to Parquet.
+
+    @param root  Archive directory.
+    """
+
+    def __init__(self, root: str | Path = ARCHIVE_DIR):
+        self.root = Path(root)
+        ## @brief Source -> (hour index, list of (timestamp, values)).
+        self._pending: dict[str, tuple[int, list]] = {}
+        ## @brief Completed (source, hour, rows) waiting to be written.
+        self._completed: list[tuple[str, int, list]] = []
+        self._lock = threading.Lock()
+        ## @brief Number of files written.
+        self.files = 0
+
+    def add(self, source: str, timestamp: float, values: dict) -> None:
+        """@brief Buffer one sample (TimeSeriesStore listener, O(1)).
+
+        @param source     Source name.
+        @param timestamp  Sample time (unix seconds).
+        @param values     dict of field name to number.
+        """
+        hour = int(timestamp // 3600)
+        with self._lock:
+            pending = self._pending.get(source)
+            if pending is None or pending[0] != hour:
+                if pending is not None and pending[1]:
+                    self._completed.append((source, pending[0], pending[1]))
+                pending = self._pending[source] = (hour, [])
+            pending[1].append((timestamp, values))
+
+    def flush(self, final: bool = False) -> list[Path]:
+        """@brief Write all completed hours (blocking, run it in a worker thread).
+
+        An hour is only removed from the buffer after its file was
+        written; an hour that fails is logged and kept for the next flush.
+
+        @param final  Also write the current, incomplete hours (e.g. on shutdown).
+        @return Paths of the written files.
+        """
+        with self._lock:
+            if final:
+                self._completed += [(source, hour, rows) for source, (hour, rows) in self._pending.items() if rows]
+                self._pending.clear()
+            completed = list(self._completed)
+        paths = []
+        for item in completed:
+            source, hour, rows = item
+            try:
+                paths.append(self._write(source, hour, rows))
+            except Exception as e:
+                print(f"archive write of {source} hour {hour} failed: {e}")
+                continue
+            with self._lock:
+                self._completed = [other for other in self._completed if other is not item]
+        return paths
+
+    async def flush_async(self, final: bool = False) -> None:
+        """@brief Scheduler job: write the completed hours in a worker thread.
+        @param final  Also write the current hours (on shutdown).
+        """
+        paths = await asyncio.to_thread(self.flush, final)
+        for path in paths:
+            print(f"archive written: {path}")
+
+    def _write(self, source: str, hour: int, rows: list) -> Path:
+        """@brief Write the rows of one source and hour as a Parquet file.
+
+        Fields missing in a sample are stored as NaN.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        names = {}
+        for _, values in rows:
+            names.update(dict.fromkeys(values))
+        columns = {"time": np.fromiter((ts for ts, _ in rows), np.float64, len(rows))}
+        for name in names:
+            columns[name] = np.fromiter(
+                (_number(values.get(name)) for _, values in rows), np.float64, len(rows))
+        directory = _partition(self.root, source, hour)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{hour % 24:02d}_{int(rows[0][0])}.parquet"
+        tmp = path.with_suffix(".tmp")
+        pq.write_table(pa.table(columns), tmp, compression=COMPRESSION)
+        os.replace(tmp, path)
+        self.files += 1
+        return path
+
+
+def _number(value) -> float:
+    """@brief Sample value as float (None and non-numbers become NaN)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return math.nan
+
+
+def files(source: str, start: float, end: float, root: str | Path = ARCHIVE_DIR) -> list[Path]:
+    """@brief Archive files of a source that can contain samples in [start, end).
+
+    @return Paths sorted by time.
+    """
+    root = Path(root)
+    paths = []
+    for day in range(int(start // 86400), int(end // 86400) + 1):
+        directory = _partition(root, source, day * 24)
+        if not directory.is_dir():
+            continue
+        for path in directory.glob("*.parquet"):
+            hour = day * 24 + int(path.name[:2])
+            if hour * 3600 < end and (hour + 1) * 3600 > start:
+                paths.append(path)
+    return sorted(paths, key=lambda p: int(p.stem.split("_")[1]))
+
+
+def load(source: str, start: float, end: float, fields: list[str] | None = None,
+         root: str | Path = ARCHIVE_DIR) -> dict[str, np.ndarray]:
+    """@brief Load archived samples of a time range into NumPy arrays.
+
+    Files are memory-mapped and only the requested columns are read.
+    Fields that are missing in some hours are NaN there.
+
+    @param source  Source name, e.g. 'inverter'.
+    @param start   Range start (unix seconds, inclusive).
+    @param end     Range end (unix seconds, exclusive).
+    @param fields  Field names to load (default: all).
+    @param root    Archive directory.
+    @return dict with 'time' and one float64 array per field, sorted by time.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    columns = None if fields is None else ["time", *fields]
+    tables = []
+    for path in files(source, start, end, root):
+        parquet = pq.ParquetFile(path, memory_map=True)
+        names = parquet.schema_arrow.names
+        tables.append(parquet.read(columns=None if columns is None else [n for n in columns if n in names]))
+    if not tables:
+        return {name: np.empty(0) for name in (columns or ["time"])}
+    table = pa.concat_tables(tables, promote_options="default")
+    ts = table.column("time").to_numpy()
+    mask = (ts >= start) & (ts < end)
+    result = {"time": ts[mask]}
+    for name in (fields if fields is not None else table.column_names):
+        if name == "time":
+            continue
+        if name in table.column_names:
+            values = table.column(name).to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+            result[name] = values[mask]
+        else:
+            result[name] = np.full(int(mask.sum()), np.nan)
+    return result
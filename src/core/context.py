@@ -0,0 +1,183 @@
+## @file context.py
+#  @brief Application context with lazy, concurrent resource creation.
+#
+#  Holds the long-lived resources of the service: MQTT and Modbus clients,
+#  wallbox manager, ETA telemetry, InfluxDB buckets, sample history,
+#  latest values, energy counters and device registry. Nothing is created
+#  at import time; every resource is built on first use, and start()
+#  builds them concurrently in worker threads. Build times and the time
+#  until the first sample are collected in a startup report. Background
+#  tasks (config watcher, device discovery) are started with spawn() and
+#  cancelled together by stop().
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable
+
+## perf_counter() at import of this module, fallback for the process age
+_IMPORT_TIME = time.perf_counter()
+
+
+def process_age() -> float:
+    """@brief Seconds since the Python process was started.
+
+    Read from /proc so interpreter start-up and imports are included;
+    falls back to the time since this module was imported.
+
+    @return Process age in seconds.
+    """
+    try:
+        with open("/proc/self/stat", "r") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter() - _IMPORT_TIME
+
+
+class AppContext:
+    """@brief Lazily built, shared resources of the application.
+
+    @param broker_config   Path to the MQTT broker JSON configuration.
+    @param wallbox_config  Path to the wallbox JSON configuration.
+    @param eta_config      Path to the ETA JSON configuration.
+    @param discovery_config Path to the device discovery JSON configuration.
+    """
+
+    def __init__(self, broker_config: str = "mqtt_client/broker_config.json",
+                 wallbox_config: str = "goE/wallbox_config.json",
+                 eta_config: str = "eta/eta_config.json",
+                 discovery_config: str = "discovery/discovery_config.json"):
+        self.broker_config = broker_config
+        self.wallbox_config = wallbox_config
+        self.eta_config = eta_config
+        self.discovery_config = discovery_config
+        self._resources: dict[str, Any] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        ## @brief Build time in seconds per resource name.
+        self.timings: dict[str, float] = {}
+        ## @brief Process age when the first sample was taken (None until then).
+        self.first_sample: float | None = None
+        ## @brief Long-running background tasks by name, cancelled by stop().
+        self.tasks: dict[str, asyncio.Task] = {}
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        """@brief Return a resource, building it once under a per-name lock.
+
+        @param name     Resource name used in the startup report.
+        @param factory  Callable creating the resource.
+        @return The resource instance.
+        """
+        if name in self._resources:
+            return self._resources[name]
+        with self._locks.setdefault(name, threading.Lock()):
+            if name not in self._resources:
+                t0 = time.perf_counter()
+                self._resources[name] = factory()
+                self.timings[name] = time.perf_counter() - t0
+        return self._resources[name]
+
+    @property
+    def history(self):
+        """@brief TimeSeriesStore with the recent inverter, wallbox and ETA samples."""
+        from core.timeseries import TimeSeriesStore
+        return self._get("history", TimeSeriesStore)
+
+    @property
+    def state(self):
+        """@brief LatestValues with the newest inverter registers and computed values."""
+        from core.state import LatestValues
+        return self._get("state", LatestValues)
+
+    @property
+    def energy(self):
+        """@brief EnergyIntegrator with the daily and lifetime Wh counters per flow."""
+        from core.energy import EnergyIntegrator
+        return self._get("energy", EnergyIntegrator)
+
+    @property
+    def mqtt(self):
+        """@brief Shared MQTTManager (not started)."""
+        from mqtt_client import MQTTManager
+        return self._get("mqtt", lambda: MQTTManager(self.broker_config))
+
+    @property
+    def inverter(self):
+        """@brief Inverter Modbus client with parsed register maps."""
+        from inverter import readInverter
+        return self._get("inverter", readInverter.get_inverter)
+
+    @property
+    def wallboxes(self):
+        """@brief WallboxManager subscribed on the shared MQTT client."""
+        from goE.wallbox_manager import WallboxManager
+        return self._get("wallboxes", lambda: WallboxManager(self.wallbox_config, self.mqtt, self.history))
+
+    @property
+    def eta(self):
+        """@brief ETA telemetry poller."""
+        from eta.telemetry import EtaTelemetry
+        return self._get("eta", lambda: EtaTelemetry(self.eta_config, self.history))
+
+    @property
+    def discovery(self):
+        """@brief DeviceRegistry resolving the service endpoints by role."""
+        from discovery import DeviceRegistry
+        return self._get("discovery", lambda: DeviceRegistry(self.discovery_config))
+
+    def influx(self, bucket: str):
+        """@brief influxConfig for a bucket (the client connects on first write).
+        @param bucket  InfluxDB bucket name.
+        """
+        from influx_bucket import influxConfig
+        return self._get(f"influx:{bucket}", lambda: influxConfig(bucket))
+
+    async def start(self, names: tuple[str, ...] = ("mqtt", "inverter", "wallboxes", "eta", "discovery")) -> None:
+        """@brief Build the given resources concurrently in worker threads.
+
+        @param names  Property names of the resources to build.
+        """
+        t0 = time.perf_counter()
+        await asyncio.gather(*(asyncio.to_thread(getattr, self, name) for name in names))
+        self.timings["start"] = time.perf_counter() - t0
+
+    def spawn(self, name: str, coro) -> asyncio.Task:
+        """@brief Run a background coroutine and keep its task until stop().
+
+        @param name  Task name (a running task of the same name is cancelled).
+        @param coro  Coroutine to run.
+        @return The asyncio Task.
+        """
+        old = self.tasks.get(name)
+        if old is not None:
+            old.cancel()
+        task = self.tasks[name] = asyncio.get_running_loop().create_task(coro, name=name)
+        return task
+
+    async def stop(self) -> None:
+        """@brief Cancel all background tasks and wait until they have finished."""
+        tasks, self.tasks = list(self.tasks.values()), {}
+        for task in tasks:
+            task.cancel()
+        for task, result in zip(tasks, await asyncio.gather(*tasks, return_exceptions=True)):
+            if isinstance(result, Exception):
+                print(f"task {task.get_name()} failed: {result}")
+
+    def mark_first_sample(self) -> None:
+        """@brief Record the process age at the first acquired sample (once)."""
+        if self.first_sample is None:
+            self.first_sample = process_age()
+            print(self.startup_report())
+
+    def startup_report(self) -> str:
+        """@brief Human readable summary of the start-up timings.
+        @return Report string.
+        """
+        parts = [f"{name} {seconds * 1000:.1f}ms" for name, seconds in self.timings.items()]
+        report = "startup: " + ", ".join(parts)
+        if self.first_sample is not None:
+            report += f" | first sample after {self.first_sample:.2f}s"
+        return report
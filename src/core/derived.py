@@ -0,0 +1,130 @@
+## @file derived.py
+#  @brief Declarative derived metrics computed from register values.
+#
+#  Derived values (total PV power, house consumption, grid import/export,
+#  self-consumption, autarky, ...) are declared in a JSON file as
+#  '"name": "expression"' over register names and other derived names:
+#
+#      "house_consumption": "ppv + pbattery1 - active_power"
+#
+#  Expressions are parsed once with the ast module, checked against a
+#  small whitelist (arithmetic, comparisons, conditional expressions,
+#  min/max/abs/round) and compiled. The metrics are sorted by their
+#  dependencies into an evaluation plan; evaluating a frame is one pass
+#  over that plan. A metric whose inputs are missing (failed register
+#  read, skipped dependency) or whose result is undefined (division by
+#  zero) is left out of the result instead of raising.
+
+import ast
+import json
+from pathlib import Path
+
+## Functions available in expressions
+FUNCTIONS = {"min": min, "max": max, "abs": abs, "round": round}
+
+## AST node types allowed in expressions
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.USub, ast.UAdd, ast.Not, ast.And, ast.Or,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+
+def compile_expression(name: str, expression: str):
+    """@brief Parse, check and compile one expression.
+
+    @param name        Metric name (used in error messages).
+    @param expression  Expression source.
+    @return Tuple (code object, set of referenced input names).
+    @exception ValueError if the expression is invalid or uses forbidden syntax.
+    """
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"derived metric '{name}': {e.msg}") from None
+    inputs = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"derived metric '{name}': {type(node).__name__} not allowed")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise ValueError(f"derived metric '{name}': only {', '.join(FUNCTIONS)} can be called")
+        elif isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError(f"derived metric '{name}': only numeric constants allowed")
+        elif isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+            inputs.add(node.id)
+    return compile(tree, f"<derived {name}>", "eval"), inputs
+
+
+class DerivedMetrics:
+    """@brief Compiled, dependency-ordered set of derived metrics.
+
+    @param config_path  Path to the JSON file mapping metric names to expressions.
+    """
+
+    def __init__(self, config_path: str | Path):
+        self.apply_config(self._load_config(config_path))
+
+    @staticmethod
+    def _load_config(path: str | Path) -> dict:
+        """@brief Load the metric definitions from a JSON file."""
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def apply_config(self, config: dict[str, str]) -> None:
+        """@brief Compile the definitions and build the evaluation plan.
+
+        The plan is only replaced if all expressions compile and there
+        is no dependency cycle.
+
+        @param config  dict of metric name to expression.
+        @exception ValueError on an invalid expression or a cycle.
+        """
+        compiled = {name: compile_expression(name, expr) for name, expr in config.items()}
+        plan, done, visiting = [], set(), set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"derived metric '{name}': circular dependency")
+            visiting.add(name)
+            code, inputs = compiled[name]
+            for dependency in inputs & compiled.keys():
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+            plan.append((name, code, frozenset(inputs)))
+
+        for name in compiled:
+            visit(name)
+        ## @brief (name, code, inputs) in evaluation order.
+        self.plan: list[tuple[str, object, frozenset]] = plan
+        ## @brief Names of all derived metrics, in config order.
+        self.names: list[str] = list(config)
+
+    def reload_config(self, path: str | Path) -> None:
+        """@brief Re-read the definitions file and rebuild the plan."""
+        self.apply_config(self._load_config(path))
+
+    def evaluate(self, values: dict[str, float]) -> dict[str, float]:
+        """@brief Compute all derived metrics of one frame.
+
+        @param values  dict of register name to value; None values count as missing.
+        @return dict of derived name to value, without the metrics that could not be computed.
+        """
+        scope = {name: value for name, value in values.items() if value is not None}
+        scope.update(FUNCTIONS)
+        namespace = {"__builtins__": {}}
+        result = {}
+        for name, code, inputs in self.plan:
+            if not inputs <= scope.keys():
+                continue
+            try:
+                value = eval(code, namespace, scope)
+            except (ArithmeticError, TypeError, ValueError):
+                continue
+            scope[name] = result[name] = value
+        return result
@@ -0,0 +1,190 @@
+## @file energy.py
+#  @brief Streaming energy integration of the 2s power samples.
+#
+#  Every power sample is integrated into Wh with the trapezoid rule as it
+#  arrives, per energy flow (PV, battery charge/discharge, grid
+#  import/export, house, wallbox). Intervals longer than max_gap (lost
+#  samples, restarts) are not integrated. Each flow keeps a daily counter,
+#  reset at local midnight, and a lifetime counter. The counters are
+#  checkpointed to user/energy.json so a restart continues the day, and
+#  written to InfluxDB, so daily balances do not need integral() queries.
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from influxdb_client import Point
+from core.metrics import ENERGY
+
+## @name Defaults
+## @{
+ENERGY_FILE = "user/energy.json"
+MAX_GAP = 10.0              ## Longest interval that is still integrated [s]
+CHECKPOINT_INTERVAL = 60    ## Period of checkpoints and InfluxDB points [s]
+## @}
+
+## @name Energy Flows
+## @{
+FLOWS = ("pv", "battery_charge", "battery_discharge", "grid_import", "grid_export", "house", "wallbox")
+## @}
+
+
+def inverter_flows(data: dict) -> dict[str, float]:
+    """@brief Split a fast-cycle inverter sample into non-negative power flows.
+
+    GoodWe signs: pbattery1 > 0 discharges the battery, active_power > 0
+    feeds into the grid.
+
+    Flows whose registers could not be read are None (skipped by
+    EnergyIntegrator.add()).
+
+    @param data  dict from readInverter.acquire_fast().
+    @return dict of flow name to power [W] or None.
+    """
+    battery = _register(data, "pbattery1")
+    grid = _register(data, "active_power")
+    return {
+        "pv": data.get("ppv"),
+        "battery_charge": None if battery is None else max(-battery, 0),
+        "battery_discharge": None if battery is None else max(battery, 0),
+        "grid_import": None if grid is None else max(-grid, 0),
+        "grid_export": None if grid is None else max(grid, 0),
+        "house": data.get("house_consumption"),
+    }
+
+
+def _register(data: dict, name: str) -> float | None:
+    """@brief Value of a register dict in a sample, None if missing or not read."""
+    entry = data.get(name)
+    return entry.get("value") if isinstance(entry, dict) else None
+
+
+def _day(timestamp: float) -> str:
+    """@brief Local calendar day of a timestamp as 'YYYY-MM-DD'."""
+    return time.strftime("%Y-%m-%d", time.localtime(timestamp))
+
+
+def _next_midnight(timestamp: float) -> float:
+    """@brief Unix time of the local midnight following a timestamp."""
+    t = time.localtime(timestamp)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+
+
+class EnergyIntegrator:
+    """@brief Trapezoid integrator with daily and lifetime Wh counters per flow.
+
+    @param state_path  Checkpoint file (JSON).
+    @param max_gap     Longest sample interval that is integrated [s].
+    """
+
+    def __init__(self, state_path: str | Path = ENERGY_FILE, max_gap: float = MAX_GAP):
+        self.state_path = Path(state_path)
+        self.max_gap = max_gap
+        ## @brief Calendar day the daily counters belong to ('' until the first sample).
+        self.day = ""
+        ## @brief Flow -> Wh since local midnight.
+        self.today: dict[str, float] = {}
+        ## @brief Flow -> Wh since counting started (never reset).
+        self.total: dict[str, float] = {}
+        ## @brief Daily counters of the previous day, kept after the midnight reset.
+        self.yesterday: dict[str, float] = {}
+        ## @brief Number of intervals skipped because they were longer than max_gap.
+        self.gaps = 0
+        self._last: dict[str, tuple[float, float]] = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """@brief Restore the counters from the checkpoint (missing or invalid file: start at zero)."""
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.day = state.get("day", "")
+        self.today = state.get("today", {})
+        self.total = state.get("total", {})
+        self.yesterday = state.get("yesterday", {})
+
+    def save(self) -> None:
+        """@brief Write the counters to the checkpoint file atomically."""
+        with self._lock:
+            state = {"day": self.day, "today": dict(self.today),
+                     "total": dict(self.total), "yesterday": dict(self.yesterday)}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def _reset_day(self, day: str) -> None:
+        """@brief Start a new day; the finished daily counters move to 'yesterday'."""
+        if self.day:
+            print(f"energy {self.day}: " + ", ".join(f"{k} {v / 1000:.2f}kWh" for k, v in self.today.items()))
+            self.yesterday = self.today
+        self.today = {}
+        self.day = day
+
+    def _add(self, flow: str, wh: float, daily: dict[str, float]) -> None:
+        """@brief Add energy to a daily counter, the lifetime counter and the metric."""
+        daily[flow] = daily.get(flow, 0.0) + wh
+        self.total[flow] = self.total.get(flow, 0.0) + wh
+        counter = self._counters.get(flow)
+        if counter is None:
+            counter = self._counters[flow] = ENERGY.labels(flow)
+        counter.inc(wh)
+
+    def add(self, timestamp: float, powers: dict[str, float]) -> None:
+        """@brief Integrate one sample of one or more flows.
+
+        Each flow is integrated against its own previous sample, so flows
+        from different sources (inverter, wallbox) can arrive separately.
+        An interval across local midnight is split at midnight.
+
+        @param timestamp  Sample time (unix seconds).
+        @param powers     dict of flow name to power [W]; None values are skipped.
+        """
+        with self._lock:
+            day = _day(timestamp)
+            if day != self.day:
+                self._reset_day(day)
+            for flow, power in powers.items():
+                if power is None:
+                    continue
+                last = self._last.get(flow)
+                self._last[flow] = (timestamp, power)
+                if last is None:
+                    continue
+                t0, p0 = last
+                dt = timestamp - t0
+                if dt <= 0:
+                    continue
+                if dt > self.max_gap:
+                    self.gaps += 1
+                    continue
+                midnight = _next_midnight(t0)
+                if t0 < midnight <= timestamp:
+                    # The part before midnight belongs to the finished day
+                    p_mid = p0 + (power - p0) * (midnight - t0) / dt
+                    before = (p0 + p_mid) * 0.5 * (midnight - t0) / 3600.0
+                    self._add(flow, before, self.yesterday)
+                    t0, p0, dt = midnight, p_mid, timestamp - midnight
+                self._add(flow, (p0 + power) * 0.5 * dt / 3600.0, self.today)
+
+    def point(self, time_ns: int | None = None) -> Point:
+        """@brief InfluxDB point with '<flow>_day' and '<flow>_total' fields in Wh.
+
+        All FLOWS are written, flows without samples as 0.
+
+        @param time_ns  Point timestamp in ns (default: now).
+        @return The InfluxDB Point.
+        """
+        point = Point("energy_flows")
+        with self._lock:
+            for flow in FLOWS:
+                point.field(f"{flow}_day", round(self.today.get(flow, 0.0), 3))
+                point.field(f"{flow}_total", round(self.total.get(flow, 0.0), 3))
+        point.time(time_ns or time.time_ns())
+        return point
@@ -0,0 +1,121 @@
+## @file http_api.py
+#  @brief Embedded HTTP/JSON endpoint serving the latest values.
+#
+#  Dashboards and scripts can fetch the current inverter registers, the
+#  computed values and the MQTT state straight from the running process
+#  instead of querying InfluxDB. Responses carry an ETag (the version of
+#  the underlying store); a request with a matching If-None-Match and
+#  '?wait=<seconds>' is held open until the data changes (long-polling).
+#
+#  Routes:
+#   - GET /api/latest            all sections
+#   - GET /api/latest/<section>  'inverter', 'computed' or 'mqtt'
+#   - GET /metrics               OpenMetrics scrape endpoint (see metrics.py)
+
+import json
+import time
+from aiohttp import web
+from core.metrics import CONTENT_TYPE, REGISTRY
+from core.state import LatestValues
+
+## @name Server Defaults
+## @{
+HTTP_HOST = "0.0.0.0"
+HTTP_PORT = 8099
+MAX_WAIT = 60           ## Upper bound of the long-poll wait [s]
+POLL_STEP = 0.5         ## Re-check period while waiting for MQTT changes [s]
+## @}
+
+
+def _json_default(value):
+    """@brief JSON fallback for raw MQTT payloads and other objects."""
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode(errors="replace")
+    return str(value)
+
+
+class LatestValuesServer:
+    """@brief aiohttp server on top of LatestValues and the MQTT state store.
+
+    @param state  LatestValues with the inverter sections.
+    @param mqtt   MQTTManager whose received values are served (optional).
+    @param host   Listen address.
+    @param port   Listen port.
+    """
+
+    def __init__(self, state: LatestValues, mqtt=None, host: str = HTTP_HOST, port: int = HTTP_PORT):
+        self.state = state
+        self.mqtt = mqtt
+        self.host = host
+        self.port = port
+        self.app = web.Application()
+        self.app.router.add_get("/api/latest", self.handle)
+        self.app.router.add_get("/api/latest/{section}", self.handle)
+        self.app.router.add_get("/metrics", self.handle_metrics)
+        self._runner: web.AppRunner | None = None
+        ## @brief Encoded body per section, reused while the ETag is unchanged.
+        self._cache: dict[str, tuple[str, bytes]] = {}
+
+    def _etag(self, section: str | None) -> str:
+        """@brief ETag of a section, built from the store versions."""
+        mqtt_version = self.mqtt.version if self.mqtt is not None else 0
+        if section == "mqtt":
+            return f'"m{mqtt_version}"'
+        if section is not None:
+            return f'"s{self.state.version}"'
+        return f'"s{self.state.version}m{mqtt_version}"'
+
+    def _data(self, section: str | None) -> dict:
+        """@brief Current content of a section (or all sections)."""
+        if section == "mqtt":
+            return self.mqtt.snapshot()[1] if self.mqtt is not None else {}
+        if section is not None:
+            return self.state.sections.get(section, {})
+        data = dict(self.state.sections)
+        data["mqtt"] = self._data("mqtt")
+        data["updated"] = self.state.updated
+        return data
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """@brief Serve one section as JSON, honouring If-None-Match and '?wait='."""
+        section = request.match_info.get("section")
+        if section is not None and section not in ("inverter", "computed", "mqtt"):
+            raise web.HTTPNotFound(text=f"unknown section: {section}")
+        try:
+            wait = min(float(request.query.get("wait", 0)), MAX_WAIT)
+        except ValueError:
+            raise web.HTTPBadRequest(text="wait must be a number of seconds")
+
+        known = request.headers.get("If-None-Match")
+        etag = self._etag(section)
+        deadline = time.monotonic() + wait
+        while known == etag and (remaining := deadline - time.monotonic()) > 0:
+            await self.state.wait_changed(min(remaining, POLL_STEP))
+            etag = self._etag(section)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if known == etag:
+            return web.Response(status=304, headers=headers)
+
+        key = section or ""
+        cached = self._cache.get(key)
+        if cached is None or cached[0] != etag:
+            body = json.dumps(self._data(section), default=_json_default).encode()
+            self._cache[key] = cached = (etag, body)
+        return web.Response(body=cached[1], content_type="application/json", headers=headers)
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        """@brief Serve all registered metrics in OpenMetrics text format."""
+        return web.Response(text=REGISTRY.render(), headers={"Content-Type": CONTENT_TYPE})
+
+    async def start(self) -> None:
+        """@brief Start listening (requires a running loop)."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"HTTP API listening on {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        """@brief Close the listener and all connections."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
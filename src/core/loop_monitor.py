@@ -0,0 +1,89 @@
+## @file loop_monitor.py
+#  @brief Event-loop lag sampler.
+#
+#  Sleeps for a fixed interval and measures how much later than requested
+#  the loop wakes up. Any lag above the stall threshold is recorded
+#  together with the scheduler job whose step blocked the loop, i.e. the
+#  job with the longest step in that interval (several jobs can be
+#  running at the same time, but only one step executes at a time).
+
+import asyncio
+import time
+from collections import deque
+
+## @name Defaults
+## @{
+SAMPLE_INTERVAL = 0.1    ## Sampling period [s]
+STALL_THRESHOLD = 0.1    ## Lag counted as stall [s]
+## @}
+
+
+class LoopLagMonitor:
+    """@brief Measures asyncio callback lateness.
+
+    @param scheduler  Optional CycleScheduler whose blocking job is recorded.
+    @param interval   Sampling period in seconds.
+    @param threshold  Lag in seconds above which a stall is recorded.
+    """
+
+    def __init__(self, scheduler=None, interval: float = SAMPLE_INTERVAL,
+                 threshold: float = STALL_THRESHOLD):
+        self.scheduler = scheduler
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = 0
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self.lag_sum = 0.0
+        ## @brief Recent stalls as (unix time, lag [s], job id).
+        self.stalls: deque = deque(maxlen=50)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """@brief Start sampling (requires a running loop)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        """@brief Stop sampling."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        """@brief Sampling loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.scheduler:
+                self.scheduler.take_longest_step()
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.samples += 1
+            self.lag_last = lag
+            self.lag_max = max(self.lag_max, lag)
+            self.lag_sum += lag
+            if lag > self.threshold:
+                job = self.scheduler.take_longest_step()[1] if self.scheduler else None
+                self.stalls.append((time.time(), lag, job))
+                print(f"event loop stalled {lag * 1000:.0f}ms (job: {job})")
+
+    def stats(self) -> dict:
+        """@brief Lag statistics.
+        @return dict with sample count, last/mean/max lag and stall count.
+        """
+        return {
+            "samples": self.samples,
+            "lag_last": self.lag_last,
+            "lag_mean": self.lag_sum / self.samples if self.samples else 0.0,
+            "lag_max": self.lag_max,
+            "stalls": len(self.stalls),
+        }
+
+    def report(self) -> str:
+        """@brief One-line summary for the log.
+        @return Report string.
+        """
+        s = self.stats()
+        return (f"loop lag avg/max={s['lag_mean'] * 1000:.1f}/{s['lag_max'] * 1000:.1f}ms "
+                f"stalls={s['stalls']}")
@@ -0,0 +1,247 @@
+## @file metrics.py
+#  @brief Cheap always-on counters, gauges and histograms in OpenMetrics format.
+#
+#  Every metric child preallocates its storage when it is created (one
+#  bucket list per histogram), so observing a sample only increments
+#  numbers. The registry renders all metrics in the OpenMetrics text
+#  format for the /metrics route of the local HTTP API.
+
+import abc
+import threading
+from bisect import bisect_left
+from typing import Callable
+
+## @name Bucket Presets
+## @{
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+## @}
+
+## Content-Type of the rendered exposition
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+class MetricsRegistry:
+    """@brief Collection of metrics rendered together."""
+
+    def __init__(self):
+        self.metrics: list = []
+
+    def register(self, metric) -> None:
+        """@brief Add a metric; names must be unique."""
+        if any(m.name == metric.name for m in self.metrics):
+            raise ValueError(f"Duplicate metric name: {metric.name}")
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        """@brief All metrics in OpenMetrics text format.
+        @return Exposition text terminated by '# EOF'.
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.extend(metric.samples())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+## Default registry used by all metrics below
+REGISTRY = MetricsRegistry()
+
+
+def _escape(value) -> str:
+    """@brief Escape backslash, double quote and newline for label values and help texts."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    """@brief Render a label set like {block="pv",le="0.1"}."""
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric(abc.ABC):
+    """@brief Common label handling of all metric types.
+
+    @param name        Metric name.
+    @param help        Help text.
+    @param labelnames  Names of the labels (children are created per value tuple).
+    @param registry    Registry to add the metric to.
+    """
+    type = "unknown"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), registry: MetricsRegistry = REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        registry.register(self)
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """@brief New child holding the values of one label value tuple."""
+
+    def labels(self, *values):
+        """@brief Child metric for one label value tuple (created once).
+
+        Call sites on hot paths should keep the returned child.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def __getattr__(self, attr):
+        # Unlabelled metrics forward inc/set/observe to their single child
+        children = self.__dict__.get("_children")
+        if children is not None and () in children:
+            return getattr(children[()], attr)
+        raise AttributeError(attr)
+
+    @abc.abstractmethod
+    def samples(self) -> list[str]:
+        """@brief Exposition lines of all children."""
+
+
+class _CounterChild:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self.lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """@brief Monotonic counter, exposed as <name>_total."""
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}_total{_format_labels(self.labelnames, key)} {child.value}"
+                for key, child in list(self._children.items())]
+
+
+class _GaugeChild:
+    __slots__ = ("value", "func", "lock")
+
+    def __init__(self, func: Callable[[], float] | None = None):
+        self.value = 0.0
+        self.func = func
+        self.lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self.lock:
+            self.value -= amount
+
+    def get(self) -> float:
+        return self.func() if self.func is not None else self.value
+
+
+class Gauge(_Metric):
+    """@brief Value that goes up and down; optionally read from a callback.
+
+    @param func  Callable returning the current value (unlabelled gauges only).
+    """
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (),
+                 registry: MetricsRegistry = REGISTRY, func: Callable[[], float] | None = None):
+        self._func = func
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _GaugeChild(self._func)
+
+    def set_function(self, func: Callable[[], float]) -> None:
+        """@brief Read the (unlabelled) gauge from a callback from now on."""
+        self._children[()].func = func
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {child.get()}"
+                for key, child in list(self._children.items())]
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "lock")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    """@brief Histogram with fixed, preallocated buckets.
+
+    @param buckets  Ascending upper bounds (+Inf is added implicitly).
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (),
+                 registry: MetricsRegistry = REGISTRY, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            with child.lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+        return lines
+
+
+## @name Service Metrics
+## @{
+MODBUS_ROUNDTRIP = Histogram("modbus_roundtrip_seconds", "Modbus read round trip per register or block", ("block",))
+MODBUS_DECODE = Histogram("modbus_decode_seconds", "Time to decode one Modbus response", buckets=(
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005))
+INFLUX_WRITE = Histogram("influx_write_seconds", "InfluxDB write latency", ("bucket",))
+INFLUX_BATCH = Histogram("influx_batch_points", "Points per InfluxDB write", ("bucket",), buckets=SIZE_BUCKETS)
+MQTT_PUBLISH = Histogram("mqtt_publish_seconds", "MQTT publish call latency incl. waiting for the connection")
+MQTT_SUPPRESSED = Counter("mqtt_publish_suppressed", "Messages held back by the publish filter")
+MQTT_QUEUE = Gauge("mqtt_publish_queue_depth", "Publish batches waiting in the blocking-call executor")
+SCHEDULER_LATENESS = Histogram("scheduler_lateness_seconds", "Delay between tick and job start", ("job",))
+SCHEDULER_RUNTIME = Histogram("scheduler_runtime_seconds", "Job run time", ("job",))
+SCHEDULER_CPU = Histogram("scheduler_cpu_seconds", "Event loop thread CPU time of the steps of a job run", ("job",))
+RECONNECTS = Counter("reconnects", "Connection re-establishments", ("component",))
+ENERGY = Counter("energy_watt_hours", "Energy integrated from the power samples", ("flow",))
+## @}
@@ -0,0 +1,84 @@
+## @file offload.py
+#  @brief Bounded thread-pool execution of blocking calls.
+#
+#  Blocking integration points (synchronous InfluxDB writes, MQTT publish
+#  waiting for the broker, stdout to a journald pipe) are moved off the
+#  asyncio event loop, so a slow sink cannot stall the acquisition loop.
+
+import asyncio
+import functools
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+## @name Limits
+## @{
+MAX_WORKERS = 4        ## Threads for blocking calls
+MAX_PENDING = 64       ## Calls queued or running before callers have to wait
+STDOUT_QUEUE = 1000    ## Buffered stdout writes before lines are dropped
+## @}
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="blocking")
+_pending: asyncio.Semaphore | None = None
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """@brief Run a blocking callable in the bounded executor.
+
+    At most MAX_PENDING calls are queued; further callers wait, which
+    applies back pressure instead of growing an unbounded queue.
+
+    @param func  Blocking callable.
+    @return Result of func(*args, **kwargs).
+    """
+    global _pending
+    if _pending is None:
+        _pending = asyncio.Semaphore(MAX_PENDING)
+    async with _pending:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+class _QueuedWriter:
+    """@brief File-like stdout replacement writing from a background thread.
+
+    @param target  Original stream the lines are written to.
+    """
+
+    def __init__(self, target):
+        self._target = target
+        self._queue: queue.Queue = queue.Queue(maxsize=STDOUT_QUEUE)
+        ## @brief Number of writes dropped because the queue was full.
+        self.dropped = 0
+        threading.Thread(target=self._drain, name="stdout", daemon=True).start()
+
+    def write(self, text: str) -> int:
+        try:
+            self._queue.put_nowait(text)
+        except queue.Full:
+            self.dropped += 1
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+    def _drain(self) -> None:
+        while True:
+            text = self._queue.get()
+            try:
+                self._target.write(text)
+                if self._queue.empty():
+                    self._target.flush()
+            except (OSError, ValueError):
+                pass
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+def install_async_stdout() -> None:
+    """@brief Replace sys.stdout so print() never blocks on a slow pipe."""
+    if not isinstance(sys.stdout, _QueuedWriter):
+        sys.stdout = _QueuedWriter(sys.stdout)
@@ -0,0 +1,247 @@
+## @file processes.py
+#  @brief Optional multi-process mode: acquisition and sinks in separate processes.
+#
+#  The acquisition process polls the inverter and appends decoded samples
+#  to a shared-memory ring (see shm_ring.py). Sink processes (InfluxDB
+#  writer, MQTT publisher, wallbox controller) read from the ring in their
+#  own interpreter, so a slow, CPU-heavy or crashed sink can never delay
+#  the next inverter read. The ETA heating telemetry does not use the ring
+#  and polls in a process of its own. A small supervisor restarts dead
+#  processes.
+#
+#  Compared to the single-process mode in main.py this mode does not run:
+#   - the local HTTP API ('--http') and the sample archive ('--archive'),
+#     both read the in-process state of the acquisition;
+#   - the discovery registry, so all endpoints come from the config files;
+#   - the config file watcher, a config change needs a restart.
+#  The 60s slow-register reads and their InfluxDB write still run in the
+#  acquisition process (job 'acquire_60s'). They share the event loop with
+#  the 2s reads, so a hanging InfluxDB write stalls that job, not the 2s
+#  cadence, but its CPU time is spent in the acquisition process.
+
+import asyncio
+import math
+import multiprocessing
+import time
+from core.scheduler import CycleScheduler, OVERRUN_DEGRADE, OVERRUN_SKIP
+from core.shm_ring import ShmRing
+
+## @name Configuration
+## @{
+RING_NAME = "pv_samples"
+RING_CAPACITY = 1800            ## 1 h of 2 s samples
+POLL_INTERVAL = 0.2             ## Sink poll period [s]
+## @}
+
+
+def _derived_names() -> list[str]:
+    """@brief Names of the derived inverter values (see inverter/derived_config.json)."""
+    from inverter import readInverter
+    return readInverter.get_derived().names
+
+
+def ring_fields() -> list[str]:
+    """@brief Field layout of the ring: all fast registers plus derived values.
+    @return List of field names.
+    """
+    from inverter import readInverter
+    inverter = readInverter.get_inverter()
+    return inverter.value_names(inverter.register) + _derived_names()
+
+
+def flatten(data: dict) -> dict[str, float]:
+    """@brief Convert an acquire_fast() dict into plain field values.
+    @param data  dict with register dicts and computed numbers.
+    @return dict of field name to number.
+    """
+    values = {}
+    for name, entry in data.items():
+        if isinstance(entry, dict) and "value" in entry:
+            values[name] = entry["value"]
+        elif isinstance(entry, (int, float)):
+            values[name] = entry
+    return values
+
+
+def unflatten(values: dict[str, float]) -> dict:
+    """@brief Convert ring values back into the acquire_fast() dict shape.
+    @param values  dict of field name to number.
+    @return dict with {'value': ...} entries for registers.
+    """
+    derived = set(_derived_names())
+    return {
+        name: value if name in derived else {"value": value}
+        for name, value in values.items()
+    }
+
+
+async def _acquisition(ring_name: str) -> None:
+    """@brief Acquisition process: 2s inverter reads into the ring, 60s slow registers."""
+    from inverter import readInverter
+    ring = ShmRing.attach(ring_name)
+    scheduler = CycleScheduler()
+
+    async def fast() -> None:
+        data = await readInverter.acquire_fast()
+        ring.append(time.time(), flatten(data))
+
+    scheduler.add_job(fast, 2, id="acquire_2s", overrun=OVERRUN_DEGRADE, degraded_interval=4)
+    scheduler.add_job(readInverter.read_inverter_60s_task, 60, id="acquire_60s",
+                      overrun=OVERRUN_SKIP, offset=1.5)
+    scheduler.start()
+    while True:
+        await asyncio.sleep(60)
+        print(scheduler.report())
+
+
+async def _consume(ring: ShmRing, handler, name: str) -> None:
+    """@brief Feed every new ring record to a sink handler, forever.
+
+    @param ring     Attached ShmRing.
+    @param handler  Coroutine function called with (timestamp, values).
+    @param name     Sink name for log messages.
+    """
+    next_seq = ring.sequence
+    while True:
+        next_seq, rows, lost = ring.read_since(next_seq)
+        if lost:
+            print(f"sink {name}: {lost} sample(s) lost")
+        for row in rows.tolist():
+            values = {field: v for field, v in zip(ring.fields, row[1:]) if not math.isnan(v)}
+            await handler(row[0], values)
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def _influx_sink(ring_name: str) -> None:
+    """@brief Sink process writing every sample as fast-cycle InfluxDB point.
+
+    It also integrates the inverter energy flows and writes and
+    checkpoints the counters every CHECKPOINT_INTERVAL.
+    """
+    from inverter import readInverter
+    from core.energy import CHECKPOINT_INTERVAL, EnergyIntegrator, inverter_flows
+    energy = EnergyIntegrator()
+    last_checkpoint = time.time()
+
+    async def write(timestamp: float, values: dict) -> None:
+        nonlocal last_checkpoint
+        data = unflatten(values)
+        point = readInverter.fast_point(data, int(timestamp * 1e9))
+        await readInverter.influx.write_bucket_point_async(point)
+        energy.add(timestamp, inverter_flows(data))
+        if timestamp - last_checkpoint >= CHECKPOINT_INTERVAL:
+            last_checkpoint = timestamp
+            await readInverter.influx.write_bucket_point_async(energy.point(int(timestamp * 1e9)))
+            await asyncio.to_thread(energy.save)
+
+    await _consume(ShmRing.attach(ring_name), write, "influx")
+
+
+async def _mqtt_sink(ring_name: str) -> None:
+    """@brief Sink process publishing the inverter values via MQTT."""
+    from inverter import readInverter
+    from mqtt_client import MQTTManager
+    mqtt = MQTTManager("mqtt_client/broker_config.json")
+    mqtt.start()
+
+    async def publish(timestamp: float, values: dict) -> None:
+        await mqtt.set_keys_async(readInverter.publisher_values(unflatten(values)))
+
+    await _consume(ShmRing.attach(ring_name), publish, "mqtt")
+
+
+async def _wallbox_sink(ring_name: str) -> None:
+    """@brief Sink process running the wallbox controller on the ring samples.
+
+    The wallbox energy is integrated here with its own checkpoint file,
+    because every checkpoint file has exactly one writing process.
+    """
+    from mqtt_client import MQTTManager
+    from goE.wallbox_manager import WallboxManager
+    from core.energy import CHECKPOINT_INTERVAL, EnergyIntegrator
+    mqtt = MQTTManager("mqtt_client/broker_config.json")
+    wallboxes = WallboxManager("goE/wallbox_config.json", mqtt)
+    energy = EnergyIntegrator("user/energy_wallbox.json")
+    last_checkpoint = time.time()
+    mqtt.start()
+
+    async def feed(timestamp: float, values: dict) -> None:
+        nonlocal last_checkpoint
+        wallboxes.set_inverter_data(unflatten(values))
+        powers = await wallboxes.write_current_energy_to_influx()
+        if powers:
+            energy.add(time.time(), {"wallbox": sum(powers.values())})
+        if timestamp - last_checkpoint >= CHECKPOINT_INTERVAL:
+            last_checkpoint = timestamp
+            await asyncio.to_thread(energy.save)
+
+    scheduler = CycleScheduler()
+    scheduler.add_job(wallboxes.control, 30, id="wallbox_30s", overrun=OVERRUN_SKIP, offset=1)
+    scheduler.start()
+    await _consume(ShmRing.attach(ring_name), feed, "wallbox")
+
+
+async def _eta_poller(ring_name: str) -> None:
+    """@brief Process polling the ETA heating telemetry (does not read the ring).
+
+    @param ring_name  Unused; every process entry point takes the ring name.
+    """
+    from eta.telemetry import EtaTelemetry
+
+    async def poll() -> None:
+        try:
+            await eta.poll()
+        except Exception as e:
+            print(f"Error reading ETA data: {e}")
+
+    eta = EtaTelemetry("eta/eta_config.json")
+    scheduler = CycleScheduler()
+    scheduler.add_job(poll, eta.interval, id="task_eta", overrun=OVERRUN_SKIP, offset=0.5)
+    scheduler.start()
+    while True:
+        await asyncio.sleep(3600)
+
+
+## Process name -> coroutine function taking the ring name
+PROCESSES = {
+    "acquisition": _acquisition,
+    "influx": _influx_sink,
+    "mqtt": _mqtt_sink,
+    "wallbox": _wallbox_sink,
+    "eta": _eta_poller,
+}
+
+
+def _process_main(name: str, ring_name: str) -> None:
+    """@brief Entry point of a child process."""
+    asyncio.run(PROCESSES[name](ring_name))
+
+
+def run_multiprocess(ring_name: str = RING_NAME) -> None:
+    """@brief Create the ring, start all processes and restart dead ones.
+
+    @param ring_name  Shared memory segment name.
+    """
+    ring = ShmRing.create(ring_name, ring_fields(), RING_CAPACITY)
+    children: dict[str, multiprocessing.Process] = {}
+    try:
+        while True:
+            for name in PROCESSES:
+                proc = children.get(name)
+                if proc is not None and proc.is_alive():
+                    continue
+                if proc is not None:
+                    print(f"process {name} exited with {proc.exitcode}, restarting")
+                proc = multiprocessing.Process(target=_process_main, args=(name, ring_name),
+                                               name=name, daemon=True)
+                proc.start()
+                children[name] = proc
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in children.values():
+            proc.terminate()
+        for proc in children.values():
+            proc.join(timeout=5)
+        ring.close()
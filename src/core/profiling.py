@@ -0,0 +1,191 @@
+## @file profiling.py
+#  @brief On-demand profiling of the running service.
+#
+#  A profiling session runs for N seconds inside the live process, so the
+#  state that makes the system slow is not lost by a restart. Two modes:
+#   - 'cprofile': deterministic cProfile of the event loop thread
+#   - 'sample':   low-overhead stack sampling of the event loop thread
+#                 (collapsed stacks, usable with flamegraph tools)
+#  Every dump also contains the tracemalloc top allocators of the session.
+#
+#  Sessions are started over a local Unix socket
+#  (e.g. 'echo "profile 30 sample" | nc -U user/profiler.sock') or by
+#  publishing {"seconds": 30, "mode": "cprofile"} to PROFILE_TOPIC.
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+## @name Profiling Defaults
+## @{
+PROFILE_DIR = "user/profiles"
+SOCKET_PATH = "user/profiler.sock"
+PROFILE_TOPIC = "pvcontrol/profile/set"
+MODE_CPROFILE = "cprofile"
+MODE_SAMPLE = "sample"
+MAX_SECONDS = 600
+SAMPLE_INTERVAL = 0.005     ## Stack sampling period [s]
+TOP_ALLOCATIONS = 25
+## @}
+
+
+class Profiler:
+    """@brief Runs one profiling session at a time and writes the report to a file.
+
+    @param output_dir  Directory for the reports.
+    """
+
+    def __init__(self, output_dir: str | Path = PROFILE_DIR):
+        self.output_dir = Path(output_dir)
+        ## @brief True while a session is running.
+        self.running = False
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def profile(self, seconds: float = 30, mode: str = MODE_CPROFILE) -> Path:
+        """@brief Profile the event loop thread for some seconds and dump a report.
+
+        @param seconds  Session length (capped at MAX_SECONDS).
+        @param mode     MODE_CPROFILE or MODE_SAMPLE.
+        @return Path of the written report.
+        """
+        if mode not in (MODE_CPROFILE, MODE_SAMPLE):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        if self.running:
+            raise RuntimeError("a profiling session is already running")
+        seconds = max(0.1, min(float(seconds), MAX_SECONDS))
+        self.running = True
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            print(f"profiling started: {mode} for {seconds:g}s")
+            if mode == MODE_CPROFILE:
+                profile = cProfile.Profile()
+                profile.enable()
+                try:
+                    await asyncio.sleep(seconds)
+                finally:
+                    profile.disable()
+                report = self._cprofile_report(profile)
+            else:
+                report = await self._sample(seconds)
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self.running = False
+
+        report += "\n\n=== tracemalloc top allocators ===\n"
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            report += f"{stat}\n"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"profile_{time.strftime('%Y%m%d_%H%M%S')}_{mode}.txt"
+        await asyncio.to_thread(path.write_text, report, encoding="utf-8")
+        print(f"profiling finished, report written to {path}")
+        return path
+
+    @staticmethod
+    def _cprofile_report(profile: cProfile.Profile) -> str:
+        """@brief Top functions by cumulative and internal time."""
+        out = io.StringIO()
+        stats = pstats.Stats(profile, stream=out)
+        out.write("=== cProfile, by cumulative time ===\n")
+        stats.sort_stats("cumulative").print_stats(40)
+        out.write("\n=== cProfile, by internal time ===\n")
+        stats.sort_stats("tottime").print_stats(40)
+        return out.getvalue()
+
+    @staticmethod
+    async def _sample(seconds: float) -> str:
+        """@brief Sample the event loop thread's stack from a helper thread.
+
+        @return Collapsed stacks ('outer;inner count') sorted by count.
+        """
+        target = threading.get_ident()
+        stacks: Counter = Counter()
+        done = threading.Event()
+
+        def sampler() -> None:
+            while not done.wait(SAMPLE_INTERVAL):
+                frame = sys._current_frames().get(target)
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stacks[";".join(reversed(names))] += 1
+
+        thread = threading.Thread(target=sampler, name="profiler-sampler", daemon=True)
+        thread.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            done.set()
+            await asyncio.to_thread(thread.join)
+        total = sum(stacks.values()) or 1
+        lines = [f"=== stack samples ({total} samples every {SAMPLE_INTERVAL * 1000:.0f}ms) ==="]
+        lines += [f"{stack} {count}" for stack, count in stacks.most_common()]
+        return "\n".join(lines)
+
+    def start_background(self, seconds: float, mode: str) -> None:
+        """@brief Start a session from any thread (e.g. the MQTT callback thread)."""
+        if self._loop is None:
+            print("profiler not attached to an event loop")
+            return
+        future = asyncio.run_coroutine_threadsafe(self.profile(seconds, mode), self._loop)
+        future.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(future) -> None:
+        if future.exception() is not None:
+            print(f"profiling failed: {future.exception()}")
+
+    def on_mqtt(self, payload) -> None:
+        """@brief MQTT handler for PROFILE_TOPIC; payload is a JSON dict or a number of seconds."""
+        if isinstance(payload, dict):
+            self.start_background(payload.get("seconds", 30), payload.get("mode", MODE_CPROFILE))
+        elif isinstance(payload, (int, float)):
+            self.start_background(payload, MODE_CPROFILE)
+        else:
+            print(f"invalid profiling request: {payload!r}")
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """@brief Socket command 'profile [seconds] [mode]' or 'status'; answers with one line."""
+        try:
+            words = (await reader.readline()).decode().split()
+            if words[:1] == ["status"]:
+                reply = "running" if self.running else "idle"
+            elif words[:1] == ["profile"]:
+                seconds = float(words[1]) if len(words) > 1 else 30
+                mode = words[2] if len(words) > 2 else MODE_CPROFILE
+                reply = str(await self.profile(seconds, mode))
+            else:
+                reply = "usage: profile [seconds] [cprofile|sample] | status"
+        except Exception as e:
+            reply = f"error: {e}"
+        writer.write((reply + "\n").encode())
+        await writer.drain()
+        writer.close()
+
+    async def serve(self, socket_path: str | Path = SOCKET_PATH, mqtt=None) -> None:
+        """@brief Attach to the running loop and open the triggers.
+
+        @param socket_path  Unix socket for local commands.
+        @param mqtt         MQTTManager to subscribe PROFILE_TOPIC on (optional).
+        """
+        self._loop = asyncio.get_running_loop()
+        socket_path = Path(socket_path)
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        socket_path.unlink(missing_ok=True)
+        await asyncio.start_unix_server(self._handle_client, path=str(socket_path))
+        if mqtt is not None:
+            mqtt.add_handler(PROFILE_TOPIC, self.on_mqtt)
+        print(f"profiler listening on {socket_path}")
@@ -0,0 +1,83 @@
+## @file reload.py
+#  @brief Polling watcher for configuration files.
+#
+#  Checks the modification time of registered config files and calls the
+#  matching reload callback when a file changed, so configuration edits
+#  are applied in place without restarting the process. A callback that
+#  raises (e.g. on invalid JSON) leaves the old configuration active.
+#
+#  Changes are debounced: a new modification time is only acted on once it
+#  was seen unchanged by two consecutive polls, so an editor that saves in
+#  several steps (truncate, write, rename) triggers one reload of the
+#  finished file instead of one per step.
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Callable
+
+## Default poll interval [s]
+DEFAULT_INTERVAL = 2
+
+
+class ConfigWatcher:
+    """@brief Calls reload callbacks when watched files change.
+
+    @param interval  Poll interval in seconds.
+    @param debounce  Wait for the file to be unchanged for one more poll
+                     before reloading it.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, debounce: bool = True):
+        self.interval = interval
+        self.debounce = debounce
+        ## @brief Path -> [applied mtime, callbacks, last seen mtime].
+        self._watches: dict[Path, list] = {}
+
+    @staticmethod
+    def _mtime(path: Path) -> int | None:
+        """@brief Modification time of a file, None if it does not exist."""
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def watch(self, path: str | Path, callback: Callable[[Path], None]) -> None:
+        """@brief Register a callback for a file.
+
+        @param path      File to watch.
+        @param callback  Called with the path after the file changed.
+        """
+        path = Path(path)
+        mtime = self._mtime(path)
+        entry = self._watches.setdefault(path, [mtime, [], mtime])
+        entry[1].append(callback)
+
+    def check(self) -> list[Path]:
+        """@brief Check all files once and run the callbacks of changed ones.
+        @return List of files that changed.
+        """
+        changed = []
+        for path, entry in self._watches.items():
+            mtime = self._mtime(path)
+            if mtime is None or mtime == entry[0]:
+                continue
+            settling = self.debounce and mtime != entry[2]
+            entry[2] = mtime
+            if settling:
+                continue
+            entry[0] = mtime
+            changed.append(path)
+            for callback in entry[1]:
+                try:
+                    callback(path)
+                    print(f"config reloaded: {path}")
+                except Exception as e:
+                    print(f"config reload of {path} failed, keeping old configuration: {e}")
+        return changed
+
+    async def run(self) -> None:
+        """@brief Poll the watched files forever."""
+        while True:
+            await asyncio.sleep(self.interval)
+            self.check()
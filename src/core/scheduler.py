@@ -0,0 +1,304 @@
+## @file scheduler.py
+#  @brief Drift-free asyncio cycle scheduler with overrun accounting.
+#
+#  Every job runs in its own asyncio task with ticks aligned to wall-clock
+#  boundaries (a 2 s job fires at :00, :02, :04, ...). A job never
+#  overlaps with itself, and an explicit policy decides what happens when
+#  a run takes longer than its interval. Lateness, run time, skipped
+#  ticks and overruns are recorded per job. Every step of a job's
+#  coroutine (and of the tasks it creates) is timed, which gives the CPU
+#  time of the job's own code and the job that blocked the event loop.
+
+import asyncio
+import collections.abc
+import contextvars
+import math
+import time
+from typing import Awaitable, Callable
+from core.metrics import SCHEDULER_CPU, SCHEDULER_LATENESS, SCHEDULER_RUNTIME
+
+## @name Overrun Policies
+## @{
+OVERRUN_SKIP = "skip"           ## Drop the missed ticks, continue at the next boundary
+OVERRUN_CATCH_UP = "catch_up"   ## Run missed ticks back to back (up to max_catch_up)
+OVERRUN_DEGRADE = "degrade"     ## Switch to degraded_interval until runs fit again
+## @}
+#  Degrading stretches the interval; it does not switch a job to another
+#  register set. The fast register map is what the wallbox control and the
+#  energy counters need every cycle, and the slow map is read by its own
+#  60 s job anyway, so a lower cadence is the only thing left to give up.
+
+## Consecutive in-time runs before a degraded job returns to its normal interval
+RECOVER_AFTER = 10
+
+## Id of the job a task belongs to; tasks created by a job inherit it
+_JOB: contextvars.ContextVar[str | None] = contextvars.ContextVar("scheduler_job", default=None)
+
+
+class _Steps(collections.abc.Coroutine):
+    """@brief Coroutine wrapper timing every step (send/throw) of a job's code.
+
+    @param coro     Wrapped coroutine.
+    @param job      Job id the steps are attributed to.
+    @param on_step  Callable(job, wall seconds, thread CPU seconds) called after every step.
+    """
+
+    __slots__ = ("_coro", "_job", "_on_step")
+
+    def __init__(self, coro, job: str, on_step):
+        self._coro = coro
+        self._job = job
+        self._on_step = on_step
+
+    def send(self, value):
+        t0, cpu0 = time.perf_counter(), time.thread_time()
+        try:
+            return self._coro.send(value)
+        finally:
+            self._on_step(self._job, time.perf_counter() - t0, time.thread_time() - cpu0)
+
+    def throw(self, *args):
+        t0, cpu0 = time.perf_counter(), time.thread_time()
+        try:
+            return self._coro.throw(*args)
+        finally:
+            self._on_step(self._job, time.perf_counter() - t0, time.thread_time() - cpu0)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+
+class CycleScheduler:
+    """@brief Runs coroutine jobs on aligned, non-overlapping ticks.
+
+    @param clock  Callable returning the current time in seconds.
+    @param sleep  Coroutine function sleeping for a number of seconds.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self.jobs: dict[str, dict] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        ## @brief (wall seconds, job id) of the longest job step since take_longest_step().
+        self._longest_step: tuple[float, str | None] = (0.0, None)
+        self._previous_factory = None
+
+    def add_job(self, func: Callable[[], Awaitable], interval: float, id: str,
+                overrun: str = OVERRUN_SKIP, offset: float = 0.0,
+                degraded_interval: float | None = None, max_catch_up: int = 3) -> None:
+        """@brief Register a periodic job.
+
+        @param func               Coroutine function without arguments.
+        @param interval           Interval in seconds; ticks are multiples of it.
+        @param id                 Unique job id.
+        @param overrun            OVERRUN_SKIP, OVERRUN_CATCH_UP or OVERRUN_DEGRADE.
+        @param offset             Phase offset of the ticks in seconds.
+        @param degraded_interval  Interval used while degraded (default 2 * interval).
+        @param max_catch_up       Maximum number of missed ticks run back to back.
+        """
+        if overrun not in (OVERRUN_SKIP, OVERRUN_CATCH_UP, OVERRUN_DEGRADE):
+            raise ValueError(f"Unknown overrun policy: {overrun}")
+        self.jobs[id] = {
+            "func": func,
+            "interval": interval,
+            "active_interval": interval,
+            "offset": offset,
+            "overrun": overrun,
+            "degraded_interval": degraded_interval or 2 * interval,
+            "max_catch_up": max_catch_up,
+            "cpu_run": 0.0,
+            "stats": {
+                "runs": 0, "errors": 0, "skipped": 0, "overruns": 0, "degraded": False,
+                "lateness_last": 0.0, "lateness_max": 0.0, "lateness_sum": 0.0,
+                "runtime_last": 0.0, "runtime_max": 0.0, "runtime_sum": 0.0,
+                "cpu_last": 0.0, "cpu_max": 0.0, "cpu_sum": 0.0,
+            },
+        }
+        if id in self._tasks:
+            self._tasks[id].cancel()
+            self._tasks[id] = asyncio.create_task(self._run_job(id))
+
+    def reschedule_job(self, id: str, interval: float) -> None:
+        """@brief Change the interval of a job; takes effect after the current tick.
+        @param id        Job id.
+        @param interval  New interval in seconds.
+        """
+        job = self.jobs[id]
+        job["interval"] = interval
+        job["active_interval"] = interval
+        job["degraded_interval"] = max(job["degraded_interval"], 2 * interval)
+
+    def start(self) -> None:
+        """@brief Start one asyncio task per job (requires a running loop).
+
+        A task factory is installed so tasks created by a job (gather,
+        wait_for, ...) have their steps attributed to that job as well.
+        """
+        loop = asyncio.get_running_loop()
+        if loop.get_task_factory() != self._task_factory:
+            self._previous_factory = loop.get_task_factory()
+            loop.set_task_factory(self._task_factory)
+        for id in self.jobs:
+            if id not in self._tasks:
+                self._tasks[id] = asyncio.create_task(self._run_job(id))
+
+    def shutdown(self) -> None:
+        """@brief Cancel all job tasks and remove the task factory."""
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if loop.get_task_factory() == self._task_factory:
+            loop.set_task_factory(self._previous_factory)
+
+    def _task_factory(self, loop, coro, **kwargs) -> asyncio.Future:
+        """@brief Task factory wrapping the coroutines of tasks created inside a job."""
+        job = _JOB.get()
+        if job is not None and not isinstance(coro, _Steps):
+            coro = _Steps(coro, job, self._step)
+        if self._previous_factory is not None:
+            return self._previous_factory(loop, coro, **kwargs)
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    def _step(self, job: str, wall: float, cpu: float) -> None:
+        """@brief Record one step of a job's code (wall and CPU time)."""
+        entry = self.jobs.get(job)
+        if entry is not None:
+            entry["cpu_run"] += cpu
+        if wall > self._longest_step[0]:
+            self._longest_step = (wall, job)
+
+    def take_longest_step(self) -> tuple[float, str | None]:
+        """@brief Longest single job step since the last call, and reset it.
+
+        A step runs without yielding to the event loop, so the job of the
+        longest step is the one that blocked the loop in that period.
+
+        @return Tuple (wall seconds, job id or None if no job step ran).
+        """
+        longest, self._longest_step = self._longest_step, (0.0, None)
+        return longest
+
+    def _next_boundary(self, after: float, job: dict) -> float:
+        """@brief First tick of the job's active interval strictly after a time."""
+        interval, offset = job["active_interval"], job["offset"]
+        return math.floor((after - offset) / interval + 1) * interval + offset
+
+    async def _run_job(self, id: str) -> None:
+        """@brief Tick loop of one job."""
+        job = self.jobs[id]
+        stats = job["stats"]
+        lateness_metric = SCHEDULER_LATENESS.labels(id)
+        runtime_metric = SCHEDULER_RUNTIME.labels(id)
+        cpu_metric = SCHEDULER_CPU.labels(id)
+        in_time = 0
+        tick = self._next_boundary(self._clock(), job)
+        while True:
+            delay = tick - self._clock()
+            if delay > 0:
+                await self._sleep(delay)
+
+            start = self._clock()
+            lateness = max(0.0, start - tick)
+            job["cpu_run"] = 0.0
+            token = _JOB.set(id)
+            try:
+                await _Steps(job["func"](), id, self._step)
+            except Exception as e:
+                stats["errors"] += 1
+                print(f"job {id} failed: {e}")
+            finally:
+                _JOB.reset(token)
+            cpu = job["cpu_run"]
+            end = self._clock()
+            runtime = end - start
+            self._record(stats, lateness, runtime, cpu)
+            lateness_metric.observe(lateness)
+            runtime_metric.observe(runtime)
+            cpu_metric.observe(cpu)
+
+            tick += job["active_interval"]
+            if end <= tick:
+                in_time += 1
+                if stats["degraded"] and runtime < job["interval"] and in_time >= RECOVER_AFTER:
+                    print(f"job {id} recovered, back to {job['interval']}s")
+                    stats["degraded"] = False
+                    job["active_interval"] = job["interval"]
+                    tick = self._next_boundary(end, job)
+                continue
+
+            # Overrun: the run ended after the next tick was due
+            in_time = 0
+            stats["overruns"] += 1
+            missed = math.floor((end - tick) / job["active_interval"]) + 1
+            if job["overrun"] == OVERRUN_CATCH_UP and missed <= job["max_catch_up"]:
+                continue
+            if job["overrun"] == OVERRUN_DEGRADE and not stats["degraded"]:
+                print(f"job {id} overran ({runtime:.2f}s), degrading to {job['degraded_interval']}s")
+                stats["degraded"] = True
+                job["active_interval"] = job["degraded_interval"]
+            stats["skipped"] += missed
+            tick = self._next_boundary(end, job)
+
+    @staticmethod
+    def _record(stats: dict, lateness: float, runtime: float, cpu: float = 0.0) -> None:
+        """@brief Update the lateness / run time / CPU time statistics of a job.
+
+        The CPU time is the sum over the steps of the job's coroutine and
+        of the tasks it created; other tasks interleaved at its awaits and
+        work offloaded to threads are not included.
+        """
+        stats["runs"] += 1
+        stats["lateness_last"] = lateness
+        stats["lateness_max"] = max(stats["lateness_max"], lateness)
+        stats["lateness_sum"] += lateness
+        stats["runtime_last"] = runtime
+        stats["runtime_max"] = max(stats["runtime_max"], runtime)
+        stats["runtime_sum"] += runtime
+        stats["cpu_last"] = cpu
+        stats["cpu_max"] = max(stats["cpu_max"], cpu)
+        stats["cpu_sum"] += cpu
+
+    def stats(self) -> dict[str, dict]:
+        """@brief Per-job statistics including mean lateness and run time.
+        @return dict mapping job id to a statistics dict.
+        """
+        result = {}
+        for id, job in self.jobs.items():
+            stats = dict(job["stats"])
+            runs = stats["runs"] or 1
+            stats["lateness_mean"] = stats.pop("lateness_sum") / runs
+            stats["runtime_mean"] = stats.pop("runtime_sum") / runs
+            stats["cpu_mean"] = stats.pop("cpu_sum") / runs
+            stats["interval"] = job["active_interval"]
+            result[id] = stats
+        return result
+
+    def report(self) -> str:
+        """@brief One-line summary per job for the log.
+        @return Report string.
+        """
+        lines = []
+        for id, s in self.stats().items():
+            lines.append(
+                f"{id}: runs={s['runs']} skipped={s['skipped']} overruns={s['overruns']} "
+                f"late avg/max={s['lateness_mean'] * 1000:.0f}/{s['lateness_max'] * 1000:.0f}ms "
+                f"run avg/max={s['runtime_mean'] * 1000:.0f}/{s['runtime_max'] * 1000:.0f}ms "
+                f"cpu avg/max={s['cpu_mean'] * 1000:.0f}/{s['cpu_max'] * 1000:.0f}ms"
+                + (" DEGRADED" if s["degraded"] else "")
+            )
+        return "\n".join(lines)
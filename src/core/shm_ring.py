@@ -0,0 +1,159 @@
+## @file shm_ring.py
+#  @brief Fixed-layout sample ring buffer in multiprocessing shared memory.
+#
+#  One writer process appends records of float64 values (timestamp plus
+#  one slot per field). Any number of reader processes attach by name and
+#  read new records directly from shared memory. Field names are stored in
+#  the header, so readers need nothing but the segment name. A per-record
+#  sequence stamp lets readers detect records overwritten while reading.
+#  Readers get the new records as one NumPy array (a single vectorized
+#  copy out of the segment); converting rows to dicts is left to them.
+
+import json
+import math
+import struct
+from multiprocessing import shared_memory
+import numpy as np
+
+## @name Layout
+## @{
+MAGIC = 0x50565352          ## 'PVSR' (PV sample ring)
+HEADER = struct.Struct("<IIIIQ")   ## magic, capacity, field count, names length, write sequence
+NAMES_SIZE = 8192           ## Reserved bytes for the JSON field name list
+DATA_OFFSET = HEADER.size + NAMES_SIZE
+SEQ_OFFSET = 16             ## Byte offset of the write sequence in the header
+## @}
+
+
+class ShmRing:
+    """@brief Shared-memory ring of fixed-size float64 records.
+
+    Record layout: [sequence stamp (u64), timestamp, field_1 .. field_n];
+    missing values are stored as NaN.
+
+    @param shm     Underlying SharedMemory segment.
+    @param owner   True if this instance created (and will unlink) the segment.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        magic, self.capacity, nfields, names_len, _ = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"shared memory {shm.name} is not a sample ring")
+        self.fields: list[str] = json.loads(bytes(shm.buf[HEADER.size:HEADER.size + names_len]))
+        self._record = struct.Struct(f"<Qd{nfields}d")
+        self.record_size = self._record.size
+        self._index = {name: i for i, name in enumerate(self.fields)}
+        ## @brief float64 view of all slots [stamp bits, timestamp, field_1 .. field_n].
+        self._slots = np.ndarray((self.capacity, nfields + 2), np.float64, shm.buf, DATA_OFFSET)
+        ## @brief uint64 view of the sequence stamps of all slots.
+        self._stamps = np.ndarray((self.capacity,), np.uint64, shm.buf, DATA_OFFSET, (self.record_size,))
+
+    @classmethod
+    def create(cls, name: str, fields: list[str], capacity: int) -> "ShmRing":
+        """@brief Create a new ring (writer / owner side).
+
+        @param name      Shared memory segment name.
+        @param fields    Field names of every record.
+        @param capacity  Number of records kept.
+        @return ShmRing owning the segment.
+        """
+        names = json.dumps(fields).encode()
+        if len(names) > NAMES_SIZE:
+            raise ValueError("too many field names for the ring header")
+        size = DATA_OFFSET + capacity * struct.calcsize(f"<Qd{len(fields)}d")
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, capacity, len(fields), len(names), 0)
+        shm.buf[HEADER.size:HEADER.size + len(names)] = names
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "ShmRing":
+        """@brief Attach to an existing ring (reader or writer process).
+
+        Child processes share the resource tracker of the creating process,
+        so an exiting or crashing reader never unlinks the segment; on
+        Python >= 3.13 tracking is disabled for attached segments anyway.
+
+        @param name  Shared memory segment name.
+        @return ShmRing not owning the segment.
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # Python < 3.13
+            shm = shared_memory.SharedMemory(name=name)
+        try:
+            return cls(shm, owner=False)
+        except ValueError:
+            shm.close()
+            raise
+
+    @property
+    def sequence(self) -> int:
+        """@brief Number of records written so far."""
+        return struct.unpack_from("<Q", self.shm.buf, SEQ_OFFSET)[0]
+
+    def _offset(self, seq: int) -> int:
+        return DATA_OFFSET + (seq % self.capacity) * self.record_size
+
+    def append(self, timestamp: float, values: dict[str, float]) -> int:
+        """@brief Append one record (single writer only).
+
+        The record is written first and published by incrementing the
+        header sequence afterwards.
+
+        @param timestamp  Sample time (unix seconds).
+        @param values     dict of field name to value; unknown names are ignored.
+        @return Sequence number of the record.
+        """
+        seq = self.sequence
+        row = [math.nan] * len(self.fields)
+        for name, value in values.items():
+            i = self._index.get(name)
+            if i is not None and value is not None:
+                row[i] = value
+        self._record.pack_into(self.shm.buf, self._offset(seq), seq + 1, timestamp, *row)
+        struct.pack_into("<Q", self.shm.buf, SEQ_OFFSET, seq + 1)
+        return seq
+
+    def stamp(self, seq: int) -> int:
+        """@brief Sequence stamp of the slot holding a record (seq + 1 if intact)."""
+        return struct.unpack_from("<Q", self.shm.buf, self._offset(seq))[0]
+
+    def read_since(self, next_seq: int) -> tuple[int, np.ndarray, int]:
+        """@brief Read all records from next_seq up to the newest one.
+
+        The records are copied out of shared memory in one step; those
+        overwritten by the writer meanwhile are dropped and counted as lost.
+
+        @param next_seq  Sequence number of the first unread record.
+        @return Tuple (new next_seq, float64 array with one row
+                [timestamp, field_1 .. field_n] per record (NaN: missing),
+                lost records).
+        """
+        head = self.sequence
+        lost = max(0, head - self.capacity - next_seq)
+        seqs = np.arange(next_seq + lost, head, dtype=np.uint64)
+        slots = (seqs % self.capacity).astype(np.intp)
+        rows = self._slots[slots, 1:]
+        intact = self._stamps[slots] == seqs + 1
+        lost += int(len(seqs) - np.count_nonzero(intact))
+        return head, rows[intact], lost
+
+    def close(self) -> None:
+        """@brief Detach; the owner also removes the segment."""
+        # The NumPy views must be gone before the buffer can be released
+        self._slots = self._stamps = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
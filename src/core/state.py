@@ -0,0 +1,68 @@
+## @file state.py
+#  @brief Versioned in-process store of the latest decoded values.
+#
+#  Holds the newest inverter registers and computed values per section.
+#  Every change bumps a version number, which the local HTTP API uses as
+#  ETag and to wake long-polling clients.
+
+import asyncio
+import time
+
+
+class LatestValues:
+    """@brief Latest values per section with a change counter.
+
+    Must be updated from the event loop thread.
+    """
+
+    def __init__(self):
+        ## @brief Section name -> dict of values.
+        self.sections: dict[str, dict] = {}
+        ## @brief Incremented on every change of any section.
+        self.version = 0
+        ## @brief Unix time of the last change.
+        self.updated = 0.0
+        self._changed = asyncio.Event()
+
+    def update(self, section: str, values: dict) -> None:
+        """@brief Replace the values of a section; bumps the version if they differ.
+
+        @param section  Section name, e.g. 'inverter' or 'computed'.
+        @param values   New values (stored as given, pass a copy of shared dicts).
+        """
+        if self.sections.get(section) == values:
+            return
+        self.sections[section] = values
+        self.version += 1
+        self.updated = time.time()
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def update_inverter(self, data: dict) -> None:
+        """@brief Store an acquire_fast() dict as 'inverter' and 'computed' sections.
+
+        @param data  dict with register dicts and the computed numbers.
+        """
+        registers, computed = {}, {}
+        for name, entry in data.items():
+            if isinstance(entry, dict):
+                registers[name] = {"value": entry.get("value"), "unit": entry.get("unit")}
+            elif entry is None:
+                # Register whose read failed in this cycle
+                registers[name] = {"value": None, "unit": None}
+            else:
+                computed[name] = entry
+        self.update("inverter", registers)
+        self.update("computed", computed)
+
+    async def wait_changed(self, timeout: float) -> bool:
+        """@brief Wait until the next change or the timeout.
+
+        @param timeout  Maximum wait in seconds.
+        @return True if a change happened, False on timeout.
+        """
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
@@ -0,0 +1,190 @@
+## @file timeseries.py
+#  @brief In-memory ring buffer of recent samples with vectorized queries.
+#
+#  Keeps the last N hours of every decoded field in preallocated NumPy
+#  columns, one buffer per source (inverter, wallbox, ETA). Appends are
+#  O(1) in the buffer length; window queries (mean, min, max, integral,
+#  resample) only touch the requested window. Controllers and local APIs
+#  read recent history from here instead of querying InfluxDB.
+
+import math
+import threading
+import time
+from typing import Callable
+import numpy as np
+
+## @name Defaults
+## @{
+DEFAULT_HOURS = 6
+DEFAULT_PERIOD = 2.0    ## Nominal sample period [s], sizes the buffer
+## @}
+
+
+class TimeSeriesBuffer:
+    """@brief Fixed-capacity ring of timestamped float columns.
+
+    Columns are allocated with the full capacity the first time a field
+    name is seen; a missing value in a sample is stored as NaN.
+
+    @param capacity  Number of samples kept.
+    @param period    Nominal sample period in seconds (used to size window reads).
+    """
+
+    def __init__(self, capacity: int, period: float = DEFAULT_PERIOD):
+        self.capacity = capacity
+        self.period = period
+        self.timestamps = np.full(capacity, np.nan)
+        self.columns: dict[str, np.ndarray] = {}
+        ## @brief Total number of samples appended.
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def append(self, timestamp: float, values: dict[str, float]) -> None:
+        """@brief Append one sample.
+
+        @param timestamp  Sample time (unix seconds).
+        @param values     dict of field name to number; None / non-numeric are skipped.
+        """
+        with self._lock:
+            i = self.count % self.capacity
+            self.timestamps[i] = timestamp
+            for column in self.columns.values():
+                column[i] = np.nan
+            for name, value in values.items():
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                column = self.columns.get(name)
+                if column is None:
+                    column = self.columns[name] = np.full(self.capacity, np.nan)
+                column[i] = value
+            self.count += 1
+
+    def latest(self) -> dict[str, float]:
+        """@brief Values of the newest sample (NaN fields omitted).
+        @return dict of field name to value, including 'time'.
+        """
+        with self._lock:
+            if not self.count:
+                return {}
+            i = (self.count - 1) % self.capacity
+            result = {"time": float(self.timestamps[i])}
+            for name, column in self.columns.items():
+                if not math.isnan(column[i]):
+                    result[name] = float(column[i])
+            return result
+
+    def window(self, field: str, seconds: float, now: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """@brief Timestamps and values of a field within the last 'seconds'.
+
+        Only the samples that can fall into the window are gathered,
+        so the cost is proportional to the window, not the buffer.
+
+        @param field    Field name.
+        @param seconds  Window length in seconds.
+        @param now      End of the window (default: current time).
+        @return Tuple (timestamps, values) as new arrays in time order, NaNs removed.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            column = self.columns.get(field)
+            stored = min(self.count, self.capacity)
+            if column is None or not stored:
+                return np.empty(0), np.empty(0)
+            n = min(stored, int(seconds / self.period * 1.5) + 2)
+            idx = np.arange(self.count - n, self.count) % self.capacity
+            ts = self.timestamps[idx]
+            values = column[idx]
+        mask = (ts >= now - seconds) & (ts <= now) & ~np.isnan(values)
+        return ts[mask], values[mask]
+
+    def mean(self, field: str, seconds: float, now: float | None = None) -> float:
+        """@brief Mean of a field over the window (NaN if empty)."""
+        _, values = self.window(field, seconds, now)
+        return float(values.mean()) if values.size else math.nan
+
+    def min(self, field: str, seconds: float, now: float | None = None) -> float:
+        """@brief Minimum of a field over the window (NaN if empty)."""
+        _, values = self.window(field, seconds, now)
+        return float(values.min()) if values.size else math.nan
+
+    def max(self, field: str, seconds: float, now: float | None = None) -> float:
+        """@brief Maximum of a field over the window (NaN if empty)."""
+        _, values = self.window(field, seconds, now)
+        return float(values.max()) if values.size else math.nan
+
+    def integral(self, field: str, seconds: float, now: float | None = None,
+                 max_gap: float | None = None) -> float:
+        """@brief Trapezoid integral of a field over time, in value * hours.
+
+        For a power field in W the result is the energy in Wh. Intervals
+        longer than max_gap (default 5 * period) are not integrated.
+
+        @return Integral in value-hours.
+        """
+        ts, values = self.window(field, seconds, now)
+        if ts.size < 2:
+            return 0.0
+        dt = np.diff(ts)
+        areas = (values[1:] + values[:-1]) * 0.5 * dt
+        areas[dt > (max_gap or 5 * self.period)] = 0.0
+        return float(areas.sum() / 3600.0)
+
+    def resample(self, field: str, seconds: float, step: float,
+                 now: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """@brief Bin means of a field on a regular grid.
+
+        @param step  Bin width in seconds.
+        @return Tuple (bin start times, bin means); empty bins are NaN.
+        """
+        now = time.time() if now is None else now
+        ts, values = self.window(field, seconds, now)
+        start = now - seconds
+        bins = int(math.ceil(seconds / step))
+        index = np.minimum(((ts - start) // step).astype(int), bins - 1)
+        sums = np.bincount(index, weights=values, minlength=bins)
+        counts = np.bincount(index, minlength=bins)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, sums / counts, np.nan)
+        return start + np.arange(bins) * step, means
+
+
+class TimeSeriesStore:
+    """@brief Process-wide set of TimeSeriesBuffers, one per source.
+
+    @param hours   Retention in hours.
+    @param period  Nominal sample period in seconds.
+    """
+
+    def __init__(self, hours: float = DEFAULT_HOURS, period: float = DEFAULT_PERIOD):
+        self.hours = hours
+        self.period = period
+        self.buffers: dict[str, TimeSeriesBuffer] = {}
+        ## @brief Callables(source, timestamp, values) called for every appended sample.
+        self.listeners: list[Callable[[str, float, dict], None]] = []
+
+    def buffer(self, source: str, period: float | None = None) -> TimeSeriesBuffer:
+        """@brief Get (or create) the buffer of a source.
+
+        @param source  Source name, e.g. 'inverter', 'wallbox', 'eta'.
+        @param period  Sample period of the source (default: store period).
+        @return The TimeSeriesBuffer.
+        """
+        buf = self.buffers.get(source)
+        if buf is None:
+            period = period or self.period
+            buf = self.buffers[source] = TimeSeriesBuffer(int(self.hours * 3600 / period), period)
+        return buf
+
+    def subscribe(self, listener: Callable[[str, float, dict], None]) -> None:
+        """@brief Pass every sample appended via append() on to a listener (e.g. the archive)."""
+        self.listeners.append(listener)
+
+    def append(self, source: str, timestamp: float, values: dict[str, float],
+               period: float | None = None) -> None:
+        """@brief Append a sample to the buffer of a source and notify the listeners.
+
+        @param period  Sample period used if the buffer has to be created.
+        """
+        self.buffer(source, period).append(timestamp, values)
+        for listener in self.listeners:
+            listener(source, timestamp, values)
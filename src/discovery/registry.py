@@ -0,0 +1,327 @@
+## @file registry.py
+#  @brief Device registry keeping the service endpoints up to date.
+#
+#  Every role (inverter Modbus gateway, MQTT broker, ETA heating, go-e
+#  chargers) maps to an IP and port. The registry checks the known
+#  endpoints with cheap TCP connects every few seconds; if one stops
+#  answering, the subnet is swept (ip_scan.sweep), the role ports are
+#  probed concurrently and the device is found again by MAC address,
+#  hostname or a unique open port. A role that is still missing is
+#  retried with exponential backoff; the periodic full sweep only runs
+#  while some role is unresolved. Roles whose device accepts only one
+#  TCP client (the Modbus gateway) are not probed; their client reports
+#  its own read results instead (report()) and they are only searched
+#  for after it reported them dead. Clients register a callback
+#  per role and are re-bound as soon as the endpoint moves. The registry
+#  is persisted in user/devices.yaml.
+
+import asyncio
+import json
+import socket
+import time
+from pathlib import Path
+from typing import Callable
+import yaml
+import ip_scan
+
+## @name Defaults
+## @{
+DEVICES_FILE = "user/devices.yaml"
+CHECK_INTERVAL = 10         ## Period of the endpoint checks [s]
+RESCAN_INTERVAL = 900       ## Period of the full rediscovery [s]
+PROBE_TIMEOUT = 1.0         ## TCP connect timeout of a port probe [s]
+PROBE_CONCURRENCY = 128     ## Maximum simultaneously open probe sockets
+## @}
+
+
+async def port_open(ip: str, port: int, timeout: float = PROBE_TIMEOUT) -> bool:
+    """@brief Check whether a TCP port accepts connections.
+    @return True if the connect succeeded within the timeout.
+    """
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+        writer.close()
+        return True
+    except (OSError, asyncio.TimeoutError):
+        return False
+
+
+async def open_ports(hosts: list[str], ports: set[int], timeout: float = PROBE_TIMEOUT) -> dict[str, set[int]]:
+    """@brief Probe a set of ports on many hosts concurrently.
+
+    @param hosts    IP address strings.
+    @param ports    Ports to probe on every host.
+    @param timeout  Connect timeout [s].
+    @return dict mapping IP to its open ports (hosts without open ports omitted).
+    """
+    semaphore = asyncio.Semaphore(PROBE_CONCURRENCY)
+
+    async def probe(ip: str, port: int) -> bool:
+        async with semaphore:
+            return await port_open(ip, port, timeout)
+
+    pairs = [(ip, port) for ip in hosts for port in sorted(ports)]
+    results = await asyncio.gather(*(probe(ip, port) for ip, port in pairs))
+    found: dict[str, set[int]] = {}
+    for (ip, port), up in zip(pairs, results):
+        if up:
+            found.setdefault(ip, set()).add(port)
+    return found
+
+
+def load_devices(path: str | Path = DEVICES_FILE) -> dict[str, dict]:
+    """@brief Read the persisted registry.
+    @return dict mapping role to device entry; empty if the file is missing or invalid.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            devices = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError):
+        return {}
+    return devices if isinstance(devices, dict) else {}
+
+
+def load_endpoint(role: str, path: str | Path = DEVICES_FILE) -> tuple[str, int] | None:
+    """@brief Endpoint of a role from the persisted registry (for scripts).
+    @return Tuple (ip, port) or None if the role is unknown.
+    """
+    entry = load_devices(path).get(role)
+    if entry and entry.get("ip"):
+        return entry["ip"], entry["port"]
+    return None
+
+
+class DeviceRegistry:
+    """@brief Role -> endpoint registry with incremental rediscovery.
+
+    @param config_path  Path to the discovery JSON configuration.
+    @param state_path   Path of the persisted registry YAML.
+    """
+
+    def __init__(self, config_path: str | Path, state_path: str | Path = DEVICES_FILE):
+        self.state_path = Path(state_path)
+        ## @brief Role -> {'ip', 'port', 'mac', 'seen'}.
+        self.devices: dict[str, dict] = load_devices(self.state_path)
+        self._callbacks: dict[str, list[Callable[[str, int], None]]] = {}
+        ## @brief Role -> last liveness reported by its client (None: no report yet).
+        self.liveness: dict[str, bool | None] = {}
+        ## @brief Role -> (monotonic time of the next rediscovery, current backoff [s]).
+        self._retry: dict[str, tuple[float, float]] = {}
+        self._lock = asyncio.Lock()
+        self.apply_config(self._load_config(config_path))
+
+    @staticmethod
+    def _load_config(path: str | Path) -> dict:
+        """@brief Load the discovery configuration from a JSON file."""
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def apply_config(self, config: dict) -> None:
+        """@brief Apply network, intervals and roles; known endpoints are kept.
+
+        Roles without a persisted endpoint start with the 'ip' from the
+        config and the first of their ports.
+
+        @param config  Discovery configuration dict.
+        """
+        self.network = config["network"]
+        self.check_interval = config.get("check_interval", CHECK_INTERVAL)
+        self.rescan_interval = config.get("rescan_interval", RESCAN_INTERVAL)
+        ## @brief Role -> {'ports', optional 'ip', 'mac', 'hostname'} from the config.
+        self.roles: dict[str, dict] = config["roles"]
+        for role, spec in self.roles.items():
+            if not any(spec.get(key) for key in ("ip", "mac", "hostname")):
+                print(f"discovery: {role} has no ip, mac or hostname, it is only found by a unique open port")
+            entry = self.devices.setdefault(role, {})
+            if not entry.get("ip") and spec.get("ip"):
+                entry.update(ip=spec["ip"], port=spec["ports"][0])
+            if spec.get("mac") and not entry.get("mac"):
+                entry["mac"] = spec["mac"].lower()
+        for role in list(self.devices):
+            if role not in self.roles:
+                del self.devices[role]
+
+    def reload_config(self, path: str | Path) -> None:
+        """@brief Re-read the discovery configuration file and apply it in place."""
+        self.apply_config(self._load_config(path))
+
+    def endpoint(self, role: str) -> tuple[str, int] | None:
+        """@brief Current endpoint of a role.
+        @return Tuple (ip, port) or None if the device has not been found yet.
+        """
+        entry = self.devices.get(role, {})
+        if entry.get("ip"):
+            return entry["ip"], entry["port"]
+        return None
+
+    def on_change(self, role: str, callback: Callable[[str, int], None]) -> None:
+        """@brief Call a function with (ip, port) whenever the endpoint of a role moves.
+
+        The callback is also called once right away if the endpoint is known.
+        """
+        self._callbacks.setdefault(role, []).append(callback)
+        endpoint = self.endpoint(role)
+        if endpoint:
+            callback(*endpoint)
+
+    def watch_liveness(self, role: str) -> None:
+        """@brief Take the liveness of a role from report() instead of probing its port.
+
+        For devices that accept only one TCP client, where a probe would
+        compete with the real client.
+        """
+        self.liveness.setdefault(role, None)
+
+    def report(self, role: str, alive: bool) -> None:
+        """@brief Liveness of a watched role, reported by its client after every read."""
+        if role in self.liveness:
+            self.liveness[role] = alive
+
+    def unresolved(self) -> list[str]:
+        """@brief Roles that need a rediscovery.
+
+        These are roles without a known endpoint and watched roles whose
+        client reported them dead. A watched role without a report yet is
+        not included, so its single-client port is not probed at startup.
+
+        @return Role names.
+        """
+        return [role for role in self.roles
+                if self.endpoint(role) is None or self.liveness.get(role) is False]
+
+    def _probe(self, role: str, endpoint: tuple[str, int] | None):
+        """@brief Coroutine telling whether a role's endpoint is alive."""
+        if endpoint is None:
+            return asyncio.sleep(0, False)
+        if role in self.liveness:
+            # No report yet counts as alive
+            return asyncio.sleep(0, self.liveness[role] is not False)
+        return port_open(*endpoint)
+
+    def _set(self, role: str, ip: str, port: int, mac: str | None) -> bool:
+        """@brief Store an endpoint and notify the clients if it moved.
+        @return True if the registry content changed.
+        """
+        entry = self.devices.setdefault(role, {})
+        moved = (entry.get("ip"), entry.get("port")) != (ip, port)
+        changed = moved or (mac and entry.get("mac") != mac)
+        entry.update(ip=ip, port=port, seen=time.time())
+        if mac:
+            entry["mac"] = mac
+        if moved:
+            print(f"discovery: {role} -> {ip}:{port}")
+            for callback in self._callbacks.get(role, []):
+                try:
+                    callback(ip, port)
+                except Exception as e:
+                    print(f"discovery: rebinding {role} failed: {e}")
+        return bool(changed)
+
+    def save(self) -> None:
+        """@brief Persist the registry to the state YAML."""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(self.devices, f, sort_keys=True)
+
+    async def check(self) -> list[str]:
+        """@brief Verify all known endpoints; rediscover the roles that do not answer.
+
+        Roles that were never found are left to the periodic full rescan.
+        A role that stays missing is rediscovered after check_interval,
+        then after twice as long and so on, up to rescan_interval.
+
+        @return Roles that had to be rediscovered.
+        """
+        roles = list(self.roles)
+        endpoints = [self.endpoint(role) for role in roles]
+        alive = await asyncio.gather(*(self._probe(role, ep) for role, ep in zip(roles, endpoints)))
+        arp = ip_scan.read_arp_table()
+        changed = False
+        for role, ep, up in zip(roles, endpoints, alive):
+            if up:
+                self._retry.pop(role, None)
+                changed |= self._set(role, ep[0], ep[1], arp.get(ep[0]))
+        now = time.monotonic()
+        missing = [role for role, ep, up in zip(roles, endpoints, alive)
+                   if ep and not up and self._retry.get(role, (0.0, 0.0))[0] <= now]
+        if missing:
+            for role in missing:
+                delay = self._retry.get(role, (0.0, 0.0))[1]
+                delay = min(2 * delay, self.rescan_interval) if delay else self.check_interval
+                self._retry[role] = (now + delay, delay)
+            await self.rediscover(missing)
+        elif changed:
+            await asyncio.to_thread(self.save)
+        return missing
+
+    async def rediscover(self, roles: list[str] | None = None) -> None:
+        """@brief Sweep the subnet and locate the given roles (default: unresolved()).
+
+        A role is matched by its known MAC, then by its hostname, then by
+        being the only unassigned host with one of its ports open. Without
+        roles to locate nothing is swept.
+
+        @param roles  Role names to locate.
+        """
+        async with self._lock:
+            roles = roles or self.unresolved()
+            if not roles:
+                return
+            hosts = await ip_scan.sweep(self.network)
+            arp = ip_scan.read_arp_table()
+            by_mac = {mac.lower(): ip for ip, mac in arp.items()}
+            ports = {port for role in roles for port in self.roles[role]["ports"]}
+            found = await open_ports(hosts, ports)
+            taken = {e["ip"] for r, e in self.devices.items() if r not in roles and e.get("ip")}
+
+            for role in roles:
+                spec, entry = self.roles[role], self.devices.get(role, {})
+                candidates = []
+                if entry.get("mac") and entry["mac"] in by_mac:
+                    candidates.append(by_mac[entry["mac"]])
+                if spec.get("hostname"):
+                    candidates.append(await self._resolve(spec["hostname"]))
+                if entry.get("ip"):
+                    candidates.append(entry["ip"])
+                unique = [ip for ip, open_ in found.items()
+                          if ip not in taken and open_ & set(spec["ports"])]
+                if len(unique) == 1:
+                    candidates.append(unique[0])
+
+                for ip in candidates:
+                    role_ports = [p for p in spec["ports"] if p in found.get(ip, ())]
+                    if ip and role_ports:
+                        self._set(role, ip, role_ports[0], arp.get(ip))
+                        taken.add(ip)
+                        break
+                else:
+                    print(f"discovery: {role} not found")
+            await asyncio.to_thread(self.save)
+
+    @staticmethod
+    async def _resolve(hostname: str) -> str | None:
+        """@brief Resolve a hostname to an IPv4 address (None on failure)."""
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(hostname, None, family=socket.AF_INET)
+            return infos[0][4][0]
+        except (OSError, IndexError):
+            return None
+
+    async def run(self) -> None:
+        """@brief Rediscover the unresolved roles now and then, check the endpoints in between.
+
+        The first rediscovery runs right away; if it fails, it is repeated
+        at the next check. Once every role is resolved the periodic
+        rediscovery does not sweep the subnet at all.
+        """
+        last_scan = None
+        while True:
+            try:
+                if last_scan is None or time.monotonic() - last_scan >= self.rescan_interval:
+                    await self.rediscover()
+                    last_scan = time.monotonic()
+                else:
+                    await self.check()
+            except Exception as e:
+                print(f"discovery failed: {e}")
+            await asyncio.sleep(self.check_interval)
@@ -0,0 +1,248 @@
+## @file client.py
+#  @brief Async ETA REST API client with a shared keep-alive pool.
+#
+#  Fetches many ETA variable URIs in parallel over one connection pool
+#  with bounded concurrency, per-URI retries, an overall timeout budget
+#  and latency statistics. Managed variable sets (/user/vars/<name>)
+#  allow reading many variables with a single request.
+
+import asyncio
+import base64
+import statistics
+import time
+import xml.etree.ElementTree as ET
+import aiohttp
+
+## @name Defaults
+## @{
+DEFAULT_CONCURRENCY = 4    ## Parallel requests the ETA touch web server handles well
+DEFAULT_RETRIES = 2        ## Extra attempts per URI after the first failure
+DEFAULT_TIMEOUT = 10       ## Timeout per request [s]
+DEFAULT_BUDGET = 120       ## Timeout budget for one fetch_all() run [s]
+## @}
+
+
+def normalize_uri(uri: str) -> str:
+    """@brief Bring a variable URI into the '/120/10101/0/0/12080' form.
+
+    Varset responses list member URIs without the leading slash.
+
+    @param uri  Variable URI with or without leading slash.
+    @return URI with exactly one leading slash.
+    """
+    return "/" + uri.strip().lstrip("/")
+
+
+def parse_variable(elem: ET.Element) -> dict:
+    """@brief Convert a <variable> or <value> element into a typed value.
+
+    The raw integer text is divided by 'scaleFactor' and rounded to
+    'decPlaces'; values without decimal places stay int.
+
+    @param elem  XML element with scaleFactor/decPlaces/unit/strValue attributes.
+    @return dict with 'value' (int/float/None), 'unit' and 'str' keys.
+    """
+    scale = int(elem.get("scaleFactor", 1) or 1)
+    dec_places = int(elem.get("decPlaces", 0) or 0)
+    try:
+        raw = int((elem.text or "").strip())
+        value = round(raw / scale, dec_places) if dec_places else round(raw / scale)
+    except ValueError:
+        value = None
+    return {"value": value, "unit": elem.get("unit", ""), "str": elem.get("strValue", "")}
+
+
+class EtaClient:
+    """@brief Async client for the ETA heating REST/XML API.
+
+    The aiohttp session is created lazily on first use because it needs
+    a running event loop. The Basic auth header is built once and sent
+    with every request.
+
+    @param base_url     API base URL, e.g. 'http://192.168.188.50:8080/user'.
+    @param username     ETA web user.
+    @param password     ETA web password.
+    @param concurrency  Maximum number of parallel requests.
+    @param retries      Extra attempts per URI on failure.
+    @param timeout      Timeout per request in seconds.
+    """
+
+    def __init__(self, base_url: str, username: str, password: str,
+                 concurrency: int = DEFAULT_CONCURRENCY, retries: int = DEFAULT_RETRIES,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        credentials = base64.b64encode(f"{username}:{password}".encode("latin1")).decode()
+        self._headers = {"Authorization": f"Basic {credentials}"}
+        self.concurrency = concurrency
+        self.retries = retries
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: aiohttp.ClientSession | None = None
+        ## @brief Statistics of the last fetch_all() run.
+        self.stats: dict = {}
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """@brief Create the pooled keep-alive session (if needed).
+        @return Shared aiohttp ClientSession.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._timeout)
+        return self._session
+
+    async def request(self, method: str, path: str) -> str:
+        """@brief Send a request below the base URL and return the body text.
+
+        @param method  HTTP method ('GET', 'PUT', 'DELETE').
+        @param path    Path below base_url, e.g. '/var/120/10101/0/0/12080'.
+        @return Response body.
+        @exception aiohttp.ClientError on HTTP or connection errors.
+        """
+        session = await self._get_session()
+        async with session.request(method, f"{self.base_url}{path}", headers=self._headers) as resp:
+            resp.raise_for_status()
+            return await resp.text()
+
+    async def get_text(self, path: str) -> str:
+        """@brief GET a path below the base URL.
+        @param path  Path below base_url.
+        @return Response body.
+        """
+        return await self.request("GET", path)
+
+    async def get_bytes(self, path: str) -> bytes:
+        """@brief GET a path below the base URL as raw bytes.
+        @param path  Path below base_url.
+        @return Response body.
+        """
+        session = await self._get_session()
+        async with session.get(f"{self.base_url}{path}", headers=self._headers) as resp:
+            resp.raise_for_status()
+            return await resp.read()
+
+    async def get_value(self, uri: str) -> str | None:
+        """@brief Fetch the current value of one variable URI.
+
+        @param uri  ETA variable URI path (e.g. '/120/10101/0/0/12080').
+        @return Value string, or None if the response has no value.
+        @exception aiohttp.ClientError, asyncio.TimeoutError, ET.ParseError on failure.
+        """
+        root = ET.fromstring(await self.get_text(f"/var{uri}"))
+        val_elem = root.find(".//{*}value")
+        if val_elem is not None and val_elem.text:
+            return val_elem.text.strip()
+        return None
+
+    async def fetch_all(self, uris: list[str], budget: float = DEFAULT_BUDGET,
+                        progress: bool = True) -> dict[str, str | None]:
+        """@brief Fetch all variable URIs in parallel.
+
+        At most 'concurrency' requests are in flight. Each URI is retried
+        up to 'retries' times with a short backoff, during which its slot
+        is free for the other URIs. URIs not finished when the budget is
+        used up are returned as None.
+
+        @param uris      List of variable URIs.
+        @param budget    Overall timeout budget in seconds.
+        @param progress  Print progress every 10 %.
+        @return dict mapping each URI to its value string or None.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: dict[str, str | None] = {uri: None for uri in uris}
+        latencies: list[float] = []
+        counters = {"ok": 0, "failed": 0, "retries": 0, "done": 0}
+        step = max(1, len(uris) // 10)
+        start = time.perf_counter()
+
+        async def fetch(uri: str) -> None:
+            for attempt in range(self.retries + 1):
+                async with semaphore:
+                    t0 = time.perf_counter()
+                    try:
+                        results[uri] = await self.get_value(uri)
+                        latencies.append(time.perf_counter() - t0)
+                        counters["ok"] += 1
+                        break
+                    except (aiohttp.ClientError, asyncio.TimeoutError, ET.ParseError) as e:
+                        error = e
+                if attempt == self.retries:
+                    print(f"Fehler bei URI {uri}: {error}")
+                    counters["failed"] += 1
+                else:
+                    counters["retries"] += 1
+                    await asyncio.sleep(0.5 * (attempt + 1))
+            counters["done"] += 1
+            if progress and counters["done"] % step == 0:
+                print(f"{counters['done']}/{len(uris)} Werte abgefragt")
+
+        tasks = [asyncio.create_task(fetch(uri)) for uri in uris]
+        _, pending = await asyncio.wait(tasks, timeout=budget) if tasks else (set(), set())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        self.stats = {
+            "requested": len(uris),
+            "ok": counters["ok"],
+            "failed": counters["failed"],
+            "timed_out": len(pending),
+            "retries": counters["retries"],
+            "elapsed_s": round(time.perf_counter() - start, 3),
+            "latency_mean_s": round(statistics.mean(latencies), 4) if latencies else None,
+            "latency_max_s": round(max(latencies), 4) if latencies else None,
+        }
+        return results
+
+    async def varset_members(self, name: str) -> set[str] | None:
+        """@brief List the member URIs of a variable set.
+
+        @param name  Varset name.
+        @return Set of normalized URIs, or None if the varset does not exist.
+        """
+        try:
+            root = ET.fromstring(await self.get_text(f"/vars/{name}"))
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
+                return None
+            raise
+        return {normalize_uri(var.get("uri", "")) for var in root.findall(".//{*}variable")}
+
+    async def sync_varset(self, name: str, uris: list[str]) -> dict:
+        """@brief Make the varset contain exactly the given URIs.
+
+        Creates the varset if needed and only adds / removes the members
+        that differ from the current server state.
+
+        @param name  Varset name.
+        @param uris  Wanted member URIs.
+        @return dict with the 'added' and 'removed' URI lists.
+        """
+        wanted = {normalize_uri(uri) for uri in uris}
+        members = await self.varset_members(name)
+        if members is None:
+            await self.request("PUT", f"/vars/{name}")
+            members = set()
+        added = sorted(wanted - members)
+        removed = sorted(members - wanted)
+        for uri in added:
+            await self.request("PUT", f"/vars/{name}{uri}")
+        for uri in removed:
+            await self.request("DELETE", f"/vars/{name}{uri}")
+        return {"added": added, "removed": removed}
+
+    async def read_varset(self, name: str) -> dict[str, dict]:
+        """@brief Read all members of a varset with one GET.
+
+        @param name  Varset name.
+        @return dict mapping normalized URI to parse_variable() result.
+        """
+        root = ET.fromstring(await self.get_text(f"/vars/{name}"))
+        return {
+            normalize_uri(var.get("uri", "")): parse_variable(var)
+            for var in root.findall(".//{*}variable")
+        }
+
+    async def close(self) -> None:
+        """@brief Close the pooled session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -2,15 +2,27 @@
 #  @brief ETA heating system API client.
 #
 #  Connects to an ETA pellet heating system via its REST/XML API,
-#  retrieves the menu tree, reads variable values by URI, and
-#  saves the enriched data as a YAML file.
+#  retrieves the menu tree, reads variable values by URI (EtaClient), and
+#  saves the enriched data as a YAML file. With '--varset' the variables
+#  listed in eta_config.json are synced into a managed varset and read
+#  with a single request instead. Variables may be configured by menu
+#  name/path; they are resolved through the cached MenuIndex, so no menu
+#  download is needed for polling.
+#
+#  Run from the src directory as 'python -m eta.eta [--varset|--index]'.
 
+import asyncio
 import os
+import sys
 import requests
 from requests.auth import HTTPBasicAuth
 import yaml
 import xml.etree.ElementTree as ET
 import re
+from discovery.registry import load_endpoint
+from eta.client import EtaClient
+from eta.menu_index import MenuIndex
+from eta.telemetry import load_config, read_configured_values
 
 ## @name Configuration
 ## @{
@@ -27,21 +39,40 @@ def load_ip_from_yaml(hostname: str) -> str | None:
     @param hostname  The hostname to search for (e.g. 'ETA.fritz.box').
     @return IP address string, or None if not found.
     """
+    if not os.path.exists(yaml_file):
+        return None
     with open(yaml_file, "r", encoding="utf-8") as file:
-        hosts = yaml.safe_load(file)
+        hosts = yaml.safe_load(file) or []
         for host in hosts:
             if host.get('hostname') == hostname:
                 return host.get('ip')
     return None
 
 
-# Resolve ETA IP at module load time
-ip = load_ip_from_yaml("ETA.fritz.box")
-if ip:
-    base_url = f"http://{ip}:8080/user"
-    print(f"Die URL lautet: {base_url}")
-else:
-    print("Hostname 'ETA.fritz.box' wurde nicht gefunden.")
+def resolve_base_url(hostname: str = "ETA.fritz.box") -> str:
+    """@brief Resolve the ETA base URL from the device registry or the network YAML file.
+
+    The 'eta' role of the discovery registry (user/devices.yaml) wins;
+    the scan result of ip_scan.py is the fallback. Called explicitly by
+    the script entry instead of at import time, so importing this module
+    has no file access or output.
+
+    @param hostname  Hostname of the ETA heating in the network YAML.
+    @return The (possibly updated) base URL.
+    """
+    global base_url
+    endpoint = load_endpoint("eta")
+    if endpoint:
+        base_url = f"http://{endpoint[0]}:{endpoint[1]}/user"
+        print(f"Die URL lautet: {base_url}")
+        return base_url
+    ip = load_ip_from_yaml(hostname)
+    if ip:
+        base_url = f"http://{ip}:8080/user"
+        print(f"Die URL lautet: {base_url}")
+    else:
+        print(f"Hostname '{hostname}' wurde nicht gefunden.")
+    return base_url
 
 
 def get_menu_tree() -> ET.Element | None:
@@ -95,35 +126,15 @@ def xml_to_dict(elem: ET.Element) -> dict:
     return {strip_namespace(elem.tag): d}
 
 
-def get_value_for_uri(uri: str) -> str | None:
-    """@brief Fetch the current value for a specific ETA variable URI.
-
-    @param uri  ETA variable URI path (e.g. '/120/10101/0/0/12080').
-    @return Value string, or None on error.
-    """
-    try:
-        url = f"{base_url}/var{uri}"
-        print(url)
-        resp = requests.get(url, auth=HTTPBasicAuth(username, password), timeout=10)
-        resp.raise_for_status()
-        print(resp.text)
-        root = ET.fromstring(resp.text)
-        val_elem = root.find('.//{*}value')
-        if val_elem is not None:
-            return val_elem.text.strip()
-    except Exception as e:
-        print(f"Fehler bei URI {uri}: {e}")
-    return None
-
-
-def enrich_with_values(obj: dict | list) -> None:
-    """@brief Recursively enrich a parsed menu tree with live values.
+def collect_variable_nodes(obj: dict | list, nodes: list[dict]) -> list[dict]:
+    """@brief Recursively collect all menu nodes with a variable URI.
 
-    Walks the dict/list structure looking for entries with a 'uri' key.
-    If the URI matches the numeric pattern (e.g. /120/10101), fetches
-    the live value from the ETA API and inserts it.
+    Walks the dict/list structure looking for entries with a 'uri' key
+    matching the numeric pattern (e.g. /120/10101).
 
-    @param obj  Nested dict or list from xml_to_dict().
+    @param obj    Nested dict or list from xml_to_dict().
+    @param nodes  List the matching node dicts are appended to.
+    @return The nodes list.
     """
     if isinstance(obj, dict):
         for key, value in obj.items():
@@ -131,15 +142,70 @@ def enrich_with_values(obj: dict | list) -> None:
                 if "uri" in value:
                     uri = value["uri"]
                     if re.fullmatch(r"(\/\d+)+", uri):
-                        val = get_value_for_uri(uri)
-                        if val is not None:
-                            value["value"] = val
+                        nodes.append(value)
                     else:
                         print(f"⏭️  URI übersprungen (nicht variabel): {uri}")
-                enrich_with_values(value)
+                collect_variable_nodes(value, nodes)
             elif isinstance(value, list):
                 for item in value:
-                    enrich_with_values(item)
+                    collect_variable_nodes(item, nodes)
+    return nodes
+
+
+async def enrich_with_values_async(obj: dict | list) -> dict:
+    """@brief Enrich a parsed menu tree with live values fetched in parallel.
+
+    All variable URIs are fetched concurrently over one pooled
+    connection (see EtaClient.fetch_all).
+
+    @param obj  Nested dict or list from xml_to_dict().
+    @return Fetch statistics of the EtaClient.
+    """
+    nodes = collect_variable_nodes(obj, [])
+    client = EtaClient(base_url, username, password)
+    try:
+        values = await client.fetch_all(list({node["uri"] for node in nodes}))
+    finally:
+        await client.close()
+    for node in nodes:
+        val = values.get(node["uri"])
+        if val is not None:
+            node["value"] = val
+    return client.stats
+
+
+def enrich_with_values(obj: dict | list) -> None:
+    """@brief Enrich a parsed menu tree with live values.
+
+    Synchronous wrapper around enrich_with_values_async().
+
+    @param obj  Nested dict or list from xml_to_dict().
+    """
+    stats = asyncio.run(enrich_with_values_async(obj))
+    print(f"Statistik: {stats}")
+
+
+async def _read_varset_main() -> None:
+    """@brief Script entry for '--varset': sync, read once and print the values."""
+    client = EtaClient(base_url, username, password)
+    try:
+        values = await read_configured_values(load_config(), client)
+    finally:
+        await client.close()
+    for name, value in values.items():
+        print(f"{name:30} {value['value']} {value['unit']}")
+
+
+async def _refresh_index_main() -> None:
+    """@brief Script entry for '--index': refresh the cached menu index."""
+    client = EtaClient(base_url, username, password)
+    index = MenuIndex()
+    try:
+        changed = await index.refresh(client, max_age=0)
+    finally:
+        await client.close()
+    state = "neu aufgebaut" if changed else "unverändert"
+    print(f"Menüindex {state}: {len(index.entries)} Knoten, {len(index.variables())} Variablen")
 
 
 def save_yaml(data: dict, filename: str) -> None:
@@ -153,6 +219,13 @@ def save_yaml(data: dict, filename: str) -> None:
 
 
 if __name__ == "__main__":
+    resolve_base_url()
+    if "--varset" in sys.argv:
+        asyncio.run(_read_varset_main())
+        sys.exit(0)
+    if "--index" in sys.argv:
+        asyncio.run(_refresh_index_main())
+        sys.exit(0)
     try:
         root = get_menu_tree()
         parsed = xml_to_dict(root)
@@ -0,0 +1,141 @@
+## @file menu_index.py
+#  @brief Cached flat index of the ETA menu tree.
+#
+#  Parses the /user/menu XML once with streaming iterparse into a flat
+#  URI -> {name, path, variable} index. The index is stored on disk
+#  together with a hash of the menu response and only re-parsed when
+#  the menu actually changes.
+
+import hashlib
+import io
+import json
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from core.offload import run_blocking
+from eta.client import EtaClient
+
+## Default location of the persisted index
+DEFAULT_CACHE = "user/eta_menu_index.json"
+
+## Variable URIs are purely numeric paths, e.g. /120/10101/0/0/12080
+VARIABLE_URI = re.compile(r"(/\d+)+")
+
+
+def parse_menu(data: bytes) -> dict[str, dict]:
+    """@brief Stream-parse the menu XML into a flat index.
+
+    Elements are cleared as soon as they are closed, so memory stays
+    flat regardless of the tree size.
+
+    @param data  Raw /user/menu response body.
+    @return dict mapping URI to {'name', 'path', 'variable'}.
+    """
+    index: dict[str, dict] = {}
+    names: list[str] = []
+    for event, elem in ET.iterparse(io.BytesIO(data), events=("start", "end")):
+        if event == "start":
+            name = elem.get("name", "")
+            names.append(name)
+            uri = elem.get("uri")
+            if uri and name:
+                index[uri] = {
+                    "name": name,
+                    "path": "/".join(n for n in names if n),
+                    "variable": VARIABLE_URI.fullmatch(uri) is not None,
+                }
+        else:
+            names.pop()
+            elem.clear()
+    return index
+
+
+class MenuIndex:
+    """@brief Persistent URI/name index of the ETA menu tree.
+
+    @param cache_path  JSON file the index is stored in.
+    """
+
+    def __init__(self, cache_path: str | Path = DEFAULT_CACHE):
+        self.cache_path = Path(cache_path)
+        ## @brief SHA-256 of the menu response the index was built from.
+        self.digest: str | None = None
+        ## @brief Unix time of the last successful refresh.
+        self.fetched: float = 0
+        ## @brief dict mapping URI to {'name', 'path', 'variable'}.
+        self.entries: dict[str, dict] = {}
+        self.load()
+
+    def load(self) -> bool:
+        """@brief Load the index from the cache file if it exists.
+        @return True if a cached index was loaded.
+        """
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        self.digest = cache.get("digest")
+        self.fetched = cache.get("fetched", 0)
+        self.entries = cache.get("entries", {})
+        return True
+
+    def save(self) -> None:
+        """@brief Write the index to the cache file (atomically via rename)."""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"digest": self.digest, "fetched": self.fetched, "entries": self.entries},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self.cache_path)
+
+    def update(self, data: bytes) -> bool:
+        """@brief Update the index from a menu response.
+
+        The response is only parsed if its hash differs from the cached one.
+
+        @param data  Raw /user/menu response body.
+        @return True if the menu changed and the index was rebuilt.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        changed = digest != self.digest
+        if changed:
+            self.entries = parse_menu(data)
+            self.digest = digest
+        self.fetched = time.time()
+        self.save()
+        return changed
+
+    async def refresh(self, client: EtaClient, max_age: float = 86400) -> bool:
+        """@brief Download the menu if the cached index is older than max_age.
+
+        Hashing, parsing and saving run in the blocking-call executor.
+
+        @param client   EtaClient used for the download.
+        @param max_age  Maximum index age in seconds before a download.
+        @return True if the menu changed and the index was rebuilt.
+        """
+        if self.entries and time.time() - self.fetched < max_age:
+            return False
+        data = await client.get_bytes("/menu")
+        return await run_blocking(self.update, data)
+
+    def variables(self) -> list[str]:
+        """@brief All variable URIs of the menu.
+        @return List of URIs.
+        """
+        return [uri for uri, entry in self.entries.items() if entry["variable"]]
+
+    def by_name(self, name: str) -> list[str]:
+        """@brief Find URIs by node name or full menu path.
+
+        @param name  Node name (e.g. 'Kesseltemperatur') or path
+                     (e.g. 'Kessel/Kessel/Kesseltemperatur').
+        @return List of matching URIs.
+        """
+        return [
+            uri for uri, entry in self.entries.items()
+            if entry["name"] == name or entry["path"] == name
+        ]
@@ -0,0 +1,244 @@
+## @file telemetry.py
+#  @brief Continuous ETA heating telemetry for the main scheduler.
+#
+#  Reads the configured ETA variables with one varset request per poll
+#  and writes typed fields to the 'eta' InfluxDB bucket. Only values that
+#  moved beyond their per-variable deadband are written, which keeps the
+#  write volume low for slow thermal signals.
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+from influxdb_client import Point
+from influx_bucket import influxConfig
+from eta.client import EtaClient, normalize_uri
+from eta.menu_index import MenuIndex
+
+## @name Configuration
+## @{
+config_file = "eta/eta_config.json"
+DEFAULT_BASE_URL = "http://ETA.fritz.box:8080/user"
+DEFAULT_INTERVAL = 60      ## Poll interval [s]
+DEFAULT_BUCKET = "eta"
+## @}
+
+
+def load_config(path: str = config_file) -> dict:
+    """@brief Load the ETA variable configuration (varset name and variables).
+
+    @param path  Path to the JSON configuration file.
+    @return dict with 'varset' and 'variables' entries.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def needs_index(config: dict) -> bool:
+    """@brief True if some variable is configured by 'path' and needs the menu index."""
+    return any("uri" not in var for var in config["variables"])
+
+
+def resolve_variables(config: dict, index: MenuIndex | None) -> dict[str, str]:
+    """@brief Map every configured variable to its URI.
+
+    Entries with 'uri' are used as they are; entries with only 'path'
+    are looked up in the menu index.
+
+    @param config  Configuration from load_config().
+    @param index   MenuIndex for name lookups (None: only 'uri' entries).
+    @return dict mapping normalized URI to the configured variable name.
+    """
+    names = {}
+    for var in config["variables"]:
+        uri = var.get("uri")
+        if uri is None:
+            matches = index.by_name(var["path"]) if index is not None else []
+            if not matches:
+                print(f"Variable '{var['path']}' nicht im Menü gefunden")
+                continue
+            uri = matches[0]
+        names[normalize_uri(uri)] = var.get("name", var.get("path", uri))
+    return names
+
+
+async def read_configured_values(config: dict, client: EtaClient, sync: bool = True,
+                                 index: MenuIndex | None = None) -> dict:
+    """@brief Read all configured variables with one varset request.
+
+    On the first call (sync=True) the managed varset is brought in line
+    with the configured URI list; only changed members are added or
+    removed. Every further poll costs a single GET.
+
+    @param config  Configuration from load_config().
+    @param client  EtaClient to use.
+    @param sync    Sync the varset members before reading.
+    @param index   MenuIndex for variables configured by 'path' (default:
+                   loaded from the cache and refreshed if needed).
+    @return dict mapping variable name to parse_variable() result.
+    """
+    name = config["varset"]
+    if index is None and needs_index(config):
+        index = MenuIndex()
+        await index.refresh(client)
+    names = resolve_variables(config, index)
+    if sync:
+        changes = await client.sync_varset(name, list(names))
+        if changes["added"] or changes["removed"]:
+            print(f"Varset {name} aktualisiert: {changes}")
+    values = await client.read_varset(name)
+    return {names[uri]: value for uri, value in values.items() if uri in names}
+
+
+def _with_address(base_url: str, ip: str, port: int) -> str:
+    """@brief Base URL with another host and port (scheme and path kept)."""
+    return urlunsplit(urlsplit(base_url)._replace(netloc=f"{ip}:{port}"))
+
+
+def _mtime(path: Path) -> int | None:
+    """@brief Modification time of a file in ns (None if it does not exist)."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class EtaTelemetry:
+    """@brief Periodic ETA poller writing deadband-filtered values to InfluxDB.
+
+    @param config_path  Path to the ETA JSON configuration.
+    @param history      Optional TimeSeriesStore receiving every polled value.
+    """
+
+    def __init__(self, config_path: str | Path = config_file, history=None):
+        self.client: EtaClient | None = None
+        self.influx: influxConfig | None = None
+        self.history = history
+        ## @brief Last written value per variable name.
+        self.last: dict[str, float] = {}
+        ## @brief MenuIndex, built on the first poll that needs it.
+        self._index: MenuIndex | None = None
+        ## @brief mtime of the index cache file the index was loaded from.
+        self._index_mtime: int | None = None
+        self.apply_config(load_config(config_path))
+
+    def apply_config(self, config: dict) -> None:
+        """@brief Apply a (changed) configuration without losing the deadband state.
+
+        The varset is re-synced on the next poll. The ETA client is only
+        replaced if the base URL changed, the InfluxDB client only if the
+        bucket changed; replaced clients are closed (the ETA session in
+        the background).
+
+        @param config  ETA configuration dict.
+        """
+        deadbands = {
+            var.get("name", var.get("path", var.get("uri"))): var.get("deadband", 0)
+            for var in config["variables"]
+        }
+        base_url = config.get("base_url", DEFAULT_BASE_URL)
+        if self.client is None or self.client.base_url != base_url.rstrip("/"):
+            old, self.client = self.client, EtaClient(
+                base_url,
+                os.environ.get("ETA_USERNAME", "your-username"),
+                os.environ.get("ETA_PASSWORD", "your-password"),
+            )
+            if old is not None:
+                try:
+                    asyncio.get_running_loop().create_task(old.close())
+                except RuntimeError:
+                    pass
+        self.config = config
+        ## @brief Poll interval in seconds.
+        self.interval = config.get("interval", DEFAULT_INTERVAL)
+        bucket = config.get("bucket", DEFAULT_BUCKET)
+        if self.influx is None or self.influx.INFLUX_BUCKET != bucket:
+            old, self.influx = self.influx, influxConfig(bucket)
+            if old is not None:
+                old.close()
+        ## @brief Absolute deadband per variable name (0 = every change).
+        self.deadbands = deadbands
+        self._synced = False
+
+    def reload_config(self, path: str | Path, endpoint: tuple[str, int] | None = None) -> None:
+        """@brief Re-read the ETA configuration file and apply it in place.
+        @param path      Path to the JSON configuration file.
+        @param endpoint  (ip, port) used instead of the file's address (e.g. found by discovery).
+        """
+        config = load_config(path)
+        if endpoint is not None:
+            config["base_url"] = _with_address(config.get("base_url", DEFAULT_BASE_URL), *endpoint)
+        self.apply_config(config)
+
+    def rebind(self, ip: str, port: int) -> None:
+        """@brief Point the client to a new address of the heating.
+
+        Path and scheme of the base URL are kept; the old client session is
+        closed in the background.
+
+        @param ip    New IP address.
+        @param port  New port.
+        """
+        base_url = _with_address(self.config.get("base_url", DEFAULT_BASE_URL), ip, port)
+        self.apply_config({**self.config, "base_url": base_url})
+
+    def changed_fields(self, values: dict) -> dict[str, float]:
+        """@brief Select the values that moved beyond their deadband.
+
+        @param values  dict mapping variable name to parse_variable() result.
+        @return dict of field name to value that should be written.
+        """
+        fields = {}
+        for name, entry in values.items():
+            value = entry["value"]
+            if value is None:
+                continue
+            last = self.last.get(name)
+            if last is None or abs(value - last) > self.deadbands.get(name, 0):
+                fields[name] = float(value)
+                self.last[name] = value
+        return fields
+
+    async def menu_index(self) -> MenuIndex | None:
+        """@brief MenuIndex for the variables configured by 'path'.
+
+        The index is built once and refreshed when it is older than a day;
+        the cache file is only re-read when its mtime changed (e.g. after
+        'eta.py --index').
+
+        @return The index, or None if every variable has a 'uri'.
+        """
+        if not needs_index(self.config):
+            return None
+        if self._index is None:
+            self._index = MenuIndex()
+        elif _mtime(self._index.cache_path) != self._index_mtime:
+            self._index.load()
+        await self._index.refresh(self.client)
+        self._index_mtime = _mtime(self._index.cache_path)
+        return self._index
+
+    async def poll(self) -> dict[str, float]:
+        """@brief Read all configured variables and write the changed ones.
+
+        The varset is synced on the first successful poll only. All values
+        (not only the changed ones) go to the 'eta' history buffer.
+
+        @return dict of the fields written to InfluxDB.
+        """
+        values = await read_configured_values(self.config, self.client, sync=not self._synced,
+                                              index=await self.menu_index())
+        self._synced = True
+        if self.history is not None:
+            self.history.append("eta", time.time(),
+                                {name: entry["value"] for name, entry in values.items()}, self.interval)
+        fields = self.changed_fields(values)
+        if fields:
+            point = Point("eta_data")
+            for name, value in fields.items():
+                point.field(name, value)
+            point.time(time.time_ns())
+            await self.influx.write_bucket_point_async(point)
+        return fields
@@ -0,0 +1,123 @@
+## @file http_client.py
+#  @brief Async go-eCharger HTTP API v2 client.
+#
+#  Alternative / fallback data source to the MQTT path. Keeps a single
+#  keep-alive session per wallbox, fetches only the needed status keys
+#  via the 'filter=' query and sends several setpoints in one /api/set
+#  request. A request that fails because the wallbox closed the idle
+#  keep-alive socket is retried on a fresh connection.
+
+import asyncio
+import json
+import aiohttp
+
+## Status keys fetched by default (see wallbox_api_keys.md)
+DEFAULT_KEYS = ["alw", "amp", "car", "cus", "dwo", "eto", "frc", "wh", "nrg", "tma", "psm", "modelStatus"]
+
+
+class GoEHttpClient:
+    """@brief Async client for the local go-eCharger HTTP API v2.
+
+    The aiohttp session is created lazily on first use because it needs
+    a running event loop. The connector is limited to one connection so
+    all requests reuse the same keep-alive socket.
+
+    @param ip       IP address or hostname of the wallbox.
+    @param keys     Status keys requested with every get_status() call.
+    @param timeout  Total request timeout in seconds.
+    @param retries  Retries after a connection error (not after timeouts or HTTP errors).
+    """
+
+    def __init__(self, ip: str, keys: list[str] | None = None, timeout: float = 3, retries: int = 1):
+        self.base_url = f"http://{ip}/api"
+        self.keys = list(keys or DEFAULT_KEYS)
+        self.retries = retries
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: aiohttp.ClientSession | None = None
+        ## @brief Latest status received by get_status().
+        self.received: dict = {}
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """@brief Create the keep-alive session (if needed).
+        @return Shared aiohttp ClientSession.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=1, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._timeout)
+        return self._session
+
+    async def _get_json(self, path: str, params: dict):
+        """@brief GET a JSON document, retrying after connection errors.
+
+        @param path    Path below /api, e.g. 'status'.
+        @param params  Query parameters.
+        @return Decoded JSON body.
+        @exception aiohttp.ClientError or asyncio.TimeoutError if all attempts fail.
+        """
+        session = await self._get_session()
+        for attempt in range(self.retries + 1):
+            try:
+                async with session.get(f"{self.base_url}/{path}", params=params) as resp:
+                    resp.raise_for_status()
+                    return await resp.json(content_type=None)
+            except aiohttp.ClientConnectionError:
+                if attempt == self.retries:
+                    raise
+
+    @property
+    def message(self) -> dict:
+        """@brief Latest received status, same shape as MQTTManager.message.
+        @return Copy of the last status dict.
+        """
+        return dict(self.received)
+
+    async def get_status(self, keys: list[str] | None = None) -> dict | None:
+        """@brief Read the filtered wallbox status.
+
+        @param keys  Optional list of keys overriding the default filter.
+        @return dict of status values, or None on error.
+        """
+        params = {"filter": ",".join(keys or self.keys)}
+        try:
+            status = await self._get_json("status", params)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"error get wallbox status: {e}")
+            return None
+        self.received.update(status)
+        return status
+
+    async def set_values(self, values: dict) -> dict | None:
+        """@brief Send several setpoints in a single /api/set request.
+
+        API v2 expects every value JSON encoded, e.g. amp=10&frc=0&psm=1.
+
+        @param values  dict of key -> value, e.g. {'amp': 10, 'frc': 0}.
+        @return dict with the per-key result of the wallbox, or None on error.
+        """
+        params = {key: json.dumps(value) for key, value in values.items()}
+        try:
+            return await self._get_json("set", params)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"error set wallbox values {values}: {e}")
+            return None
+
+    async def set_keys(self, data: list) -> dict | None:
+        """@brief Send MQTT-style [topic, value] pairs as one HTTP request.
+
+        Accepts the same publisher lists as MQTTManager.set_keys; the key
+        is taken from the topic ('go-eCharger/<serial>/amp/set' -> 'amp').
+
+        @param data  List of [topic, value] pairs.
+        @return Result of set_values().
+        """
+        values = {}
+        for topic, value in data:
+            parts = [p for p in topic.split("/") if p != "set"]
+            values[parts[-1]] = value
+        return await self.set_values(values)
+
+    async def close(self) -> None:
+        """@brief Close the keep-alive session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -182,13 +182,14 @@ def set_inverter_data(inverter_data: dict) -> None:
     battery_soc = inverter_data["battery_soc"]["value"]
 
 
-def write_data_to_influx(status_data: dict) -> None:
+def write_data_to_influx(status_data: dict, device: str = SSE) -> None:
     """@brief Write full wallbox status to InfluxDB.
 
     @param status_data  dict with wallbox status fields from MQTT.
+    @param device       go-eCharger serial number used as InfluxDB tag.
     """
     try:
-        point = Point("goE_wallbox").tag("device", SSE)
+        point = Point("goE_wallbox").tag("device", device)
         point.field("ampere", float(status_data["amp"]))
         point.field("carState", float(status_data["car"]))
         point.field("cableLock", float(status_data["cus"]))
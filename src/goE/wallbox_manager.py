@@ -0,0 +1,454 @@
+## @file wallbox_manager.py
+#  @brief Load-balanced PV surplus charging for several go-eChargers.
+#
+#  Manages N go-eChargers defined in a JSON configuration. The available
+#  PV surplus is split between all chargers with a connected car, either
+#  by priority or evenly, while the combined current per phase stays
+#  below the house fuse limit. The phase mode (psm) of every charger is
+#  chosen so that the total used surplus is as high as possible.
+#  Chargers with an 'ip' in the config fall back to the go-e HTTP API
+#  when MQTT status is missing or the broker is not connected.
+
+import asyncio
+import itertools
+import json
+import math
+import time
+from pathlib import Path
+from influxdb_client import Point
+from mqtt_client import MQTTManager
+from goE import wallbox_control
+from goE.http_client import GoEHttpClient
+from core.offload import run_blocking
+from core.timeseries import TimeSeriesStore
+from goE.wallbox_control import (
+    CHARGING_ON, CHARGING_OFF, DEFAULT_CHARGE_CURRENT, MIN_CHARGE_CURRENT,
+    BATTERY_MIN_CHARGE_SOC, SINGLE_PHASE_MIN_POWER,
+    PHASE_SWITCH_AUTOMATIC, PHASE_SWITCH_SINGLE, PHASE_SWITCH_THREE,
+)
+
+## @name Distribution Strategies
+## @{
+STRATEGY_PRIORITY = "priority"  ## Fill chargers one after another in priority order
+STRATEGY_FAIR = "fair"          ## Raise all chargers round-robin in 1 A steps
+## @}
+
+## @name Car States (go-e 'car' key)
+## @{
+CAR_CHARGING = 2
+CAR_WAITING = 3
+## @}
+
+## Status keys every charger subscribes to via MQTT
+STATUS_KEYS = ["alw", "amp", "car", "cus", "dwo", "eto", "frc", "wh", "nrg", "tma", "psm", "modelStatus"]
+
+## Keys required to take a charger into account for the surplus distribution
+REQUIRED_KEYS = ("amp", "car", "nrg", "psm")
+
+## Window of the PV / house consumption averages [s] (10 samples at 2 s)
+MEAN_WINDOW = 20
+
+
+def distribute_surplus(surplus_power: float, chargers: list[dict], fuse_limit: int,
+                       strategy: str = STRATEGY_PRIORITY, voltage: int = 230) -> dict:
+    """@brief Split the surplus power between several chargers.
+
+    Every combination of phase modes (off, 1-phase, 3-phase) is evaluated.
+    For each combination all active chargers start at their minimum current
+    and are raised in 1 A steps (by priority or round-robin) as long as the
+    surplus and the per-phase fuse limit allow it. The combination using
+    the most power wins; ties prefer higher priority chargers (priority)
+    or more active chargers (fair), then unchanged phase modes, then
+    higher priority.
+
+    @param surplus_power  Available surplus power in Watts.
+    @param chargers       Charger dicts with 'serial', 'priority', 'min_current',
+                          'max_current', 'phase' and 'active_phases'.
+    @param fuse_limit     Maximum combined current per phase in Ampere.
+    @param strategy       STRATEGY_PRIORITY or STRATEGY_FAIR.
+    @param voltage        Grid voltage per phase in Volts.
+    @return dict mapping serial to {'ampere': int, 'phases': 0|1|3}.
+    """
+    ordered = sorted(chargers, key=lambda c: c["priority"])
+    best_key = None
+    best = {c["serial"]: {"ampere": 0, "phases": 0} for c in ordered}
+
+    for modes in itertools.product((0, 1, 3), repeat=len(ordered)):
+        amps = _fill_currents(ordered, modes, surplus_power, fuse_limit, strategy, voltage)
+        if amps is None:
+            continue
+        power = _total_power(modes, amps, voltage)
+        by_priority = tuple(1 if m else 0 for m in modes)
+        rank = sum(by_priority) if strategy == STRATEGY_FAIR else by_priority
+        unchanged = sum(1 for c, m in zip(ordered, modes) if c.get("active_phases", 0) == m)
+        key = (power, rank, unchanged, by_priority)
+        if best_key is None or key > best_key:
+            best_key = key
+            best = {
+                c["serial"]: {"ampere": a, "phases": m}
+                for c, m, a in zip(ordered, modes, amps)
+            }
+    return best
+
+
+def _fill_currents(chargers: list[dict], modes: tuple, surplus_power: float,
+                   fuse_limit: int, strategy: str, voltage: int) -> list[int] | None:
+    """@brief Assign currents for one fixed combination of phase modes.
+
+    @return List of currents per charger, or None if even the minimum
+            currents exceed the surplus or the fuse limit.
+    """
+    amps = [c["min_current"] if m else 0 for c, m in zip(chargers, modes)]
+    if _total_power(modes, amps, voltage) > surplus_power:
+        return None
+    if max(_phase_load(chargers, modes, amps)) > fuse_limit:
+        return None
+
+    def can_raise(i: int) -> bool:
+        if amps[i] >= chargers[i]["max_current"]:
+            return False
+        if _total_power(modes, amps, voltage) + modes[i] * voltage > surplus_power:
+            return False
+        amps[i] += 1
+        ok = max(_phase_load(chargers, modes, amps)) <= fuse_limit
+        amps[i] -= 1
+        return ok
+
+    active = [i for i, m in enumerate(modes) if m]
+    if strategy == STRATEGY_FAIR:
+        progress = True
+        while progress:
+            progress = False
+            for i in active:
+                if can_raise(i):
+                    amps[i] += 1
+                    progress = True
+    else:
+        for i in active:
+            while can_raise(i):
+                amps[i] += 1
+    return amps
+
+
+def _total_power(modes: tuple, amps: list[int], voltage: int) -> float:
+    """@brief Charging power of all chargers (P = U * I * phases)."""
+    return sum(m * voltage * a for m, a in zip(modes, amps))
+
+
+def _phase_load(chargers: list[dict], modes: tuple, amps: list[int]) -> list[int]:
+    """@brief Combined charger current on L1, L2 and L3.
+
+    3-phase chargers load all phases, 1-phase chargers only the phase
+    they are wired to ('phase' in the config, 1..3).
+    """
+    load = [0, 0, 0]
+    for c, m, a in zip(chargers, modes, amps):
+        if m == 3:
+            load = [x + a for x in load]
+        elif m == 1:
+            load[c.get("phase", 1) - 1] += a
+    return load
+
+
+def _host(ip: str, port: int) -> str:
+    """@brief HTTP host of a charger ('ip' or 'ip:port')."""
+    return ip if port == 80 else f"{ip}:{port}"
+
+
+class WallboxManager:
+    """@brief Surplus charging controller for N go-eChargers.
+
+    Takes the PV / house consumption averages from the time-series
+    history, reads the status of every charger from the shared MQTTManager
+    and evaluates all chargers in a single pass per control cycle.
+
+    @param config_path  Path to the JSON wallbox configuration.
+    @param mqtt_client  Shared MQTTManager used for status and commands.
+    @param history      Shared TimeSeriesStore the caller appends the inverter
+                        samples to; without one the manager keeps its own.
+    """
+
+    def __init__(self, config_path: str | Path, mqtt_client: MQTTManager,
+                 history: TimeSeriesStore | None = None):
+        self.mqtt = mqtt_client
+        ## @brief Recent inverter and wallbox samples.
+        self.history = history if history is not None else TimeSeriesStore(hours=1)
+        self._own_history = history is None
+        ## @brief Per-charger configuration and control state.
+        self.chargers: list[dict] = []
+        ## @brief HTTP fallback clients keyed by serial (only chargers with 'ip').
+        self.http: dict[str, GoEHttpClient] = {}
+        self.apply_config(self._load_config(config_path))
+
+        self.ppv_mean: float = 0
+        self.house_power_use_mean: float = 0
+        self.battery_soc: int = 100
+
+    def apply_config(self, config: dict) -> None:
+        """@brief Apply limits, thresholds and the charger list.
+
+        Control state (charging flag, active phases) of chargers that stay
+        in the config and the sample history are kept, so this can be
+        called on a running manager. HTTP clients of removed chargers or
+        changed addresses are closed in the background.
+
+        @param config  Wallbox configuration dict.
+        """
+        strategy = config.get("strategy", STRATEGY_PRIORITY)
+        if strategy not in (STRATEGY_PRIORITY, STRATEGY_FAIR):
+            raise ValueError(f"Unknown wallbox strategy: {strategy}")
+        chargers = [self._make_charger(entry) for entry in config["chargers"]]
+
+        ## @brief Distribution strategy (STRATEGY_PRIORITY or STRATEGY_FAIR).
+        self.strategy = strategy
+        ## @brief Maximum combined charger current per phase [A].
+        self.fuse_limit = config.get("fuse_limit", 32)
+        self.voltage = config.get("voltage", 230)
+        ## @brief Minimum average PV power before any surplus is distributed [W].
+        self.min_pv_power = config.get("min_pv_power", SINGLE_PHASE_MIN_POWER)
+        ## @brief House battery SOC at or below which the low-battery rule applies [%].
+        self.battery_min_charge_soc = config.get("battery_min_charge_soc", BATTERY_MIN_CHARGE_SOC)
+
+        previous = {charger["serial"]: charger for charger in self.chargers}
+        for charger in chargers:
+            old = previous.get(charger["serial"])
+            if old:
+                charger["charging_on"] = old["charging_on"]
+                charger["active_phases"] = old["active_phases"]
+        self.chargers = chargers
+        old_http = self.http
+        self.http = {
+            charger["serial"]: (
+                old_http[charger["serial"]]
+                if charger["serial"] in old_http and previous[charger["serial"]]["ip"] == charger["ip"]
+                else GoEHttpClient(charger["ip"], STATUS_KEYS)
+            )
+            for charger in self.chargers if charger["ip"]
+        }
+        for serial, client in old_http.items():
+            if self.http.get(serial) is not client:
+                self._close_later(client)
+        self.mqtt.subscribe_topics([
+            f"{charger['prefix']}{key}" for charger in self.chargers for key in STATUS_KEYS
+        ])
+
+    def rebind_charger(self, serial: str, ip: str, port: int = 80) -> None:
+        """@brief Use a new address for the HTTP fallback of a charger.
+
+        @param serial  Charger serial number.
+        @param ip      New IP address.
+        @param port    HTTP port.
+        """
+        host = _host(ip, port)
+        for charger in self.chargers:
+            if charger["serial"] != serial or charger["ip"] == host:
+                continue
+            charger["ip"] = host
+            old = self.http.get(serial)
+            self.http[serial] = GoEHttpClient(host, STATUS_KEYS)
+            if old is not None:
+                self._close_later(old)
+
+    @staticmethod
+    def _close_later(client: GoEHttpClient) -> None:
+        """@brief Close a replaced HTTP client in the background (no-op without a running loop)."""
+        try:
+            asyncio.get_running_loop().create_task(client.close())
+        except RuntimeError:
+            pass
+
+    def reload_config(self, path: str | Path, endpoints: dict[str, tuple[str, int]] | None = None) -> None:
+        """@brief Re-read the wallbox configuration file and apply it in place.
+        @param path       Path to the JSON configuration file.
+        @param endpoints  Serial -> (ip, port) used instead of the file's 'ip' (e.g. found by discovery).
+        """
+        config = self._load_config(path)
+        for entry in config["chargers"]:
+            endpoint = (endpoints or {}).get(str(entry["serial"]))
+            if endpoint is not None:
+                entry["ip"] = _host(*endpoint)
+        self.apply_config(config)
+
+    @staticmethod
+    def _load_config(path: str | Path) -> dict:
+        """@brief Load the wallbox configuration from a JSON file.
+        @param path  Path to the JSON configuration file.
+        @return dict with configuration data.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _make_charger(entry: dict) -> dict:
+        """@brief Build the runtime charger dict from a config entry.
+        @param entry  Charger entry from the 'chargers' config list.
+        @return Charger dict with defaults and control state.
+        """
+        serial = str(entry["serial"])
+        return {
+            "serial": serial,
+            "name": entry.get("name", serial),
+            "priority": entry.get("priority", 1),
+            "min_current": entry.get("min_current", MIN_CHARGE_CURRENT),
+            "max_current": entry.get("max_current", 14),
+            "phase": entry.get("phase", 1),
+            "ip": entry.get("ip"),
+            "prefix": f"go-eCharger/{serial}/",
+            "charging_on": False,
+            "active_phases": 0,
+        }
+
+    def set_inverter_data(self, inverter_data: dict) -> None:
+        """@brief Update the averages from the latest inverter readings.
+
+        With a shared history the sample must already be appended to its
+        'inverter' buffer; an own history is fed here.
+
+        Values missing in the sample (failed register reads) keep the
+        previous averages and SOC.
+
+        @param inverter_data  dict with 'ppv', 'house_consumption', and 'battery_soc' keys.
+        """
+        now = time.time()
+        latest_ppv = inverter_data.get("ppv")
+        latest_house = inverter_data.get("house_consumption")
+        if self._own_history:
+            self.history.append("inverter", now, {"ppv": latest_ppv, "house_consumption": latest_house})
+        samples = self.history.buffer("inverter")
+        ppv = samples.mean("ppv", MEAN_WINDOW, now)
+        house = samples.mean("house_consumption", MEAN_WINDOW, now)
+        if not math.isnan(ppv):
+            self.ppv_mean = ppv
+        elif latest_ppv is not None:
+            self.ppv_mean = latest_ppv
+        if not math.isnan(house):
+            self.house_power_use_mean = house
+        elif latest_house is not None:
+            self.house_power_use_mean = latest_house
+        soc = inverter_data.get("battery_soc")
+        if isinstance(soc, dict) and soc.get("value") is not None:
+            self.battery_soc = soc["value"]
+
+    def surplus_power(self, charging_power: float) -> float:
+        """@brief Calculate the PV surplus available for all chargers.
+
+        The power currently drawn by the chargers is part of the house
+        consumption and is therefore added back.
+
+        @param charging_power  Sum of the power drawn by all charging cars [W].
+        @return Surplus power in Watts.
+        """
+        if self.ppv_mean < self.min_pv_power:
+            return 0
+        return self.ppv_mean - (self.house_power_use_mean - charging_power)
+
+    async def read_status(self, charger: dict) -> dict:
+        """@brief Get the status of one charger, MQTT first, HTTP as fallback.
+
+        @param charger  Charger dict.
+        @return Status dict (possibly incomplete).
+        """
+        status = self.mqtt.messages_for(charger["prefix"])
+        client = self.http.get(charger["serial"])
+        if client and (not self.mqtt.connected or not all(key in status for key in REQUIRED_KEYS)):
+            status.update(await client.get_status() or {})
+        return status
+
+    async def control(self) -> None:
+        """@brief Evaluate all chargers in one pass and send the commands.
+
+        Chargers without complete status are skipped; chargers without
+        a waiting or charging car get no share of the surplus.
+        """
+        eligible = []
+        charging_power = 0
+        statuses = await asyncio.gather(*(self.read_status(c) for c in self.chargers))
+        for charger, status in zip(self.chargers, statuses):
+            if not all(key in status for key in REQUIRED_KEYS):
+                print(f"wallbox {charger['name']}: no status received yet")
+                continue
+            await run_blocking(wallbox_control.write_data_to_influx, status, charger["serial"])
+            if status["car"] in (CAR_CHARGING, CAR_WAITING):
+                eligible.append(charger)
+            if status["car"] == CAR_CHARGING:
+                charging_power += status["nrg"][11]
+
+        surplus = self.surplus_power(charging_power)
+        print(f"surplus power: {surplus}W for {len(eligible)} wallbox(es)")
+        targets = distribute_surplus(surplus, eligible, self.fuse_limit, self.strategy, self.voltage)
+
+        if (eligible and not any(t["ampere"] for t in targets.values())
+                and self.battery_soc <= self.battery_min_charge_soc and self.ppv_mean == 0):
+            first = min(eligible, key=lambda c: c["priority"])
+            ampere = max(MIN_CHARGE_CURRENT, first["min_current"])
+            print(f"battery low SOC {self.battery_soc}%, set {ampere}A on {first['name']}")
+            targets[first["serial"]] = {"ampere": ampere, "phases": 1}
+
+        for charger in self.chargers:
+            await self._apply(charger, targets.get(charger["serial"]))
+
+    async def _send(self, charger: dict, data: list) -> None:
+        """@brief Send [topic, value] commands via MQTT, or via HTTP if the broker is down.
+
+        @param charger  Charger dict.
+        @param data     List of [topic, value] pairs.
+        """
+        client = self.http.get(charger["serial"])
+        if client and not self.mqtt.connected:
+            await client.set_keys(data)
+        else:
+            await self.mqtt.set_keys_async(data)
+
+    async def _apply(self, charger: dict, target: dict | None) -> None:
+        """@brief Send amp/frc/psm commands for one charger.
+
+        @param charger  Charger dict.
+        @param target   dict with 'ampere' and 'phases', or None if not eligible.
+        """
+        prefix = charger["prefix"]
+        if target and target["ampere"] >= charger["min_current"]:
+            # Force the chosen mode: with 'automatic' the charger may pick the
+            # other one and break the per-phase fuse accounting
+            psm = PHASE_SWITCH_SINGLE if target["phases"] == 1 else PHASE_SWITCH_THREE
+            print(f"wallbox {charger['name']}: charge current set to {target['ampere']}A on {target['phases']} phase(s)")
+            charger["charging_on"] = True
+            charger["active_phases"] = target["phases"]
+            await self._send(charger, [
+                [f"{prefix}amp/set", target["ampere"]],
+                [f"{prefix}frc/set", CHARGING_ON],
+                [f"{prefix}psm/set", psm],
+            ])
+        elif charger["charging_on"]:
+            print(f"wallbox {charger['name']}: stop charging")
+            charger["charging_on"] = False
+            charger["active_phases"] = 0
+            await self._send(charger, [
+                [f"{prefix}amp/set", DEFAULT_CHARGE_CURRENT],
+                [f"{prefix}frc/set", CHARGING_OFF],
+                [f"{prefix}psm/set", PHASE_SWITCH_AUTOMATIC],
+            ])
+
+    async def write_current_energy_to_influx(self) -> dict[str, float]:
+        """@brief Write the current power of every charger to InfluxDB.
+
+        Called at 2s intervals independently of the full status write.
+        The power values are also appended to the 'wallbox' history as
+        '<serial>_power'.
+
+        @return dict of '<serial>_power' to power [W] of the chargers that answered.
+        """
+        powers = {}
+        for charger in self.chargers:
+            status = self.mqtt.messages_for(charger["prefix"])
+            try:
+                power = float(status["nrg"][11])
+                powers[f"{charger['serial']}_power"] = power
+                point = Point("goE_wallbox").tag("device", charger["serial"])
+                point.field("currentEnergy", power)
+                point.time(time.time_ns())
+                await wallbox_control.influx.write_bucket_point_async(point)
+            except Exception as e:
+                print(f"error writing goE current energy data of {charger['name']} to influxDB: {e}")
+        if powers:
+            self.history.append("wallbox", time.time(), powers)
+        return powers
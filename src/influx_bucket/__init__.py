@@ -1,6 +1,10 @@
 import os
+import threading
+import time
 from influxdb_client import InfluxDBClient, Point
 from influxdb_client.client.write_api import SYNCHRONOUS
+from core.offload import run_blocking
+from core.metrics import INFLUX_BATCH, INFLUX_WRITE
 
 class influxConfig:
     def __init__(self, bucket):
@@ -8,16 +12,46 @@ class influxConfig:
         self.INFLUX_TOKEN = os.environ.get("INFLUX_TOKEN")
         self.INFLUX_ORG = "dominik"
         self.INFLUX_BUCKET = bucket
-        # InfluxDB Client initialisieren
-        self.client = InfluxDBClient(url=self.INFLUX_URL, token=self.INFLUX_TOKEN, org=self.INFLUX_ORG)
-        self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
+        # InfluxDB Client wird erst beim ersten Zugriff initialisiert
+        self._client = None
+        self._write_api = None
+        self._lock = threading.Lock()
+        self._write_metric = INFLUX_WRITE.labels(bucket)
+        self._batch_metric = INFLUX_BATCH.labels(bucket)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = InfluxDBClient(url=self.INFLUX_URL, token=self.INFLUX_TOKEN, org=self.INFLUX_ORG)
+        return self._client
+
+    @property
+    def write_api(self):
+        if self._write_api is None:
+            client = self.client
+            with self._lock:
+                if self._write_api is None:
+                    self._write_api = client.write_api(write_options=SYNCHRONOUS)
+        return self._write_api
+
     def write_bucket_point(self, point):
+        self._batch_metric.observe(len(point) if isinstance(point, list) else 1)
         try:
+            t0 = time.perf_counter()
             self.write_api.write(bucket=self.INFLUX_BUCKET, org=self.INFLUX_ORG, record=point)
+            self._write_metric.observe(time.perf_counter() - t0)
         except Exception as e:
-            print(f"Error writing to InfluxDB: {e}")   
-
-
-
+            print(f"Error writing to InfluxDB: {e}")
 
+    async def write_bucket_point_async(self, point):
+        # SYNCHRONOUS-Write im Thread-Pool, blockiert die Event-Loop nicht
+        await run_blocking(self.write_bucket_point, point)
 
+    def close(self):
+        # Client schließen; beim nächsten Zugriff wird ein neuer erzeugt
+        with self._lock:
+            client, self._client, self._write_api = self._client, None, None
+        if client is not None:
+            client.close()
@@ -1,10 +1,18 @@
 ## @file readInverter.py
 #  @brief GoodWe inverter data acquisition and InfluxDB logging.
 #
-#  Reads real-time and periodic data from a GoodWe ET inverter via Modbus TCP,
-#  calculates derived values (total PV power, house consumption), and writes
-#  measurement points to InfluxDB.
+#  Reads real-time and periodic data from the GoodWe inverters defined in
+#  inverter_config.json via Modbus TCP, calculates the derived values
+#  declared in derived_config.json (total PV power, house consumption, ...),
+#  and writes device-tagged measurement points to InfluxDB.
+#  All inverters are polled concurrently, each with its own timeout on
+#  the Modbus acquisition, so a slow gateway does not delay the others;
+#  the InfluxDB and MQTT writes follow once all reads are in. The first configured inverter
+#  is the primary one that feeds the wallbox control and the energy counters.
 
+import asyncio
+import json
+from core.derived import DerivedMetrics
 from modbus import modbus_client
 from datetime import datetime, timezone
 from influxdb_client import Point
@@ -20,14 +28,68 @@ influx = influxConfig(INFLUX_BUCKET)
 
 ## @name Modbus Connection Parameters
 ## @{
-IP = "192.168.188.200"    ## RS485-to-Ethernet adapter IP
-PORT = 4196               ## Modbus TCP port
-UNIT = 247                ## GoodWe ET Modbus device address
+INVERTER_CONFIG = "inverter/inverter_config.json"
+PORT = 4196               ## Default Modbus TCP port
+UNIT = 247                ## Default GoodWe ET Modbus device address
+READ_TIMEOUT = 1.5        ## Default per-device Modbus timeout of the fast cycle [s]
+SLOW_READ_TIMEOUT = 10    ## Default per-device Modbus timeout of the 60s cycle [s]
 ## @}
 
-## Inverter serial number used as InfluxDB tag
+## Serial number of the primary inverter, used as InfluxDB tag
 DEVICE = "9020KETT232W0041"
 
+## @name InfluxDB Fields
+## @{
+## Fast-cycle point: (field, register, type)
+FAST_FIELDS = (
+    ("vpv1", "pv1_voltage", float), ("ipv1", "pv1_current", float), ("ppv1", "pv1_power", int),
+    ("vpv2", "pv2_voltage", float), ("ipv2", "pv2_current", float), ("ppv2", "pv2_power", int),
+    ("vpv3", "pv3_voltage", float), ("ipv3", "pv3_current", float), ("ppv3", "pv3_power", int),
+    ("vpv4", "pv4_voltage", float), ("ipv4", "pv4_current", float), ("ppv4", "pv4_power", int),
+    ("total_inverter_power", "total_inverter_power", float),
+    ("active_power", "active_power", float),
+    ("backup_ptotal", "backup_ptotal", float),
+    ("load_ptotal", "total_load_power", float),
+    ("ups_load", "ups_load_percent", float),
+    ("temperature_air", "air_temperature", float),
+    ("temperature_module", "temperature_module", float),
+    ("temperature", "temperature_radiator", float),
+    ("vbattery1", "vbattery1", float),
+    ("ibattery1", "ibattery1", float),
+    ("pbattery1", "pbattery1", float),
+    ("battery_mode", "battery_mode", float),
+    ("battery_soc", "battery_soc", float),
+)
+## 60s-cycle point: (field, register)
+SLOW_FIELDS = (
+    ("grid_mode", "grid_mode"),
+    ("warning_code", "warning_code"),
+    ("operation_mode", "operation_mode"),
+    ("e_total", "pv_energy_total"),
+    ("e_day", "pv_energy_day"),
+    ("e_total_exp", "energy_total_feed"),
+    ("h_total", "feeding_hours_total"),
+    ("e_day_exp", "energy_day_sell"),
+    ("e_total_imp", "energy_total_buy"),
+    ("e_day_imp", "energy_day_buy"),
+    ("e_load_total", "energy_total_load"),
+    ("e_load_day", "energy_load_day"),
+    ("e_bat_charge_total", "battery_charge_energy"),
+    ("e_bat_charge_day", "charge_energy_day"),
+    ("e_bat_discharge_total", "battery_discharge_energy"),
+    ("e_bat_discharge_day", "discharge_energy_day"),
+    ("battery_bms", "bms_status"),
+    ("battery_temperature", "bms_pack_temperature"),
+    ("battery_soh", "bms_soh"),
+    ("battery_warning_l", "bms_warning_code_l"),
+    ("rssi", "rssi"),
+    ("meter_test_status", "meter_connect_status"),
+    ("meter_comm_status", "meter_communication_status"),
+    ("meter_freq", "meter_frequency"),
+    ("work_mode", "work_mode"),
+)
+## @}
+
 ## @name MQTT Publisher Array Indices
 ## @{
 PPV_ARRAY_INDEX = 0
@@ -36,18 +98,159 @@ BSC_ARRAY_INDEX = 2
 PB_ARRAY_INDEX = 3
 ## @}
 
-## MQTT topics and initial values for publishing inverter data
-publisher = [
-    [f"goodwe/{DEVICE}/ppv", 0],
-    [f"goodwe/{DEVICE}/house_consumption", 0],
-    [f"goodwe/{DEVICE}/battery_soc", 0],
-    [f"goodwe/{DEVICE}/pbattery", 0]
-]
 
-inverter = modbus_client(IP, PORT, UNIT, "inverter/register_config.json", "inverter/register_config_10s.json")
+def make_publisher(device: str) -> list:
+    """@brief MQTT topics and initial values for publishing the data of one inverter."""
+    return [
+        [f"goodwe/{device}/ppv", 0],
+        [f"goodwe/{device}/house_consumption", 0],
+        [f"goodwe/{device}/battery_soc", 0],
+        [f"goodwe/{device}/pbattery", 0]
+    ]
+
+
+## MQTT topics and initial values of the primary inverter
+publisher = make_publisher(DEVICE)
+
+## Derived metric definitions (register names -> expressions)
+DERIVED_CONFIG = "inverter/derived_config.json"
+
+## Modbus client, created on first use by get_inverter()
+inverter: modbus_client | None = None
+
+## Compiled derived metrics, created on first use by get_derived()
+derived: DerivedMetrics | None = None
+
+## All configured inverters, created on first use by get_inverters()
+inverters: list | None = None
+
+## Callables (device, ok) notified after every read cycle of an inverter
+read_listeners: list = []
+
+
+def load_inverter_config(path: str = INVERTER_CONFIG) -> dict:
+    """@brief Load the inverter definitions from a JSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _make_client(entry: dict) -> modbus_client:
+    """@brief Modbus client for one inverter entry of the config."""
+    return modbus_client(entry["ip"], entry.get("port", PORT), entry.get("unit", UNIT),
+                         entry["registers"], entry.get("registers_10s"))
+
+
+class InverterDevice:
+    """@brief One configured inverter: Modbus client, InfluxDB tag and MQTT topics.
+
+    @param entry         Inverter entry of the config.
+    @param timeout       Default Modbus timeout of the fast cycle [s].
+    @param primary       True for the first inverter, whose client is the shared get_inverter().
+    @param slow_timeout  Default Modbus timeout of the 60s cycle [s].
+    """
+
+    def __init__(self, entry: dict, timeout: float = READ_TIMEOUT, primary: bool = False,
+                 slow_timeout: float = SLOW_READ_TIMEOUT):
+        self.device = entry["device"]
+        ## @brief Discovery role of the gateway (optional).
+        self.role = entry.get("role")
+        self.timeout = entry.get("timeout", timeout)
+        self.slow_timeout = entry.get("slow_timeout", slow_timeout)
+        self.primary = primary
+        self.register_files = [entry["registers"]] + ([entry["registers_10s"]] if entry.get("registers_10s") else [])
+        self.publisher = publisher if self.device == DEVICE else make_publisher(self.device)
+        self._client = None if primary else _make_client(entry)
+
+    @property
+    def client(self) -> modbus_client:
+        """@brief Modbus client of this inverter."""
+        return get_inverter() if self.primary else self._client
+
+
+def get_inverter() -> modbus_client:
+    """@brief Return the primary inverter's Modbus client, creating it on first use.
+
+    Creating the client parses both register JSON files, so it is
+    deferred until the first read instead of happening at import.
+
+    @return Shared modbus_client instance.
+    """
+    global inverter
+    if inverter is None:
+        inverter = _make_client(load_inverter_config()["inverters"][0])
+    return inverter
+
+
+def get_inverters() -> list[InverterDevice]:
+    """@brief Return all configured inverters, the primary one first.
+    @return List of InverterDevice.
+    """
+    global inverters
+    if inverters is None:
+        config = load_inverter_config()
+        timeout = config.get("timeout", READ_TIMEOUT)
+        slow_timeout = config.get("slow_timeout", SLOW_READ_TIMEOUT)
+        inverters = [InverterDevice(entry, timeout, primary=(i == 0), slow_timeout=slow_timeout)
+                     for i, entry in enumerate(config["inverters"])]
+    return inverters
+
+
+def get_derived() -> DerivedMetrics:
+    """@brief Return the compiled derived metrics, loading them on first use.
+    @return Shared DerivedMetrics instance.
+    """
+    global derived
+    if derived is None:
+        derived = DerivedMetrics(DERIVED_CONFIG)
+    return derived
+
+
+def register_value(data: dict, name: str) -> float | None:
+    """@brief Value of one register in a data dict, None if it is missing or its read failed."""
+    entry = data.get(name)
+    return entry.get("value") if isinstance(entry, dict) else None
+
+
+def register_values(data: dict) -> dict[str, float]:
+    """@brief Plain values of the register dicts in a data dict (failed reads omitted)."""
+    return {name: entry["value"] for name, entry in data.items()
+            if isinstance(entry, dict) and entry.get("value") is not None}
+
+
+async def acquire_fast(device: InverterDevice | None = None) -> dict:
+    """@brief Read the fast-cycle registers and add the derived values.
+
+    @param device  Inverter to read (default: the primary one).
+    @return dict containing all register values plus the derived values
+            (e.g. 'ppv', 'house_consumption') that could be computed.
+    """
+    client = device.client if device is not None else get_inverter()
+    data = await client.get_register1()
+    data.update(get_derived().evaluate(register_values(data)))
+    return data
+
+
+def publisher_values(data: dict, publisher: list = publisher) -> list:
+    """@brief Fill an MQTT publisher list from a fast-cycle data dict.
+
+    Values that are missing in the data keep their last published value.
+
+    @param data       dict from acquire_fast().
+    @param publisher  Publisher list of the inverter (default: the primary one).
+    @return The publisher list of [topic, value] pairs.
+    """
+    publisher[PPV_ARRAY_INDEX][1] = data.get("ppv", publisher[PPV_ARRAY_INDEX][1])
+    publisher[HC_ARRAY_INDEX][1] = data.get("house_consumption", publisher[HC_ARRAY_INDEX][1])
+    soc = register_value(data, "battery_soc")
+    pbattery = register_value(data, "pbattery1")
+    if soc is not None:
+        publisher[BSC_ARRAY_INDEX][1] = soc
+    if pbattery is not None:
+        publisher[PB_ARRAY_INDEX][1] = pbattery
+    return publisher
 
 
-async def read_inverter(mqtt_client: MQTTManager) -> dict:
+async def read_inverter(mqtt_client: MQTTManager, device: InverterDevice | None = None) -> dict:
     """@brief Read fast-changing inverter registers (2s cycle) and publish via MQTT.
 
     Reads PV voltages, currents, powers, battery and grid data.
@@ -55,98 +258,158 @@ async def read_inverter(mqtt_client: MQTTManager) -> dict:
     an InfluxDB data point and publishes key values via MQTT.
 
     @param mqtt_client  MQTTManager instance for publishing data.
+    @param device       Inverter to read (default: the primary one).
     @return dict containing all register values plus computed fields.
     """
-    data = await inverter.get_register1()
-    data["ppv"] = data["pv1_power"]["value"]+data["pv2_power"]["value"]+data["pv3_power"]["value"]+data["pv4_power"]["value"]
-    data["house_consumption"] = (data["ppv"])+(data["pbattery1"]["value"])-(data["active_power"]["value"]) 
-    _write_fast_points(data)
-    publisher[PPV_ARRAY_INDEX][1] = data["ppv"]
-    publisher[HC_ARRAY_INDEX][1] = data["house_consumption"]
-    publisher[BSC_ARRAY_INDEX][1] = data["battery_soc"]["value"]
-    publisher[PB_ARRAY_INDEX][1] = data["pbattery1"]["value"]
-    mqtt_client.set_keys(publisher)
+    data = await acquire_fast(device)
+    await publish_fast(mqtt_client, data, device)
+    return data
+
+
+async def publish_fast(mqtt_client: MQTTManager, data: dict, device: InverterDevice | None = None) -> None:
+    """@brief Write a fast-cycle sample to InfluxDB and publish its key values via MQTT.
+
+    @param mqtt_client  MQTTManager instance for publishing data.
+    @param data         dict from acquire_fast().
+    @param device       Inverter the data belongs to (default: the primary one).
+    """
+    if device is None:
+        await _write_fast_points(data)
+        await mqtt_client.set_keys_async(publisher_values(data))
+    else:
+        await influx.write_bucket_point_async(fast_point(data, device=device.device))
+        await mqtt_client.set_keys_async(publisher_values(data, device.publisher))
+
+
+async def _gather_devices(acquire, label: str, slow: bool = False) -> dict:
+    """@brief Run the Modbus acquisition of every inverter concurrently, each with its timeout.
+
+    Only the acquisition is bounded by the timeout; the read listeners
+    get (device, ok) for every inverter.
+
+    @param acquire  Callable(device) returning the acquisition coroutine.
+    @param label    Cycle name for the log messages.
+    @param slow     Use the timeout of the 60s cycle instead of the fast one.
+    @return dict of device serial to result for the inverters that succeeded.
+    """
+    devices = get_inverters()
+    timeouts = [device.slow_timeout if slow else device.timeout for device in devices]
+    results = await asyncio.gather(
+        *(asyncio.wait_for(acquire(device), timeout) for device, timeout in zip(devices, timeouts)),
+        return_exceptions=True,
+    )
+    data = {}
+    for device, timeout, result in zip(devices, timeouts, results):
+        if isinstance(result, asyncio.TimeoutError):
+            print(f"inverter {device.device}: {label} read timed out after {timeout}s")
+        elif isinstance(result, Exception):
+            print(f"inverter {device.device}: {label} read failed: {result}")
+        else:
+            data[device.device] = result
+        for listener in read_listeners:
+            listener(device, device.device in data)
     return data
 
-async def read_inverter_60s_task() -> None:
+
+async def _write_devices(writes: dict, label: str) -> None:
+    """@brief Run the sink writes of the inverters concurrently and log the failed ones.
+
+    @param writes  dict of device serial to write coroutine.
+    @param label   Cycle name for the log messages.
+    """
+    results = await asyncio.gather(*writes.values(), return_exceptions=True)
+    for device, result in zip(writes, results):
+        if isinstance(result, Exception):
+            print(f"inverter {device}: {label} write failed: {result}")
+
+
+async def read_inverters(mqtt_client: MQTTManager) -> dict[str, dict]:
+    """@brief Fast cycle of all configured inverters, polled concurrently.
+
+    @param mqtt_client  MQTTManager instance for publishing data.
+    @return dict of device serial to acquire_fast() dict (failed devices omitted).
+    """
+    results = await _gather_devices(acquire_fast, "fast")
+    await _write_devices({device.device: publish_fast(mqtt_client, results[device.device], device)
+                          for device in get_inverters() if device.device in results}, "fast")
+    return results
+
+
+async def read_inverters_60s() -> None:
+    """@brief Slow cycle of all configured inverters, polled concurrently."""
+    results = await _gather_devices(acquire_slow, "60s", slow=True)
+    await _write_devices({device.device: write_slow(results[device.device], device)
+                          for device in get_inverters() if device.device in results}, "60s")
+
+
+async def acquire_slow(device: InverterDevice | None = None) -> dict:
+    """@brief Read the slow-cycle registers.
+
+    @param device  Inverter to read (default: the primary one).
+    @return dict of register values (None for registers that could not be read).
+    """
+    client = device.client if device is not None else get_inverter()
+    return await client.get_register2()
+
+
+async def read_inverter_60s_task(device: InverterDevice | None = None) -> None:
     """@brief Read slow-changing inverter registers (60s cycle).
 
     Reads energy totals, battery health, meter status, and operational
-    mode data. Writes a single InfluxDB data point.
-    """
-    data = await inverter.get_register2()
-    point = Point("inverter_data").tag("device", DEVICE)
-    point.field("grid_mode", float(data["grid_mode"]["value"]))
-    point.field("warning_code", float(data["warning_code"]["value"]))
-    point.field("operation_mode", float(data["operation_mode"]["value"])) 
-    point.field("e_total", float(data["pv_energy_total"]["value"]))  
-    point.field("e_day", float(data["pv_energy_day"]["value"]))
-    point.field("e_total_exp", float(data["energy_total_feed"]["value"]))
-    point.field("h_total", float(data["feeding_hours_total"]["value"]))
-    point.field("e_day_exp", float(data["energy_day_sell"]["value"])) 
-    point.field("e_total_imp", float(data["energy_total_buy"]["value"]))
-    point.field("e_day_imp", float(data["energy_day_buy"]["value"]))
-    point.field("e_load_total", float(data["energy_total_load"]["value"]))  
-    point.field("e_load_day", float(data["energy_load_day"]["value"]))
-    point.field("e_bat_charge_total", float(data["battery_charge_energy"]["value"]))
-    point.field("e_bat_charge_day", float(data["charge_energy_day"]["value"]))
-    point.field("e_bat_discharge_total", float(data["battery_discharge_energy"]["value"])) 
-    point.field("e_bat_discharge_day", float(data["discharge_energy_day"]["value"]))
-    point.field("battery_bms", float(data["bms_status"]["value"]))
-    point.field("battery_temperature", float(data["bms_pack_temperature"]["value"]))
-    point.field("battery_soh", float(data["bms_soh"]["value"])) 
-    point.field("battery_warning_l", float(data["bms_warning_code_l"]["value"]))
-    point.field("rssi", float(data["rssi"]["value"]))
-    point.field("meter_test_status", float(data["meter_connect_status"]["value"]))
-    point.field("meter_comm_status", float(data["meter_communication_status"]["value"]))        
-    point.field("meter_freq", float(data["meter_frequency"]["value"])) 
-    point.field("work_mode", float(data["work_mode"]["value"]))
+    mode data and writes them with write_slow().
+
+    @param device  Inverter to read (default: the primary one).
+    """
+    await write_slow(await acquire_slow(device), device)
+
+
+async def write_slow(data: dict, device: InverterDevice | None = None) -> None:
+    """@brief Write the slow-cycle registers as a single InfluxDB data point.
+
+    Registers that could not be read are left out.
+
+    @param data    dict from acquire_slow().
+    @param device  Inverter the data belongs to (default: the primary one).
+    """
+    point = Point("inverter_data").tag("device", device.device if device is not None else DEVICE)
+    for field, name in SLOW_FIELDS:
+        value = register_value(data, name)
+        if value is not None:
+            point.field(field, float(value))
     point.time(time.time_ns())
-    influx.write_bucket_point(point)
+    await influx.write_bucket_point_async(point)
 
-def _write_fast_points(data: dict) -> None:
-    """@brief Write fast-cycle inverter measurements to InfluxDB.
+def fast_point(data: dict, time_ns: int | None = None, device: str = DEVICE) -> Point:
+    """@brief Build the fast-cycle InfluxDB point.
 
     Creates an InfluxDB Point with PV string data (voltage, current, power
     for all 4 strings), grid power, temperatures, battery data, and
-    computed house consumption.
+    all derived values present in the data. Registers that could not
+    be read are left out.
+
+    @param data     Dictionary with register values from get_register1().
+    @param time_ns  Sample timestamp in ns (default: now).
+    @param device   Inverter serial used as tag.
+    @return The InfluxDB Point.
+    """
+    point = Point("inverter_data").tag("device", device)
+    for field, name, cast in FAST_FIELDS:
+        value = register_value(data, name)
+        if value is not None:
+            point.field(field, cast(value))
+    for name in get_derived().names:
+        if name in data:
+            point.field(name, float(data[name]))
+    point.time(time_ns or time.time_ns())
+    return point
+
+
+async def _write_fast_points(data: dict) -> None:
+    """@brief Write fast-cycle inverter measurements to InfluxDB.
 
     @param data  Dictionary with register values from get_register1().
     """
-    point = Point("inverter_data").tag("device", DEVICE)
-    # PV String 1
-    point.field("vpv1", float(data["pv1_voltage"]["value"]))
-    point.field("ipv1", float(data["pv1_current"]["value"]))
-    point.field("ppv1", int(data["pv1_power"]["value"]))
-    # PV String 2
-    point.field("vpv2", float(data["pv2_voltage"]["value"]))
-    point.field("ipv2", float(data["pv2_current"]["value"]))
-    point.field("ppv2", int(data["pv2_power"]["value"]))
-    # PV String 3
-    point.field("vpv3", float(data["pv3_voltage"]["value"]))
-    point.field("ipv3", float(data["pv3_current"]["value"]))
-    point.field("ppv3", int(data["pv3_power"]["value"]))
-    # PV String 4
-    point.field("vpv4", float(data["pv4_voltage"]["value"]))
-    point.field("ipv4", float(data["pv4_current"]["value"]))
-    point.field("ppv4", int(data["pv4_power"]["value"]))
-    point.field("ppv", float(data["ppv"])) 
-    point.field("total_inverter_power", float(data["total_inverter_power"]["value"]))
-    point.field("active_power", float(data["active_power"]["value"]))
-    point.field("backup_ptotal", float(data["backup_ptotal"]["value"]))
-    point.field("load_ptotal", float(data["total_load_power"]["value"]))
-    point.field("ups_load", float(data["ups_load_percent"]["value"]))
-    point.field("temperature_air", float(data["air_temperature"]["value"]))
-    point.field("temperature_module", float(data["temperature_module"]["value"]))
-    point.field("temperature", float(data["temperature_radiator"]["value"]))  
-    point.field("vbattery1", float(data["vbattery1"]["value"]))
-    point.field("ibattery1", float(data["ibattery1"]["value"])) 
-    point.field("pbattery1", float(data["pbattery1"]["value"]))
-    point.field("battery_mode", float(data["battery_mode"]["value"]))
-    point.field("house_consumption", float(data["house_consumption"]))
-    point.field("battery_soc", float(data["battery_soc"]["value"]))
-    point.time(time.time_ns())
-    influx.write_bucket_point(point)
+    await influx.write_bucket_point_async(fast_point(data))
 
 if __name__ == "__main__":
     import asyncio
@@ -3,15 +3,27 @@
 #
 #  Scans a /24 subnet via ICMP ping, resolves hostnames and MAC addresses,
 #  optionally queries geolocation via ipinfo.io, and saves results to YAML.
+#
+#  The sweep runs in one asyncio loop: all echo requests go out over a
+#  single unprivileged ICMP datagram socket (Linux, if
+#  net.ipv4.ping_group_range allows it), otherwise every host is probed
+#  with non-blocking TCP connects. MAC addresses come from one read of
+#  /proc/net/arp. Hostname and geolocation lookups run concurrently;
+#  private addresses are never sent to ipinfo.io, and results are cached
+#  per MAC address in CACHE_FILE for CACHE_TTL seconds.
 
+import asyncio
+import contextlib
 import os
 import ipaddress
+import struct
 import subprocess
 import platform
+import re
 import socket
+import time
 import requests
 import yaml
-from concurrent.futures import ThreadPoolExecutor
 
 ## @name Configuration
 ## @{
@@ -21,21 +33,163 @@ OUTPUT_FILE = os.path.join(OUTPUT_DIR, "network_user.yaml")
 GEOLOCATION_API = "https://ipinfo.io/{}/json"  ## Geolocation REST endpoint
 ## @}
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+## @name Sweep Parameters
+## @{
+PING_TIMEOUT = 1.0                  ## Wait for replies after the last request [s]
+TCP_PORTS = (80, 443, 22)           ## Ports for the TCP-connect fallback
+TCP_CONCURRENCY = 128               ## Maximum simultaneously open probe sockets
+RECV_ERROR_LIMIT = 8                ## Consecutive receive errors before giving up on replies
+ARP_TABLE = "/proc/net/arp"
+## @}
+
+## @name Enrichment Parameters
+## @{
+ENRICH_CONCURRENCY = 16             ## Parallel hostname / geolocation lookups
+CACHE_FILE = os.path.join(OUTPUT_DIR, "scan_cache.yaml")
+CACHE_TTL = 24 * 3600               ## Validity of a cached host entry [s]
+LOCAL = "lokal"                     ## City / country of private addresses
+## @}
+
+## MAC address as printed by arp (':' or '-' separated)
+MAC_PATTERN = re.compile(r"^([0-9a-fA-F]{2}[:-]){5}[0-9a-fA-F]{2}$")
+
+
+def _checksum(data: bytes) -> int:
+    """@brief Internet checksum (RFC 1071) of an ICMP message."""
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _echo_request(seq: int) -> bytes:
+    """@brief ICMP echo request; the kernel sets the identifier of datagram sockets."""
+    payload = b"eta-scan"
+    header = struct.pack("!BBHHH", 8, 0, 0, 0, seq)
+    return struct.pack("!BBHHH", 8, 0, _checksum(header + payload), 0, seq) + payload
+
+
+async def icmp_sweep(hosts: list[str], timeout: float = PING_TIMEOUT) -> set[str] | None:
+    """@brief Ping all hosts over one unprivileged ICMP datagram socket.
+
+    @param hosts    IP address strings.
+    @param timeout  Time to wait for replies after the last request [s].
+    @return Set of answering IPs, or None if the kernel does not allow ICMP datagram sockets.
+    """
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+    except (PermissionError, OSError):
+        return None
+    sock.setblocking(False)
+    loop = asyncio.get_running_loop()
+    alive: set[str] = set()
+    wanted = set(hosts)
+
+    async def receive() -> None:
+        errors = 0
+        while True:
+            try:
+                data, (addr, _) = await loop.sock_recvfrom(sock, 1024)
+            except OSError as e:
+                # Single errors (e.g. host unreachable) are normal, a broken socket is not
+                errors += 1
+                if errors >= RECV_ERROR_LIMIT:
+                    print(f"ICMP-Empfang abgebrochen: {e}")
+                    return
+                await asyncio.sleep(0.01 * errors)
+                continue
+            errors = 0
+            if data and data[0] == 0 and addr in wanted:
+                alive.add(addr)
+
+    with sock:
+        receiver = asyncio.create_task(receive())
+        for seq, ip in enumerate(hosts):
+            try:
+                await loop.sock_sendto(sock, _echo_request(seq), (ip, 0))
+            except OSError:
+                pass
+        try:
+            await asyncio.wait_for(asyncio.shield(receiver), timeout)
+        except asyncio.TimeoutError:
+            pass
+        receiver.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await receiver
+    return alive
+
+
+async def tcp_probe(ip: str, semaphore: asyncio.Semaphore, timeout: float = PING_TIMEOUT) -> bool:
+    """@brief Check a host with TCP connects to TCP_PORTS.
+
+    An accepted or refused connection both prove the host is up.
+
+    @param ip         IP address string.
+    @param semaphore  Limits the number of open sockets.
+    @param timeout    Connect timeout per attempt [s].
+    @return True if the host answered on any port.
+    """
+    async def attempt(port: int) -> bool:
+        async with semaphore:
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+                writer.close()
+                return True
+            except ConnectionRefusedError:
+                return True
+            except (OSError, asyncio.TimeoutError):
+                return False
+
+    return any(await asyncio.gather(*(attempt(port) for port in TCP_PORTS)))
+
+
+async def tcp_sweep(hosts: list[str], timeout: float = PING_TIMEOUT) -> set[str]:
+    """@brief Probe all hosts with TCP connects (fallback without ICMP sockets).
+    @return Set of answering IPs.
+    """
+    semaphore = asyncio.Semaphore(TCP_CONCURRENCY)
+    results = await asyncio.gather(*(tcp_probe(ip, semaphore, timeout) for ip in hosts))
+    return {ip for ip, up in zip(hosts, results) if up}
+
+
+async def sweep(network: str, timeout: float = PING_TIMEOUT) -> list[str]:
+    """@brief Find all reachable hosts of a subnet.
+
+    @param network  Subnet in CIDR notation.
+    @param timeout  Probe timeout [s].
+    @return Reachable IPs in address order.
+    """
+    hosts = [str(ip) for ip in ipaddress.ip_network(network, strict=False).hosts()]
+    start = time.perf_counter()
+    alive = await icmp_sweep(hosts, timeout)
+    method = "ICMP"
+    if alive is None:
+        method = "TCP"
+        alive = await tcp_sweep(hosts, timeout)
+    print(f"{method}-Scan: {len(alive)} von {len(hosts)} Hosts erreichbar "
+          f"({time.perf_counter() - start:.2f}s)")
+    return sorted(alive, key=ipaddress.ip_address)
 
 
-def ping(ip: ipaddress.IPv4Address) -> ipaddress.IPv4Address | None:
-    """@brief Ping a single IP address with a 1-second timeout.
+def read_arp_table(path: str = ARP_TABLE) -> dict[str, str]:
+    """@brief Read all complete entries of the kernel ARP table at once.
 
-    @param ip  IPv4Address to ping.
-    @return The IP if reachable, None otherwise.
+    @param path  Path of the ARP table (Linux procfs).
+    @return dict mapping IP to MAC address; empty if the table is not available.
     """
-    param = "-n" if platform.system().lower() == "windows" else "-c"
-    result = subprocess.run(
-        ["ping", param, "1", "-w", "1000", str(ip)],
-        stdout=subprocess.DEVNULL
-    )
-    return ip if result.returncode == 0 else None
+    table = {}
+    try:
+        with open(path, "r", encoding="ascii") as f:
+            next(f, None)
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 4 and int(fields[2], 16) & 0x2 and fields[3] != "00:00:00:00:00:00":
+                    table[fields[0]] = fields[3]
+    except OSError:
+        pass
+    return table
 
 
 def get_hostname(ip: ipaddress.IPv4Address) -> str | None:
@@ -57,17 +211,15 @@ def get_mac_address(ip: ipaddress.IPv4Address) -> str | None:
     @return MAC address string, or None if not found.
     """
     if platform.system().lower() == "windows":
-        result = subprocess.run(["arp", "-a", str(ip)], capture_output=True, text=True)
-        if result.returncode == 0:
-            for line in result.stdout.splitlines():
-                if str(ip) in line:
-                    return line.split()[1]
+        command, column = ["arp", "-a", str(ip)], 1
     else:
-        result = subprocess.run(["arp", "-n", str(ip)], capture_output=True, text=True)
-        if result.returncode == 0:
-            for line in result.stdout.splitlines():
-                if str(ip) in line:
-                    return line.split()[3]
+        command, column = ["arp", "-n", str(ip)], 3
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode == 0:
+        for line in result.stdout.splitlines():
+            fields = line.split()
+            if str(ip) in line and len(fields) > column and MAC_PATTERN.match(fields[column]):
+                return fields[column]
     return None
 
 
@@ -85,42 +237,111 @@ def get_geolocation(ip: ipaddress.IPv4Address) -> tuple[str, str]:
         return "unbekannt", "unbekannt"
 
 
+def load_cache(filename: str = CACHE_FILE) -> dict[str, dict]:
+    """@brief Load the host metadata cache (MAC -> entry).
+
+    @param filename  Cache YAML file.
+    @return dict of cache entries; empty if the file is missing or invalid.
+    """
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            cache = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def cached_entry(cache: dict, mac: str | None, ip: str, now: float, ttl: float = CACHE_TTL) -> dict | None:
+    """@brief Valid cache entry of a device, if any.
+
+    An entry is used only while it is younger than the TTL and the
+    device still has the same IP.
+
+    @return dict with hostname, city, country; None if the host must be looked up.
+    """
+    entry = cache.get(mac) if mac else None
+    if entry and entry.get("ip") == ip and now - entry.get("updated", 0) < ttl:
+        return entry
+    return None
+
+
+async def enrich_host(ip: str, mac: str | None, cache: dict, semaphore: asyncio.Semaphore,
+                      now: float) -> dict:
+    """@brief Collect hostname, MAC and geolocation of one reachable host.
+
+    Blocking lookups run in worker threads, limited by the semaphore.
+    Private addresses get LOCAL instead of a geolocation query.
+
+    @param ip         IP address string.
+    @param mac        MAC address from the ARP table (None if unknown).
+    @param cache      Host metadata cache, updated in place.
+    @param semaphore  Limits the concurrent lookups.
+    @param now        Scan time for the cache.
+    @return Device dict with ip, hostname, mac_address, city, country.
+    """
+    entry = cached_entry(cache, mac, ip, now)
+    if entry is None:
+        async with semaphore:
+            if mac is None:
+                mac = await asyncio.to_thread(get_mac_address, ip)
+            hostname = await asyncio.to_thread(get_hostname, ip)
+            if ipaddress.ip_address(ip).is_private:
+                city, country = LOCAL, LOCAL
+            else:
+                city, country = await asyncio.to_thread(get_geolocation, ip)
+        entry = {"ip": ip, "hostname": hostname or "unbekannt", "city": city,
+                 "country": country, "updated": now}
+        if mac:
+            cache[mac] = entry
+    return {
+        "ip": ip,
+        "hostname": entry["hostname"],
+        "mac_address": mac or "unbekannt",
+        "city": entry["city"],
+        "country": entry["country"]
+    }
+
+
+async def scan_network_async(network: str, cache_file: str = CACHE_FILE) -> list[dict]:
+    """@brief Sweep a subnet and enrich all reachable hosts concurrently.
+
+    @param network     Subnet in CIDR notation.
+    @param cache_file  Host metadata cache file (rewritten after the scan).
+    @return List of device dicts in address order.
+    """
+    reachable = await sweep(network)
+    arp = read_arp_table()
+    cache = load_cache(cache_file)
+    semaphore = asyncio.Semaphore(ENRICH_CONCURRENCY)
+    now = time.time()
+    devices = await asyncio.gather(*(
+        enrich_host(ip, arp.get(ip), cache, semaphore, now) for ip in reachable
+    ))
+    save_to_yaml(cache, cache_file)
+    return list(devices)
+
+
 def scan_network(network: str) -> list[dict]:
     """@brief Scan an entire subnet and collect device information.
 
-    Uses a thread pool (100 workers) for parallel ping sweeps, then
-    resolves hostname, MAC, and geolocation for each reachable host.
+    Runs the asyncio sweep over the whole subnet, reads the ARP table
+    once, then resolves hostname and geolocation of all reachable hosts
+    concurrently, skipping hosts with a valid cache entry.
+    Without /proc/net/arp (e.g. Windows) MACs are looked up per host.
 
     @param network  Subnet in CIDR notation (e.g. '192.168.188.0/24').
     @return List of dicts with ip, hostname, mac_address, city, country.
     """
-    net = ipaddress.ip_network(network, strict=False)
-    alive_hosts = []
-
-    with ThreadPoolExecutor(max_workers=100) as executor:
-        results = executor.map(ping, net.hosts())
-        for ip in results:
-            if ip:
-                hostname = get_hostname(ip)
-                mac_address = get_mac_address(ip)
-                city, country = get_geolocation(ip)
-                alive_hosts.append({
-                    "ip": str(ip),
-                    "hostname": hostname or "unbekannt",
-                    "mac_address": mac_address or "unbekannt",
-                    "city": city,
-                    "country": country
-                })
-
-    return alive_hosts
-
-
-def save_to_yaml(data: list[dict], filename: str) -> None:
-    """@brief Save device list to a YAML file.
-
-    @param data      List of device dicts to serialize.
+    return asyncio.run(scan_network_async(network))
+
+
+def save_to_yaml(data: list[dict] | dict, filename: str) -> None:
+    """@brief Save device list (or the host cache) to a YAML file.
+
+    @param data      List of device dicts or cache dict to serialize.
     @param filename  Output file path.
     """
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
     with open(filename, "w", encoding="utf-8") as f:
         yaml.dump(data, f, allow_unicode=True, sort_keys=False)
 
@@ -2,31 +2,67 @@
 #  @brief Main entry point for the PV monitoring and wallbox control system.
 #
 #  Orchestrates periodic tasks for inverter data reading, wallbox control,
-#  and MQTT communication using APScheduler for async scheduling.
+#  ETA heating telemetry and MQTT communication using the drift-free
+#  CycleScheduler for async scheduling. All resources live in an AppContext and are built
+#  concurrently in main(), so importing this module has no side effects.
+#  Config files are watched and applied in place without a restart.
+#  With '--multiprocess' acquisition and sinks run in separate processes
+#  connected by a shared-memory ring buffer; that mode has no HTTP API,
+#  archive, discovery or config reload (see core/processes.py).
+#  With '--http[=PORT]' the latest values are served as JSON (see core/http_api.py).
+#  With '--archive[=DIR]' all samples are archived hourly as Parquet files
+#  (see core/archive.py).
+#  Profiling sessions can be started at runtime (see core/profiling.py).
+#  Device endpoints are resolved by role through the discovery registry
+#  and re-bound when a device moves (see discovery/registry.py).
 
 import asyncio
+import signal
+import sys
 import time
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from goE import wallbox_control
+from core import AppContext, ConfigWatcher, CycleScheduler, LoopLagMonitor
+from core.energy import inverter_flows
+from core.offload import install_async_stdout
+from core.profiling import Profiler
+from core.processes import flatten
+from core.scheduler import OVERRUN_DEGRADE, OVERRUN_SKIP
 from inverter import readInverter
-from mqtt_client import MQTTManager
 
-mqtt = MQTTManager("mqtt_client/broker_config.json")
-scheduler = AsyncIOScheduler()
+ctx = AppContext()
+scheduler = CycleScheduler()
+watcher = ConfigWatcher()
+loop_monitor = LoopLagMonitor(scheduler)
+profiler = Profiler()
 
 
 async def task_2s():
     """@brief Periodic 2-second task: reads inverter data, updates wallbox, writes energy to InfluxDB.
 
-    Reads current inverter measurements, passes data to the wallbox controller,
-    and writes the current energy consumption to InfluxDB.
+    Reads current measurements of all inverters concurrently and appends
+    them to the sample history. The primary inverter's data is integrated
+    into the power flows and passed to the wallbox controller, and the
+    current energy consumption is written to InfluxDB.
 
     @exception Exception Logs error and pauses 10s on failure.
     """
     try:
-        inverter_data = await readInverter.read_inverter(mqtt)
-        wallbox_control.set_inverter_data(inverter_data)
-        wallbox_control.write_current_energy_to_influx(mqtt)
+        results = await readInverter.read_inverters(ctx.mqtt)
+        now = time.time()
+        primary = readInverter.get_inverters()[0].device
+        for device, data in results.items():
+            if device != primary:
+                ctx.history.append(f"inverter/{device}", now, flatten(data))
+        inverter_data = results.get(primary)
+        if inverter_data is None:
+            return
+        ctx.mark_first_sample()
+        ctx.history.append("inverter", now, flatten(inverter_data))
+        ctx.energy.add(now, inverter_flows(inverter_data))
+        ctx.state.update_inverter(inverter_data)
+        ctx.wallboxes.set_inverter_data(inverter_data)
+        powers = await ctx.wallboxes.write_current_energy_to_influx()
+        if powers:
+            ctx.energy.add(time.time(), {"wallbox": sum(powers.values())})
         print(f"\n--- new measurement 2s Task: ({time.strftime('%Y-%m-%d %H:%M:%S')}) ---")
     except Exception as e:
         print(f"Error reading inverter data: {e}")
@@ -50,12 +86,12 @@ async def task_10s():
 async def task_30s():
     """@brief Periodic 30-second task: controls wallbox charging.
 
-    Evaluates surplus PV power and adjusts the wallbox charging current accordingly.
+    Evaluates surplus PV power and distributes it over all configured wallboxes.
 
     @exception Exception Logs error and pauses 10s on failure.
     """
     try:
-        wallbox_control.control(mqtt)
+        await ctx.wallboxes.control()
         print(f"wallbox control finished ({time.strftime('%Y-%m-%d %H:%M:%S')})")
     except Exception as e:
         print(f"Error calling wallbox: {e}")
@@ -64,32 +100,222 @@ async def task_60s():
     """@brief Periodic 60-second task: reads extended inverter registers.
 
     Reads slower-changing inverter data (energy totals, battery health, etc.)
-    and writes to InfluxDB.
+    and writes to InfluxDB, together with the integrated energy counters,
+    which are also checkpointed to disk.
 
     @exception Exception Logs error and pauses 10s on failure.
     """
     try:
-        await readInverter.read_inverter_60s_task()
+        await readInverter.read_inverters_60s()
+        await readInverter.influx.write_bucket_point_async(ctx.energy.point())
+        await asyncio.to_thread(ctx.energy.save)
         print(f"\n--- new measurement 60s Task: ({time.strftime('%Y-%m-%d %H:%M:%S')}) ---")
+        print(scheduler.report())
+        print(loop_monitor.report())
     except Exception as e:
         print(f"Error reading inverter data: {e}")
 
-scheduler.add_job(task_2s, "interval", seconds=2, id="task_2s", misfire_grace_time=2)
-scheduler.add_job(task_10s, "interval", seconds=10, id="task_10s", misfire_grace_time=5)
-scheduler.add_job(task_30s, "interval", seconds=30, id="task_30s", misfire_grace_time=10)
-scheduler.add_job(task_60s, "interval", seconds=60, id="task_60s", misfire_grace_time=10)
+async def task_eta():
+    """@brief Periodic ETA task: reads the heating values and writes changed ones.
+
+    Reads all configured ETA variables with one varset request and writes
+    values that moved beyond their deadband to the 'eta' bucket.
+
+    @exception Exception Logs error on failure.
+    """
+    try:
+        fields = await ctx.eta.poll()
+        print(f"ETA poll finished, {len(fields)} changed value(s) ({time.strftime('%Y-%m-%d %H:%M:%S')})")
+    except Exception as e:
+        print(f"Error reading ETA data: {e}")
+
+def add_jobs() -> None:
+    """@brief Register all periodic tasks with the scheduler.
+
+    Ticks are aligned to wall-clock boundaries and a job never overlaps
+    with itself. If the 2s acquisition overruns, it degrades to a 4s
+    cadence (same registers, half the rate) until it fits again; all
+    other jobs skip missed ticks.
+    """
+    scheduler.add_job(task_2s, 2, id="task_2s", overrun=OVERRUN_DEGRADE, degraded_interval=4)
+    scheduler.add_job(task_10s, 10, id="task_10s", overrun=OVERRUN_SKIP, offset=0.5)
+    scheduler.add_job(task_30s, 30, id="task_30s", overrun=OVERRUN_SKIP, offset=1)
+    scheduler.add_job(task_60s, 60, id="task_60s", overrun=OVERRUN_SKIP, offset=1.5)
+    scheduler.add_job(task_eta, ctx.eta.interval, id="task_eta", overrun=OVERRUN_SKIP, offset=0.5)
+
+
+def reload_eta(path) -> None:
+    """@brief Apply a changed ETA config and reschedule task_eta if the interval changed.
+
+    The address found by discovery is kept.
+
+    @param path  Path to the ETA JSON configuration.
+    """
+    interval = ctx.eta.interval
+    ctx.eta.reload_config(path, ctx.discovery.endpoint("eta"))
+    if ctx.eta.interval != interval:
+        scheduler.reschedule_job("task_eta", ctx.eta.interval)
+
+
+def reload_mqtt(path) -> None:
+    """@brief Apply a changed broker config; the broker found by discovery is kept.
+    @param path  Path to the broker JSON configuration.
+    """
+    endpoint = ctx.discovery.endpoint("mqtt")
+    ctx.mqtt.reload_config(path, broker=endpoint[0] if endpoint else None)
+
+
+def reload_wallboxes(path) -> None:
+    """@brief Apply a changed wallbox config; charger addresses found by discovery are kept.
+    @param path  Path to the wallbox JSON configuration.
+    """
+    endpoints = {}
+    for role in ctx.discovery.roles:
+        endpoint = ctx.discovery.endpoint(role)
+        if role.startswith("goe_") and endpoint is not None:
+            endpoints[role[len("goe_"):]] = endpoint
+    ctx.wallboxes.reload_config(path, endpoints)
+
+
+def watch_configs() -> None:
+    """@brief Register the reload callbacks for all config files.
+
+    Register maps and derived metric definitions are re-read, topic changes are
+    applied on the live MQTT connection and wallbox / ETA settings are
+    replaced without resetting their control state. Endpoints re-bound
+    by the discovery registry survive a reload of the file.
+    """
+    for device in readInverter.get_inverters():
+        for path in device.register_files:
+            watcher.watch(path, device.client.reload_registers)
+    watcher.watch(readInverter.DERIVED_CONFIG, readInverter.get_derived().reload_config)
+    watcher.watch(ctx.broker_config, reload_mqtt)
+    watcher.watch(ctx.wallbox_config, reload_wallboxes)
+    watcher.watch(ctx.eta_config, reload_eta)
+    watcher.watch(ctx.discovery_config, ctx.discovery.reload_config)
+
+
+def bind_endpoints() -> None:
+    """@brief Let the discovery registry re-bind the clients when a device moves.
+
+    Roles: the 'role' of every inverter in inverter/inverter_config.json
+    (Modbus gateways), 'mqtt' (broker), 'eta' (heating) and 'goe_<serial>'
+    (HTTP fallback of a go-eCharger; add the role with its ip, mac or
+    hostname to discovery/discovery_config.json to use it).
+    """
+    registry = ctx.discovery
+
+    def rebind_mqtt(ip: str, port: int) -> None:
+        if ip != ctx.mqtt.broker:
+            ctx.mqtt.rebind(ip)
+
+    def report_read(device, ok: bool) -> None:
+        if device.role:
+            registry.report(device.role, ok)
+
+    for device in readInverter.get_inverters():
+        if device.role:
+            registry.on_change(device.role, device.client.rebind)
+            # The Modbus gateway accepts one client only: use the poll results, not probes
+            registry.watch_liveness(device.role)
+    readInverter.read_listeners.append(report_read)
+    registry.on_change("mqtt", rebind_mqtt)
+    registry.on_change("eta", ctx.eta.rebind)
+    for charger in ctx.wallboxes.chargers:
+        serial = charger["serial"]
+        registry.on_change(f"goe_{serial}",
+                           lambda ip, port, serial=serial: ctx.wallboxes.rebind_charger(serial, ip, port))
+
+
+def http_port() -> int | None:
+    """@brief Port of the local HTTP API from the command line.
+    @return Port for '--http' / '--http=PORT', None if the API is disabled.
+    """
+    from core.http_api import HTTP_PORT
+    for arg in sys.argv[1:]:
+        if arg == "--http":
+            return HTTP_PORT
+        if arg.startswith("--http="):
+            return int(arg.split("=", 1)[1])
+    return None
+
+
+def archive_dir() -> str | None:
+    """@brief Archive directory from the command line.
+    @return Directory for '--archive' / '--archive=DIR', None if the archive is disabled.
+    """
+    from core.archive import ARCHIVE_DIR
+    for arg in sys.argv[1:]:
+        if arg == "--archive":
+            return ARCHIVE_DIR
+        if arg.startswith("--archive="):
+            return arg.split("=", 1)[1]
+    return None
+
+
+def start_archive(root: str):
+    """@brief Archive every sample of the history and write the completed hours once a minute.
+    @param root  Archive directory.
+    @return The SampleArchive (flush it with final=True on shutdown).
+    """
+    from core.archive import SampleArchive
+    archive = SampleArchive(root)
+    ctx.history.subscribe(archive.add)
+    scheduler.add_job(archive.flush_async, 60, id="archive", overrun=OVERRUN_SKIP, offset=5)
+    print(f"sample archive enabled in {root}")
+    return archive
+
 
 async def main():
     """@brief Application entry point.
 
-    Starts the MQTT client thread and the APScheduler async scheduler.
+    Moves stdout writes off the loop, starts the loop-lag monitor, builds
+    all resources concurrently, starts the MQTT client thread, the
+    optional HTTP API, the profiling triggers, the optional sample archive,
+    the cycle scheduler and the device discovery. On exit (also on
+    SIGTERM) the jobs are stopped, the samples of the current hour are
+    archived and the background tasks are cancelled.
     """
-    mqtt.start()
+    try:
+        # SIGTERM cancels main() like Ctrl+C, so the shutdown below runs
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+    install_async_stdout()
+    loop_monitor.start()
+    await ctx.start()
+    print(ctx.startup_report())
+    bind_endpoints()
+    ctx.mqtt.start()
+    port = http_port()
+    if port is not None:
+        from core.http_api import LatestValuesServer
+        await LatestValuesServer(ctx.state, ctx.mqtt, port=port).start()
+    await profiler.serve(mqtt=ctx.mqtt)
+    add_jobs()
+    root = archive_dir()
+    archive = start_archive(root) if root is not None else None
     scheduler.start()
-    # Keep the event loop running
-    while True:
-        await asyncio.sleep(1)
+    watch_configs()
+    ctx.spawn("watcher", watcher.run())
+    ctx.spawn("discovery", ctx.discovery.run())
+    try:
+        # Keep the event loop running
+        while True:
+            await asyncio.sleep(1)
+    finally:
+        scheduler.shutdown()
+        if archive is not None:
+            await archive.flush_async(final=True)
+        await ctx.stop()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if "--multiprocess" in sys.argv:
+        from core.processes import run_multiprocess
+        run_multiprocess()
+    else:
+        try:
+            asyncio.run(main())
+        except asyncio.CancelledError:
+            pass
@@ -7,10 +7,11 @@
 
 from pymodbus.client import AsyncModbusTcpClient
 from pymodbus.exceptions import ModbusIOException
-import asyncio
 import struct
 import json
+import time
 from pathlib import Path
+from core.metrics import MODBUS_DECODE, MODBUS_ROUNDTRIP, RECONNECTS
 
 
 class modbus_client:
@@ -35,6 +36,8 @@ class modbus_client:
         self._ip = ip
         self._port = port
         self.client = None
+        self._config_json = config_json
+        self._config_json2 = config_json2
         self.register = self._load_registers(config_json)
         self.register2 = self._load_registers(config_json2) if config_json2 else {}
         self.unit = unit
@@ -53,6 +56,36 @@ class modbus_client:
             self._connected = False
             await self.client.connect()
             self._connected = self.client.connected
+    def rebind(self, ip: str, port: int) -> None:
+        """@brief Point the client to another gateway address.
+
+        The current connection is closed; the next read connects to the
+        new address.
+
+        @param ip    New gateway IP address.
+        @param port  New TCP port.
+        """
+        if (ip, port) == (self._ip, self._port):
+            return
+        print(f"Modbus-Gateway verschoben: {self._ip}:{self._port} -> {ip}:{port}")
+        if self.client is not None:
+            self.client.close()
+        self.client = None
+        self._connected = False
+        self._ip, self._port = ip, port
+
+    def reload_registers(self, *_) -> None:
+        """@brief Re-read both register configuration files in place.
+
+        The TCP connection is kept; the next read cycle uses the new
+        register maps. Both files are parsed before anything is replaced,
+        so an invalid file leaves the old maps active.
+        """
+        register = self._load_registers(self._config_json)
+        register2 = self._load_registers(self._config_json2) if self._config_json2 else {}
+        self.register = register
+        self.register2 = register2
+
     @staticmethod
     def _load_registers(path: str | Path) -> dict:
         """@brief Load register definitions from a JSON file.
@@ -63,13 +96,17 @@ class modbus_client:
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
 
-    async def _read_register(self, register: dict) -> dict:
+    async def _read_register(self, register: dict, name: str = "") -> dict:
         """@brief Read a single register or register block from the device.
 
         Determines the register width (16-bit, 32-bit, or block) and decodes
-        the raw Modbus response accordingly. Reconnects on I/O errors.
+        the raw Modbus response accordingly. On I/O errors the connection
+        is closed and re-established by the next read, so a failed read
+        returns at once and does not eat into the cycle's timeout.
+        Round trip and decode time are recorded in the metrics.
 
         @param register  Register definition dict with 'address', 'count', etc.
+        @param name      Register / block name used as metrics label.
         @return Updated register dict with 'value' field, or None on error.
         """
         await self.connect()
@@ -78,21 +115,23 @@ class modbus_client:
         factor = register.get("factor", 1)
         floating = register.get("floating", False)
         try:
+            t0 = time.perf_counter()
             rr = await self.client.read_holding_registers(
                 register["address"],
                 count=count,
                 device_id=self.unit
             )
+            MODBUS_ROUNDTRIP.labels(name).observe(time.perf_counter() - t0)
             if rr.isError():
                 raise RuntimeError(rr)
         except (ModbusIOException, ConnectionError, OSError) as e:
             print("Reconnect wegen:", e)
+            RECONNECTS.labels("modbus").inc()
             self.client.close()
             self._connected = False
-            await asyncio.sleep(1)
-            await self.connect()
             return None
 
+        t0 = time.perf_counter()
         if count == 1:
             # 16-bit register
             register["value"] = self._to_signed16(rr.registers[0], signed=signed, factor=factor)
@@ -105,6 +144,7 @@ class modbus_client:
             self._return_block_values(register, rr.registers)
         else:
             raise ValueError("Unsupported register width")
+        MODBUS_DECODE.observe(time.perf_counter() - t0)
 
         return register
 
@@ -138,21 +178,42 @@ class modbus_client:
     async def _get_values(self, register: dict) -> dict:
         """@brief Read and decode all registers from a config dict.
 
-        Handles both individual registers and block registers.
+        Handles both individual registers and block registers. Every
+        configured name is present in the result; registers of a failed
+        read are None, so consumers can tell them from a stale value.
 
         @param register  Register configuration dictionary.
-        @return dict mapping register names to their decoded values.
+        @return dict mapping register names to their decoded values (or None).
         """
         values: dict = {}
         for name, unit in register.items():
-            value = await self._read_register(unit)
+            value = await self._read_register(unit, name)
             block = unit.get("block", False)
             if not block:
                 values[name] = value
-            else:
+            elif value is not None:
                 values.update(value)
+            else:
+                values.update(dict.fromkeys(sub for sub, entry in unit.items() if self._is_register(entry)))
         return values
 
+    @classmethod
+    def value_names(cls, register: dict) -> list[str]:
+        """@brief Names of all decoded values of a register config, in read order.
+
+        Block registers contribute their sub-register names.
+
+        @param register  Register configuration dictionary.
+        @return List of value names.
+        """
+        names = []
+        for name, entry in register.items():
+            if entry.get("block", False):
+                names.extend(sub for sub, value in entry.items() if cls._is_register(value))
+            else:
+                names.append(name)
+        return names
+
     @staticmethod
     def _is_register(entry) -> bool:
         """@brief Check whether a dict entry represents a register definition.
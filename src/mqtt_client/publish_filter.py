@@ -0,0 +1,106 @@
+## @file publish_filter.py
+#  @brief Change-based filtering of outgoing MQTT messages.
+#
+#  Rules are configured per topic pattern (MQTT wildcards '+' and '#')
+#  in the 'publish_filter' section of the broker configuration:
+#
+#      "publish_filter": {
+#          "heartbeat": 60,
+#          "rules": {
+#              "goodwe/+/ppv": {"deadband": 20},
+#              "goodwe/+/pbattery": {"deadband": 10, "relative": 0.05},
+#              "goodwe/+/battery_soc": {"retain": true}
+#          }
+#      }
+#
+#  A value is only published if it moved beyond its deadband (the larger
+#  of the absolute 'deadband' and 'relative' * |last value|), if it is not
+#  numeric and differs from the last one, or if nothing was published for
+#  'heartbeat' seconds. Topics without a rule are always published.
+
+import threading
+import time
+from paho.mqtt.client import topic_matches_sub
+from core.metrics import MQTT_SUPPRESSED
+
+## @name Defaults
+## @{
+DEFAULT_HEARTBEAT = 60     ## Maximum silence of a filtered topic [s]
+## @}
+
+
+class PublishFilter:
+    """@brief Per-topic deadband / heartbeat filter with the last published values.
+
+    @param config  'publish_filter' section of the broker configuration.
+    """
+
+    def __init__(self, config: dict | None = None):
+        ## @brief Topic -> (value, monotonic time) of the last published message.
+        self.last: dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.apply_config(config or {})
+
+    def apply_config(self, config: dict) -> None:
+        """@brief Replace the rules; the last published values are kept.
+
+        @param config  'publish_filter' section of the broker configuration.
+        """
+        self.heartbeat = config.get("heartbeat", DEFAULT_HEARTBEAT)
+        ## @brief Topic pattern -> rule dict ('deadband', 'relative', 'heartbeat', 'retain').
+        self.rules: dict[str, dict] = config.get("rules", {})
+        self._resolved: dict[str, dict | None] = {}
+
+    def rule(self, topic: str) -> dict | None:
+        """@brief Rule of a topic (first matching pattern, cached).
+        @return Rule dict or None if the topic is not filtered.
+        """
+        try:
+            return self._resolved[topic]
+        except KeyError:
+            rule = next((r for pattern, r in self.rules.items() if topic_matches_sub(pattern, topic)), None)
+            self._resolved[topic] = rule
+            return rule
+
+    def retain(self, topic: str) -> bool:
+        """@brief True if the last value of a topic should be retained by the broker."""
+        rule = self.rule(topic)
+        return bool(rule and rule.get("retain", False))
+
+    def reset(self) -> None:
+        """@brief Forget the last published values (e.g. after a reconnect)."""
+        with self._lock:
+            self.last.clear()
+
+    def _changed(self, rule: dict, value, last) -> bool:
+        """@brief True if a value moved beyond the deadband of its rule."""
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not isinstance(last, (int, float)):
+            return value != last
+        threshold = max(rule.get("deadband", 0), rule.get("relative", 0) * abs(last))
+        return abs(value - last) > threshold if threshold else value != last
+
+    def select(self, data: list, now: float | None = None) -> list:
+        """@brief The [topic, value] pairs that should be published now.
+
+        Selected values are remembered as published.
+
+        @param data  List of [topic, value] pairs.
+        @param now   Monotonic time (default: now).
+        @return List of [topic, value] pairs to publish.
+        """
+        now = time.monotonic() if now is None else now
+        selected = []
+        with self._lock:
+            for topic, value in data:
+                rule = self.rule(topic)
+                if rule is None:
+                    selected.append([topic, value])
+                    continue
+                last = self.last.get(topic)
+                if (last is None or now - last[1] >= rule.get("heartbeat", self.heartbeat)
+                        or self._changed(rule, value, last[0])):
+                    self.last[topic] = (value, now)
+                    selected.append([topic, value])
+                else:
+                    MQTT_SUPPRESSED.inc()
+        return selected
@@ -3,13 +3,19 @@
 #
 #  Provides a thread-safe MQTT manager that subscribes to topics defined
 #  in a JSON configuration, stores incoming message values, and offers
-#  publish/subscribe helpers for inter-module communication.
+#  publish/subscribe helpers for inter-module communication. Outgoing
+#  values pass the deadband / heartbeat filter configured in the
+#  'publish_filter' section (see publish_filter.py).
 
 import paho.mqtt.client as mqtt
 import threading
+import time
 import json
 from pathlib import Path
 from typing import Any
+from core.metrics import MQTT_PUBLISH, MQTT_QUEUE, RECONNECTS
+from core.offload import run_blocking
+from mqtt_client.publish_filter import PublishFilter
 
 
 class MQTTManager(threading.Thread):
@@ -29,31 +35,35 @@ class MQTTManager(threading.Thread):
         ## @brief MQTT broker hostname/IP.
         self.broker = config.get("broker_ip") or config.get("broker") or "localhost"
 
-        # Collect all list-valued items from JSON as subscription topics
-        topics_list: list[str] = []
-        for section, entries in config.items():
-            if section in ("broker_ip", "broker"):
-                continue
-            if isinstance(entries, list):
-                for item in entries:
-                    if isinstance(item, str):
-                        topics_list.append(item)
-
+        ## @brief Topics taken from the config file (reloadable).
+        self.config_topics = self._config_topics(config)
         ## @brief List of (topic, qos) tuples for MQTT subscription.
-        self.topics = [(entry, 0) for entry in topics_list]
+        self.topics = [(entry, 0) for entry in self.config_topics]
+        ## @brief Topics requested at runtime via subscribe_topics().
+        self.runtime_topics: set[str] = set()
 
         self.client = mqtt.Client(protocol=mqtt.MQTTv311, callback_api_version=mqtt.CallbackAPIVersion.VERSION2)
         self.client.on_connect = self._on_connect
         self.client.on_disconnect = self._on_disconnect
         self.client.on_message = self._on_message
         self.client.on_publish = self._on_publish
+        self.client.reconnect_delay_set(min_delay=1, max_delay=30)
 
         ## @brief True when connected to broker, False otherwise.
         self._connected = threading.Event()
         ## @brief Dict storing the latest received value per short topic key.
         self.received: dict[str, Any] = {}
+        ## @brief Dict storing the latest received value per full topic path.
+        self.received_topics: dict[str, Any] = {}
         ## @brief Lock for thread-safe access to received data.
         self.rx_lock = threading.Lock()
+        ## @brief Incremented whenever a received value changes.
+        self.version = 0
+        self._ever_connected = False
+        ## @brief Callbacks per full topic, called in the MQTT thread with the payload.
+        self.handlers: dict[str, Any] = {}
+        ## @brief Change-based filter for outgoing values.
+        self.publish_filter = PublishFilter(config.get("publish_filter"))
 
     @staticmethod
     def _load_config(path: str | Path) -> dict:
@@ -64,6 +74,68 @@ class MQTTManager(threading.Thread):
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
 
+    @staticmethod
+    def _config_topics(config: dict) -> list[str]:
+        """@brief Collect all list-valued items from the config as subscription topics.
+        @param config  Broker configuration dict.
+        @return List of topic strings.
+        """
+        topics_list: list[str] = []
+        for section, entries in config.items():
+            if section in ("broker_ip", "broker", "publish_filter"):
+                continue
+            if isinstance(entries, list):
+                for item in entries:
+                    if isinstance(item, str):
+                        topics_list.append(item)
+        return topics_list
+
+    def reload_config(self, path: str | Path, broker: str | None = None) -> None:
+        """@brief Apply a changed broker configuration to the running client.
+
+        Topics added to the file are subscribed, removed ones unsubscribed
+        on the live connection. Topics added at runtime via
+        subscribe_topics() are kept. New publish filter rules apply to the
+        next message. A changed broker address triggers a reconnect to the
+        new broker.
+
+        @param path    Path to the JSON broker configuration file.
+        @param broker  Broker address used instead of the file's (e.g. found by discovery).
+        """
+        config = self._load_config(path)
+        self.publish_filter.apply_config(config.get("publish_filter") or {})
+        new_topics = self._config_topics(config)
+        added = [t for t in new_topics if t not in self.config_topics]
+        removed = [
+            t for t in self.config_topics
+            if t not in new_topics and t not in self.runtime_topics
+        ]
+        self.config_topics = new_topics
+        self.topics = [(t, q) for t, q in self.topics if t not in removed]
+        self._add_subscriptions(added)
+        if removed:
+            if self.connected:
+                self.client.unsubscribe(removed)
+            with self.rx_lock:
+                for topic in removed:
+                    self.received_topics.pop(topic, None)
+        broker = broker or config.get("broker_ip") or config.get("broker") or "localhost"
+        if broker != self.broker:
+            self.rebind(broker)
+
+    def rebind(self, broker: str) -> None:
+        """@brief Switch the running client to another broker address.
+
+        Safe to call from any thread: only a disconnect is requested here,
+        the MQTT thread then connects to the new address (see run()).
+
+        @param broker  New broker hostname/IP.
+        """
+        print(f"MQTT broker changed {self.broker} -> {broker}, reconnecting")
+        self.broker = broker
+        self._connected.clear()
+        self.client.disconnect()
+
     @property
     def message(self) -> dict:
         """@brief Thread-safe getter for all received MQTT messages.
@@ -80,15 +152,108 @@ class MQTTManager(threading.Thread):
         with self.rx_lock:
             self.received = value
 
+    @property
+    def connected(self) -> bool:
+        """@brief True while the broker connection is up.
+        @return Connection state.
+        """
+        return self._connected.is_set()
+
+    def messages_for(self, prefix: str) -> dict:
+        """@brief Thread-safe getter for all messages below a topic prefix.
+
+        Unlike message, keys are not shortened to the last topic segment
+        globally, so several devices publishing the same key names
+        (e.g. two go-eChargers) do not overwrite each other.
+
+        @param prefix  Topic prefix including the trailing slash, e.g. 'go-eCharger/254959/'.
+        @return dict mapping the topic remainder to its latest value.
+        """
+        with self.rx_lock:
+            return {
+                topic[len(prefix):]: value
+                for topic, value in self.received_topics.items()
+                if topic.startswith(prefix)
+            }
+
+    def snapshot(self) -> tuple[int, dict]:
+        """@brief Thread-safe copy of all received values with their version.
+        @return Tuple (version, dict of full topic to value).
+        """
+        with self.rx_lock:
+            return self.version, dict(self.received_topics)
+
+    def subscribe_topics(self, topics: list[str], qos: int = 0) -> None:
+        """@brief Add subscription topics at runtime.
+
+        Topics are remembered for re-subscription in _on_connect and
+        subscribed immediately if the broker connection is already up.
+
+        @param topics  List of topic strings.
+        @param qos     MQTT QoS level for the new subscriptions.
+        """
+        self.runtime_topics.update(topics)
+        self._add_subscriptions(topics, qos)
+
+    def add_handler(self, topic: str, callback) -> None:
+        """@brief Subscribe a topic and call a function for every message on it.
+
+        The callback runs in the MQTT thread and must not block.
+
+        @param topic     Full topic string.
+        @param callback  Callable taking the decoded payload.
+        """
+        self.handlers[topic] = callback
+        self.subscribe_topics([topic])
+
+    def _add_subscriptions(self, topics: list[str], qos: int = 0) -> None:
+        """@brief Subscribe topics not subscribed yet (live if connected).
+        @param topics  List of topic strings.
+        @param qos     MQTT QoS level.
+        """
+        known = {topic for topic, _ in self.topics}
+        new = [(topic, qos) for topic in topics if topic not in known]
+        if not new:
+            return
+        self.topics.extend(new)
+        if self._connected.is_set():
+            self.client.subscribe(new)
+
     def set_keys(self, data: list, qos: int = 0, retain: bool = False) -> None:
         """@brief Publish multiple key-value pairs via MQTT.
 
+        Values held back by the publish filter are not sent.
+
+        @param data    List of [topic, value] pairs.
+        @param qos     MQTT Quality of Service level (default 0).
+        @param retain  Whether the broker should retain messages (default False).
+        """
+        self._publish_all(self.publish_filter.select(data), qos, retain)
+
+    async def set_keys_async(self, data: list, qos: int = 0, retain: bool = False) -> None:
+        """@brief Publish multiple key-value pairs without blocking the event loop.
+
+        The publish filter runs first; if values remain, they are published
+        in the bounded executor for blocking calls, because publish() may
+        wait up to 5 seconds for the broker.
+
         @param data    List of [topic, value] pairs.
         @param qos     MQTT Quality of Service level (default 0).
         @param retain  Whether the broker should retain messages (default False).
         """
+        data = self.publish_filter.select(data)
+        if not data:
+            return
+        MQTT_QUEUE.inc()
+        try:
+            await run_blocking(self._publish_all, data, qos, retain)
+        finally:
+            MQTT_QUEUE.dec()
+
+    def _publish_all(self, data: list, qos: int, retain: bool) -> None:
+        """@brief Publish filtered [topic, value] pairs; filter rules may force retain."""
         for key, value in data:
-            self.publish(key, value, qos=qos, retain=retain)
+            self.publish(key, value, qos=qos, retain=retain or self.publish_filter.retain(key))
 
     def publish(self, topic: str, msg: Any, qos: int = 0, retain: bool = False):
         """@brief Publish a message to an MQTT topic.
@@ -103,11 +268,13 @@ class MQTTManager(threading.Thread):
         @param retain  Retain flag.
         @return paho MQTTMessageInfo or None on failure / not connected.
         """
+        t0 = time.perf_counter()
         if not self._connected.wait(timeout=5):
             print(f"MQTT not connected, dropping message for {topic}")
             return None
         try:
             result = self.client.publish(topic, msg, qos=qos, retain=retain)
+            MQTT_PUBLISH.observe(time.perf_counter() - t0)
             status = getattr(result, "rc", None)
             if status != 0:
                 print(f"Failed to send message to topic {topic} rc={status}")
@@ -137,8 +304,14 @@ class MQTTManager(threading.Thread):
         @param properties   MQTT v5 properties (optional).
         """
         print(f"broker connected with result code {reason_code}")
+        if self._ever_connected:
+            RECONNECTS.labels("mqtt").inc()
+        self._ever_connected = True
+        # Values may have been dropped while disconnected, publish everything again
+        self.publish_filter.reset()
         self._connected.set()
-        client.subscribe(self.topics)
+        if self.topics:
+            client.subscribe(self.topics)
 
     def _on_disconnect(self, client, userdata, *args, **kwargs):
         """@brief Callback invoked when the broker connection is lost.
@@ -167,12 +340,25 @@ class MQTTManager(threading.Thread):
 
         short_topic = msg.topic.split("/")[-1]
         with self.rx_lock:
+            if self.received_topics.get(msg.topic, self) != payload:
+                self.version += 1
             self.received[short_topic] = payload
+            self.received_topics[msg.topic] = payload
+        handler = self.handlers.get(msg.topic)
+        if handler is not None:
+            try:
+                handler(payload)
+            except Exception as e:
+                print(f"MQTT handler for {msg.topic} failed: {e}")
 
     def run(self):
         """@brief Thread entry point – connects to broker and runs the MQTT loop.
 
-        Uses loop_forever() which handles reconnection automatically.
+        Uses loop_forever() which handles reconnection automatically, also
+        if the broker is not reachable at start. loop_forever() only returns
+        after disconnect() (broker address changed by rebind()); the loop
+        then connects to the current broker address.
         """
-        self.client.connect(self.broker, 1883, 60)
-        self.client.loop_forever()
+        while True:
+            self.client.connect_async(self.broker, 1883, 60)
+            self.client.loop_forever(retry_first_connection=True)
@@ -0,0 +1,70 @@
+## @file conftest.py
+#  @brief Offline fixtures for the benchmark suite.
+#
+#  The Modbus gateway is replaced by a fake client returning fixed
+#  register words, and InfluxDB writes are captured in a list.
+#
+#  Run from the repository root (dev requirements in src/pyPackageList/dev.txt):
+#
+#      python -m pytest tests/benchmarks --benchmark-autosave \
+#          --benchmark-storage=tests/benchmarks/results
+#
+#  Saved runs (git-ignored) can be compared with
+#  'pytest-benchmark compare 0001 0002'. Without pytest-benchmark the
+#  benchmarks are not collected, so the other tests still run.
+
+import asyncio
+import pytest
+from harness import FakeModbus
+
+
+def pytest_ignore_collect(collection_path, config):
+    """@brief Skip the benchmark modules if the pytest-benchmark plugin is not available."""
+    if not config.pluginmanager.hasplugin("benchmark"):
+        return collection_path.name.startswith("test_")
+    return None
+
+
+@pytest.fixture
+def loop():
+    """@brief Private event loop for benchmarks of coroutines."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def influx_points(monkeypatch):
+    """@brief Capture all InfluxDB writes instead of sending them.
+    @return List receiving every written point.
+    """
+    from influx_bucket import influxConfig
+    points = []
+
+    def write(self, point):
+        points.append(point)
+
+    async def write_async(self, point):
+        points.append(point)
+
+    monkeypatch.setattr(influxConfig, "write_bucket_point", write)
+    monkeypatch.setattr(influxConfig, "write_bucket_point_async", write_async)
+    return points
+
+
+@pytest.fixture
+def inverter(monkeypatch):
+    """@brief readInverter's Modbus client with the real register maps and a fake gateway."""
+    from inverter import readInverter
+    client = readInverter.get_inverter()
+    # Every register answers with a fixed arbitrary word
+    client.client = FakeModbus(default=lambda address: address * 37 % 65536)
+    yield client
+    readInverter.inverter = None
+
+
+@pytest.fixture
+def fast_data(inverter, loop):
+    """@brief One decoded fast-cycle sample as returned by acquire_fast()."""
+    from inverter import readInverter
+    return loop.run_until_complete(readInverter.acquire_fast())
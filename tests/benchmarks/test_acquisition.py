@@ -0,0 +1,41 @@
+## @file test_acquisition.py
+#  @brief Benchmarks of the 2 s / 60 s inverter acquisition path.
+
+from inverter import readInverter
+
+
+def test_decode_fast_registers(benchmark, inverter, loop):
+    """@brief Read and decode the fast register map (fake gateway)."""
+    data = benchmark(lambda: loop.run_until_complete(inverter.get_register1()))
+    assert "battery_soc" in data
+
+
+def test_decode_slow_registers(benchmark, inverter, loop):
+    """@brief Read and decode the 60 s register map (fake gateway)."""
+    data = benchmark(lambda: loop.run_until_complete(inverter.get_register2()))
+    assert "pv_energy_total" in data
+
+
+def test_block_decode(benchmark, inverter):
+    """@brief Decode one register block without any I/O."""
+    name, block = next((n, r) for n, r in inverter.register.items() if r.get("block"))
+    raw = list(range(block["count"]))
+    benchmark(inverter._return_block_values, block, raw)
+
+
+def test_fast_point(benchmark, fast_data):
+    """@brief Build the fast-cycle InfluxDB point."""
+    point = benchmark(readInverter.fast_point, fast_data)
+    assert "house_consumption" in point.to_line_protocol()
+
+
+def test_write_fast_points(benchmark, fast_data, influx_points, loop):
+    """@brief _write_fast_points with the Influx sink captured."""
+    benchmark(lambda: loop.run_until_complete(readInverter._write_fast_points(fast_data)))
+    assert influx_points
+
+
+def test_read_inverter_60s_task(benchmark, inverter, influx_points, loop):
+    """@brief Slow-cycle read, decode and point building."""
+    benchmark(lambda: loop.run_until_complete(readInverter.read_inverter_60s_task()))
+    assert influx_points
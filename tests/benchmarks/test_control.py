@@ -0,0 +1,55 @@
+## @file test_control.py
+#  @brief Benchmarks of MQTT decoding and the wallbox control calculations.
+
+import json
+from types import SimpleNamespace
+import pytest
+from goE import wallbox_control
+from goE.wallbox_manager import WallboxManager, distribute_surplus
+from mqtt_client import MQTTManager
+
+NRG = [230, 231, 229, 0, 6.1, 6.0, 6.2, 400, 1400, 1380, 1420, 4200, 0, 0, 0, 0]
+
+
+@pytest.fixture
+def mqtt():
+    """@brief MQTTManager built from the real broker config (never started)."""
+    return MQTTManager("mqtt_client/broker_config.json")
+
+
+def test_on_message(benchmark, mqtt):
+    """@brief Decode and store one go-e 'nrg' status message."""
+    msg = SimpleNamespace(topic="go-eCharger/254959/nrg", payload=json.dumps(NRG).encode())
+    benchmark(mqtt._on_message, mqtt.client, None, msg)
+    assert mqtt.messages_for("go-eCharger/254959/")["nrg"] == NRG
+
+
+def test_manager_set_inverter_data(benchmark, mqtt, fast_data):
+    """@brief WallboxManager average update from one inverter sample."""
+    manager = WallboxManager("goE/wallbox_config.json", mqtt)
+    benchmark(manager.set_inverter_data, fast_data)
+
+
+def test_legacy_set_inverter_data(benchmark, fast_data):
+    """@brief Rolling averages of the single-wallbox controller."""
+    benchmark(wallbox_control.set_inverter_data, fast_data)
+
+
+def test_charge_current_calculation(benchmark, capsys):
+    """@brief Surplus to charge current of the single-wallbox controller."""
+    wallbox_control.ppv_mean = 6000
+    wallbox_control.house_power_use_mean = 800
+    target = benchmark(wallbox_control.charge_current_calculation, 3, 10, 2, 4200)
+    assert target["ampere"] > 0
+
+
+@pytest.mark.parametrize("count", [1, 3])
+def test_distribute_surplus(benchmark, count):
+    """@brief Phase mode search and current split for 1 and 3 chargers."""
+    chargers = [
+        {"serial": str(i), "priority": i, "min_current": 6, "max_current": 16,
+         "phase": i % 3 + 1, "active_phases": 0}
+        for i in range(count)
+    ]
+    targets = benchmark(distribute_surplus, 9000, chargers, 32)
+    assert len(targets) == count
@@ -0,0 +1,29 @@
+## @file standin.py
+#  @brief Local aiohttp stand-in servers for the HTTP client tests.
+
+from contextlib import asynccontextmanager
+from aiohttp import web
+
+
+@asynccontextmanager
+async def stand_in(routes: dict):
+    """@brief Serve handlers on a free port of 127.0.0.1.
+
+    Handlers still running at the end are cancelled after 0.1 s.
+
+    @param routes  dict of path (GET) or (method, path) to aiohttp handler.
+    @return Async context yielding 'host:port'.
+    """
+    app = web.Application()
+    for route, handler in routes.items():
+        method, path = route if isinstance(route, tuple) else ("GET", route)
+        app.router.add_route(method, path, handler)
+    runner = web.AppRunner(app, shutdown_timeout=0.1)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        yield f"127.0.0.1:{port}"
+    finally:
+        await runner.cleanup()
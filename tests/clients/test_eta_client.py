@@ -0,0 +1,334 @@
+## @file test_eta_client.py
+#  @brief EtaClient against an ETA REST API stand-in (/user/var/<uri>) and the telemetry's menu index.
+
+import asyncio
+import base64
+import json
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from aiohttp import web
+from eta import telemetry
+from eta.client import EtaClient, parse_variable
+from eta.menu_index import MenuIndex
+from standin import stand_in
+
+NS = "http://www.eta.co.at/rest/v1"
+
+
+def _value_xml(uri: str, raw: int, scale: int = 10, dec: int = 1, unit: str = "°C") -> str:
+    return (f'<?xml version="1.0" encoding="utf-8"?><eta version="1.0" xmlns="{NS}">'
+            f'<value uri="/user/var{uri}" strValue="{raw / scale}" unit="{unit}" '
+            f'decPlaces="{dec}" scaleFactor="{scale}" advTextOffset="0">{raw}</value></eta>')
+
+
+class FakeEta:
+    """@brief ETA touch web server stand-in.
+
+    @param delay   Response delay per request [s].
+    @param broken  URI -> number of failing answers (HTTP 500) before it works; -1: always.
+    @param slow    URIs that take far longer than any budget.
+    """
+
+    def __init__(self, delay: float = 0.02, broken: dict | None = None, slow: set | None = None):
+        self.delay = delay
+        self.broken = dict(broken or {})
+        self.slow = slow or set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        ## @brief Client ports of all requests (one per pooled connection).
+        self.ports: set[int] = set()
+        self.requests: list[str] = []
+        self.auth: set = set()
+        ## @brief Varset name -> member URIs (without leading slash, as the ETA lists them).
+        self.varsets: dict[str, list[str]] = {}
+        ## @brief (method, path) of every varset request.
+        self.varset_requests: list[tuple[str, str]] = []
+        ## @brief Raw values of varset members (default: the last URI number).
+        self.values: dict[str, int] = {}
+
+    async def var(self, request: web.Request) -> web.Response:
+        uri = "/" + request.match_info["uri"]
+        self.requests.append(uri)
+        self.ports.add(request.transport.get_extra_info("peername")[1])
+        self.auth.add(request.headers.get("Authorization"))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(60 if uri in self.slow else self.delay)
+        finally:
+            self.in_flight -= 1
+        failures = self.broken.get(uri, 0)
+        if failures:
+            self.broken[uri] = failures - 1 if failures > 0 else failures
+            return web.Response(status=500, text="error")
+        return web.Response(text=_value_xml(uri, int(uri.rsplit("/", 1)[1])), content_type="text/xml")
+
+    async def varset(self, request: web.Request) -> web.Response:
+        name, uri = request.match_info["name"], request.match_info.get("uri")
+        self.varset_requests.append((request.method, request.path))
+        if request.method == "PUT" and uri is None:
+            self.varsets.setdefault(name, [])
+            return web.Response(status=201)
+        if name not in self.varsets:
+            return web.Response(status=404, text="no such varset")
+        members = self.varsets[name]
+        if request.method == "PUT":
+            members.append(uri)
+        elif request.method == "DELETE":
+            members.remove(uri)
+        else:
+            return web.Response(text=_varset_xml(name, members, self.values), content_type="text/xml")
+        return web.Response(text="ok")
+
+    def serve(self):
+        routes = {"/user/var/{uri:.*}": self.var}
+        for method in ("GET", "PUT", "DELETE"):
+            routes[(method, "/user/vars/{name}")] = self.varset
+            routes[(method, "/user/vars/{name}/{uri:.*}")] = self.varset
+        return stand_in(routes)
+
+
+def _varset_xml(name: str, members: list[str], values: dict) -> str:
+    raw = {uri: values.get(uri, int(uri.rsplit("/", 1)[1])) for uri in members}
+    variables = "".join(
+        f'<variable uri="{uri}" strValue="{raw[uri] / 10}" unit="°C" '
+        f'decPlaces="1" scaleFactor="10" advTextOffset="0">{raw[uri]}</variable>'
+        for uri in members)
+    return (f'<?xml version="1.0" encoding="utf-8"?><eta version="1.0" xmlns="{NS}">'
+            f'<vars uri="/user/vars/{name}">{variables}</vars></eta>')
+
+
+def _uris(count: int) -> list[str]:
+    return [f"/120/10101/0/0/{12000 + i}" for i in range(count)]
+
+
+def _fetch(server: FakeEta, uris: list[str], budget: float = 30, **kwargs):
+    async def run():
+        async with server.serve() as host:
+            client = EtaClient(f"http://{host}/user", "eta", "secret", **kwargs)
+            try:
+                values = await client.fetch_all(uris, budget=budget, progress=False)
+            finally:
+                await client.close()
+            return values, client.stats
+
+    return asyncio.run(run())
+
+
+def test_fetch_all_runs_in_parallel():
+    server = FakeEta(delay=0.1)
+    uris = _uris(12)
+    values, stats = _fetch(server, uris, concurrency=4)
+    assert values == {uri: uri.rsplit("/", 1)[1] for uri in uris}
+    assert stats["ok"] == 12 and stats["failed"] == 0 and stats["timed_out"] == 0
+    assert server.max_in_flight == 4
+    # 12 requests of 0.1 s take 1.2 s one by one, 0.3 s four at a time
+    assert stats["elapsed_s"] < 1.0
+    assert stats["latency_mean_s"] >= 0.1
+
+
+def test_pool_is_limited_and_kept_alive():
+    server = FakeEta()
+    _fetch(server, _uris(20), concurrency=2)
+    assert server.max_in_flight <= 2
+    assert len(server.ports) <= 2
+    assert server.auth == {"Basic " + base64.b64encode(b"eta:secret").decode()}
+
+
+def test_failing_uri_does_not_stop_the_others():
+    uris = _uris(6)
+    server = FakeEta(broken={uris[0]: -1, uris[1]: 1})
+    values, stats = _fetch(server, uris, retries=1)
+    assert values[uris[0]] is None
+    assert values[uris[1]] == uris[1].rsplit("/", 1)[1]
+    assert all(values[uri] is not None for uri in uris[2:])
+    assert stats["ok"] == 5 and stats["failed"] == 1
+    assert stats["retries"] == 2
+    assert server.requests.count(uris[0]) == 2
+
+
+def test_budget_cancels_slow_uris():
+    uris = _uris(4)
+    server = FakeEta(slow={uris[3]})
+    values, stats = _fetch(server, uris, budget=0.5, retries=0)
+    assert values[uris[3]] is None
+    assert all(values[uri] is not None for uri in uris[:3])
+    assert stats["timed_out"] == 1
+    assert stats["elapsed_s"] < 2
+
+
+def test_fetch_all_without_uris():
+    values, stats = _fetch(FakeEta(), [])
+    assert values == {}
+    assert stats["requested"] == 0 and stats["latency_mean_s"] is None
+
+
+def test_parse_variable():
+    value = ET.fromstring(_value_xml("/120/1", 653, scale=10, dec=1)).find(f"{{{NS}}}value")
+    assert parse_variable(value) == {"value": 65.3, "unit": "°C", "str": "65.3"}
+    whole = ET.fromstring(_value_xml("/120/1", 1802, scale=1, dec=0, unit="")).find(f"{{{NS}}}value")
+    assert parse_variable(whole) == {"value": 1802, "unit": "", "str": "1802.0"}
+    assert isinstance(parse_variable(whole)["value"], int)
+    text = ET.fromstring('<value unit="" strValue="Aus">Aus</value>')
+    assert parse_variable(text) == {"value": None, "unit": "", "str": "Aus"}
+    empty = ET.fromstring('<value scaleFactor="" decPlaces=""/>')
+    assert parse_variable(empty)["value"] is None
+
+
+def test_telemetry_keeps_the_menu_index(tmp_path, monkeypatch):
+    cache = tmp_path / "menu_index.json"
+    entries = {"/120/10101/0/0/12080": {"name": "Kessel", "path": "Kessel/Kessel", "variable": True}}
+    cache.write_text(json.dumps({"digest": "x", "fetched": time.time(), "entries": entries}))
+    built = []
+
+    def make_index():
+        built.append(MenuIndex(cache))
+        return built[-1]
+
+    monkeypatch.setattr(telemetry, "MenuIndex", make_index)
+    config = tmp_path / "eta.json"
+    config.write_text(json.dumps({"varset": "test", "variables": [{"path": "Kessel", "name": "boiler"}]}))
+    eta = telemetry.EtaTelemetry(config)
+
+    async def run():
+        first = await eta.menu_index()
+        second = await eta.menu_index()
+        await eta.client.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is second and len(built) == 1
+    assert telemetry.resolve_variables(eta.config, first) == {"/120/10101/0/0/12080": "boiler"}
+
+    # Only a changed cache file is re-read
+    entries["/120/1/0/0/1"] = {"name": "Kessel", "path": "Puffer/Kessel", "variable": True}
+    cache.write_text(json.dumps({"digest": "y", "fetched": time.time(), "entries": entries}))
+    os.utime(cache, ns=(time.time_ns(), time.time_ns() + 10**9))
+    asyncio.run(eta.menu_index())
+    assert first.digest == "y" and len(built) == 1
+
+    eta.apply_config({"varset": "test", "variables": [{"uri": "/120/1/0/0/1", "name": "x"}]})
+    assert asyncio.run(eta.menu_index()) is None
+
+
+def test_varset_sync_and_read():
+    server = FakeEta()
+    uris = _uris(3)
+
+    async def run():
+        async with server.serve() as host:
+            client = EtaClient(f"http://{host}/user", "eta", "secret")
+            try:
+                created = await client.sync_varset("monitor", uris)
+                server.varset_requests.clear()
+                # One member replaced, the others stay
+                changed = await client.sync_varset("monitor", [uris[0], uris[1], "/120/10101/0/0/12080"])
+                requests = list(server.varset_requests)
+                server.varset_requests.clear()
+                unchanged = await client.sync_varset("monitor", [uris[1], "120/10101/0/0/12080", uris[0]])
+                values = await client.read_varset("monitor")
+            finally:
+                await client.close()
+            return created, changed, requests, unchanged, values
+
+    created, changed, requests, unchanged, values = asyncio.run(run())
+    assert created == {"added": sorted(uris), "removed": []}
+    assert changed == {"added": ["/120/10101/0/0/12080"], "removed": [uris[2]]}
+    assert sorted(requests) == sorted([
+        ("GET", "/user/vars/monitor"),
+        ("PUT", "/user/vars/monitor/120/10101/0/0/12080"),
+        ("DELETE", f"/user/vars/monitor{uris[2]}"),
+    ])
+    assert unchanged == {"added": [], "removed": []}
+    assert server.varset_requests == [("GET", "/user/vars/monitor"), ("GET", "/user/vars/monitor")]
+    assert values == {
+        uris[0]: {"value": 1200.0, "unit": "°C", "str": "1200.0"},
+        uris[1]: {"value": 1200.1, "unit": "°C", "str": "1200.1"},
+        "/120/10101/0/0/12080": {"value": 1208.0, "unit": "°C", "str": "1208.0"},
+    }
+
+
+def test_backoff_frees_the_slot():
+    uris = _uris(4)
+    server = FakeEta(broken={uris[0]: 1})
+    values, stats = _fetch(server, uris, concurrency=1, retries=1)
+    assert all(values[uri] is not None for uri in uris)
+    # The others are fetched while the broken URI waits for its retry
+    assert server.requests == [uris[0], uris[1], uris[2], uris[3], uris[0]]
+
+
+def test_menu_is_parsed_off_the_loop(tmp_path):
+    menu = (f'<?xml version="1.0"?><eta xmlns="{NS}"><menu><fub uri="/120/10101" name="Kessel">'
+            '<object uri="/120/10101/0/0/12080" name="Kesseltemperatur"/></fub></menu></eta>').encode()
+    threads = []
+
+    class Index(MenuIndex):
+        def update(self, data: bytes) -> bool:
+            threads.append(threading.get_ident())
+            return super().update(data)
+
+    async def menu_handler(request):
+        return web.Response(body=menu, content_type="text/xml")
+
+    async def run():
+        async with stand_in({"/user/menu": menu_handler}) as host:
+            client = EtaClient(f"http://{host}/user", "eta", "secret")
+            index = Index(tmp_path / "index.json")
+            try:
+                changed = await index.refresh(client)
+            finally:
+                await client.close()
+            return index, changed
+
+    index, changed = asyncio.run(run())
+    assert changed and threads and threads[0] != threading.get_ident()
+    assert index.by_name("Kesseltemperatur") == ["/120/10101/0/0/12080"]
+
+
+def test_poll_writes_values_beyond_the_deadband(tmp_path, monkeypatch):
+    server = FakeEta()
+    boiler, buffer = "120/10101/0/0/12080", "120/10251/0/0/12242"
+    server.values = {boiler: 650, buffer: 400}
+    written = []
+
+    async def capture(self, point):
+        written.append(dict(point._fields))
+
+    monkeypatch.setattr(telemetry.influxConfig, "write_bucket_point_async", capture)
+    config = tmp_path / "eta.json"
+
+    async def run():
+        async with server.serve() as host:
+            config.write_text(json.dumps({
+                "base_url": f"http://{host}/user", "varset": "monitor", "variables": [
+                    {"uri": f"/{boiler}", "name": "boiler", "deadband": 0.5},
+                    {"uri": f"/{buffer}", "name": "buffer"},
+                ]}))
+            eta = telemetry.EtaTelemetry(config)
+            await eta.poll()
+            server.values = {boiler: 653, buffer: 401}       # boiler +0.3: inside its deadband
+            await eta.poll()
+            server.values = {boiler: 656, buffer: 401}       # boiler +0.6 since the last write
+            await eta.poll()
+            await eta.poll()                                 # nothing changed: no point at all
+            await eta.client.close()
+
+    asyncio.run(run())
+    assert written == [{"boiler": 65.0, "buffer": 40.0}, {"buffer": 40.1}, {"boiler": 65.6}]
+
+
+def test_reload_reuses_the_influx_client(tmp_path, monkeypatch):
+    closed = []
+    monkeypatch.setattr(telemetry.influxConfig, "close", lambda self: closed.append(self.INFLUX_BUCKET))
+    config = {"base_url": "http://eta:8080/user", "varset": "v", "variables": []}
+    path = tmp_path / "eta.json"
+    path.write_text(json.dumps(config))
+    eta = telemetry.EtaTelemetry(path)
+    influx = eta.influx
+    eta.apply_config({**config, "interval": 30})
+    eta.rebind("192.168.188.30", 8080)
+    assert eta.influx is influx and closed == []
+    eta.apply_config({**config, "bucket": "heating"})
+    assert eta.influx.INFLUX_BUCKET == "heating" and closed == ["eta"]
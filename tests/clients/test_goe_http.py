@@ -0,0 +1,261 @@
+## @file test_goe_http.py
+#  @brief GoEHttpClient and the WallboxManager HTTP fallback against a go-e API v2 stand-in.
+
+import asyncio
+import json
+import pytest
+from aiohttp import web
+from goE import wallbox_manager
+from goE.http_client import GoEHttpClient
+from goE.wallbox_manager import STATUS_KEYS, WallboxManager
+from harness import FakeMQTT
+from standin import stand_in
+
+SERIAL = "254959"
+
+
+class FakeCharger:
+    """@brief go-eCharger HTTP API v2 stand-in (/api/status and /api/set).
+
+    @param delay  Response delay [s].
+    @param error  HTTP status returned instead of the data (0: none).
+    @param drops  Number of requests answered by closing the connection.
+    """
+
+    def __init__(self, delay: float = 0, error: int = 0, drops: int = 0):
+        self.state = {"alw": True, "amp": 6, "car": 3, "cus": 1, "dwo": None, "eto": 123456,
+                      "frc": 1, "wh": 0, "nrg": [230, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                      "tma": [25.0, 26.0], "psm": 1, "modelStatus": 15, "fwv": "56.2", "sse": SERIAL}
+        self.delay = delay
+        self.error = error
+        self.drops = drops
+        ## @brief Query dict of every request.
+        self.queries: list[dict] = []
+
+    async def _common(self, request: web.Request) -> web.Response | None:
+        self.queries.append(dict(request.query))
+        if self.drops:
+            self.drops -= 1
+            request.transport.close()
+            return web.Response()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error:
+            return web.json_response({"error": "stand-in"}, status=self.error)
+        return None
+
+    async def status(self, request: web.Request) -> web.Response:
+        response = await self._common(request)
+        if response is not None:
+            return response
+        keys = request.query["filter"].split(",") if "filter" in request.query else self.state
+        return web.json_response({key: self.state[key] for key in keys if key in self.state})
+
+    async def set(self, request: web.Request) -> web.Response:
+        response = await self._common(request)
+        if response is not None:
+            return response
+        result = {}
+        for key, value in request.query.items():
+            self.state[key] = json.loads(value)
+            result[key] = True
+        return web.json_response(result)
+
+    def serve(self):
+        return stand_in({"/api/status": self.status, "/api/set": self.set})
+
+
+def _manager(tmp_path, mqtt: FakeMQTT, host: str, **charger) -> WallboxManager:
+    config = {"chargers": [{"serial": SERIAL, "name": "garage", "ip": host, **charger}]}
+    path = tmp_path / "wallbox.json"
+    path.write_text(json.dumps(config))
+    return WallboxManager(path, mqtt)
+
+
+def test_status_is_filtered():
+    charger = FakeCharger()
+
+    async def run():
+        async with charger.serve() as host:
+            client = GoEHttpClient(host, ["amp", "car", "nrg", "psm"])
+            status = await client.get_status()
+            only_amp = await client.get_status(["amp"])
+            await client.close()
+            return client, status, only_amp
+
+    client, status, only_amp = asyncio.run(run())
+    assert charger.queries[0] == {"filter": "amp,car,nrg,psm"}
+    assert status == {"amp": 6, "car": 3, "nrg": charger.state["nrg"], "psm": 1}
+    assert only_amp == {"amp": 6}
+    assert client.message == status
+
+
+def test_setpoints_are_sent_in_one_request():
+    charger = FakeCharger()
+
+    async def run():
+        async with charger.serve() as host:
+            client = GoEHttpClient(host)
+            result = await client.set_keys([
+                [f"go-eCharger/{SERIAL}/amp/set", 10],
+                [f"go-eCharger/{SERIAL}/frc/set", 0],
+                [f"go-eCharger/{SERIAL}/psm/set", 2],
+            ])
+            await client.close()
+            return result
+
+    assert asyncio.run(run()) == {"amp": True, "frc": True, "psm": True}
+    assert charger.queries == [{"amp": "10", "frc": "0", "psm": "2"}]
+    assert (charger.state["amp"], charger.state["frc"], charger.state["psm"]) == (10, 0, 2)
+
+
+@pytest.mark.parametrize("error", [404, 500])
+def test_http_error_returns_none(error):
+    charger = FakeCharger(error=error)
+
+    async def run():
+        async with charger.serve() as host:
+            client = GoEHttpClient(host)
+            result = (await client.get_status(), await client.set_values({"amp": 10}))
+            await client.close()
+            return result
+
+    assert asyncio.run(run()) == (None, None)
+    # HTTP errors are answers, not connection problems: no retry
+    assert len(charger.queries) == 2
+
+
+def test_slow_response_times_out():
+    charger = FakeCharger(delay=1.0)
+
+    async def run():
+        async with charger.serve() as host:
+            client = GoEHttpClient(host, timeout=0.2)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            status = await client.get_status()
+            elapsed = loop.time() - start
+            await client.close()
+            return status, elapsed
+
+    status, elapsed = asyncio.run(run())
+    assert status is None
+    assert elapsed < 0.8
+    assert len(charger.queries) == 1
+
+
+def test_dropped_connection_is_retried():
+    # aiohttp itself repeats a GET once on a closed keep-alive socket,
+    # so two drops are needed to reach the client's own retry
+    charger = FakeCharger(drops=2)
+
+    async def run():
+        async with charger.serve() as host:
+            client = GoEHttpClient(host)
+            status = await client.get_status(["amp"])
+            await client.close()
+            return status
+
+    assert asyncio.run(run()) == {"amp": 6}
+    assert charger.drops == 0
+
+
+def test_retries_are_limited():
+    charger = FakeCharger(drops=100)
+
+    async def run():
+        async with charger.serve() as host:
+            client = GoEHttpClient(host, retries=0)
+            status = await client.get_status(["amp"])
+            await client.close()
+            return status
+
+    assert asyncio.run(run()) is None
+    assert charger.drops > 90
+
+
+def test_manager_prefers_complete_mqtt_status(tmp_path):
+    charger = FakeCharger()
+    mqtt = FakeMQTT(SERIAL, status={"amp": 8, "car": 2, "nrg": [0] * 16, "psm": 1})
+
+    async def run():
+        async with charger.serve() as host:
+            manager = _manager(tmp_path, mqtt, host)
+            status = await manager.read_status(manager.chargers[0])
+            await manager.http[SERIAL].close()
+            return status
+
+    assert asyncio.run(run())["amp"] == 8
+    assert charger.queries == []
+
+
+def test_manager_falls_back_to_http(tmp_path):
+    charger = FakeCharger()
+    mqtt = FakeMQTT(SERIAL, status={"amp": 8}, connected=False)
+
+    async def run():
+        async with charger.serve() as host:
+            manager = _manager(tmp_path, mqtt, host)
+            status = await manager.read_status(manager.chargers[0])
+            await manager._send(manager.chargers[0], [[f"go-eCharger/{SERIAL}/amp/set", 12]])
+            await manager.http[SERIAL].close()
+            return status
+
+    status = asyncio.run(run())
+    assert charger.queries[0] == {"filter": ",".join(STATUS_KEYS)}
+    assert status["amp"] == 6 and status["car"] == 3
+    assert charger.queries[1] == {"amp": "12"}
+    assert mqtt.published == []
+
+
+def test_manager_keeps_mqtt_status_if_http_fails(tmp_path):
+    charger = FakeCharger(error=503)
+    mqtt = FakeMQTT(SERIAL, status={"amp": 8, "car": 2})
+
+    async def run():
+        async with charger.serve() as host:
+            manager = _manager(tmp_path, mqtt, host)
+            status = await manager.read_status(manager.chargers[0])
+            await manager._send(manager.chargers[0], [[f"go-eCharger/{SERIAL}/amp/set", 12]])
+            await manager.http[SERIAL].close()
+            return status
+
+    assert asyncio.run(run()) == {"amp": 8, "car": 2}
+    assert mqtt.published == [(f"go-eCharger/{SERIAL}/amp/set", 12)]
+
+
+def test_replaced_clients_are_closed(tmp_path):
+    charger = FakeCharger()
+    mqtt = FakeMQTT(SERIAL, status={})
+
+    async def run():
+        async with charger.serve() as host:
+            manager = _manager(tmp_path, mqtt, host)
+            old = manager.http[SERIAL]
+            await old.get_status()
+            manager.apply_config({"chargers": [{"serial": SERIAL, "name": "garage", "ip": "192.0.2.1"}]})
+            moved = manager.http[SERIAL]
+            await asyncio.sleep(0.05)
+            closed_on_move = old._session is None
+            manager.apply_config({"chargers": []})
+            await asyncio.sleep(0.05)
+            return moved is not old, closed_on_move, manager.http, moved._session
+
+    replaced, closed_on_move, http, session = asyncio.run(run())
+    assert replaced and closed_on_move
+    assert http == {} and session is None
+
+
+def test_low_battery_current_respects_min_current(tmp_path, monkeypatch):
+    async def inline(func, *args, **kwargs):
+        return None
+
+    monkeypatch.setattr(wallbox_manager, "run_blocking", inline)
+    monkeypatch.setattr(wallbox_manager, "print", lambda *args, **kwargs: None, raising=False)
+    mqtt = FakeMQTT(SERIAL, status={"amp": 6, "car": 3, "nrg": [0] * 16, "psm": 1})
+    manager = _manager(tmp_path, mqtt, "", min_current=10)
+    manager.battery_soc = 5
+    manager.ppv_mean = 0
+    asyncio.run(manager.control())
+    assert (f"go-eCharger/{SERIAL}/amp/set", 10) in mqtt.published
+    assert manager.chargers[0]["charging_on"]
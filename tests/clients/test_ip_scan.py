@@ -0,0 +1,136 @@
+## @file test_ip_scan.py
+#  @brief Network scanner: ICMP receiver shutdown, TCP fallback, ARP table and host cache.
+
+import asyncio
+import ip_scan
+
+ARP = """IP address       HW type     Flags       HW address            Mask     Device
+192.168.188.1    0x1         0x2         3c:a6:2f:11:22:33     *        eth0
+192.168.188.30   0x1         0x2         00:50:c2:aa:bb:cc     *        eth0
+192.168.188.40   0x1         0x0         00:00:00:00:00:00     *        eth0
+192.168.188.41   0x1         0x6         00:00:00:00:00:00     *        eth0
+192.168.188.42   0x1         0x0         de:ad:be:ef:00:01     *        eth0
+"""
+
+
+class BrokenIcmpSocket:
+    """@brief Stand-in ICMP socket; records whether the receiver was finished at close."""
+
+    def __init__(self, *args):
+        self.closed_with = None
+
+    def setblocking(self, flag):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed_with = {task.get_name() for task in asyncio.all_tasks()}
+
+
+def test_icmp_receiver_gives_up_and_is_awaited(monkeypatch):
+    monkeypatch.setattr(ip_scan, "print", lambda *a, **k: None, raising=False)
+    sockets, receives = [], []
+
+    async def recvfrom(sock, size):
+        receives.append(size)
+        raise OSError("socket broken")
+
+    async def sendto(sock, data, address):
+        pass
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        monkeypatch.setattr(loop, "sock_recvfrom", recvfrom)
+        monkeypatch.setattr(loop, "sock_sendto", sendto)
+        # Patched only now: the loop itself needs the real socket class
+        monkeypatch.setattr(ip_scan.socket, "socket", lambda *a: sockets.append(BrokenIcmpSocket()) or sockets[-1])
+        asyncio.current_task().set_name("sweep")
+        start = loop.time()
+        alive = await ip_scan.icmp_sweep(["192.168.188.1", "192.168.188.2"], timeout=5)
+        monkeypatch.undo()
+        return alive, loop.time() - start
+
+    alive, elapsed = asyncio.run(run())
+    assert alive == set()
+    # The receiver stopped after RECV_ERROR_LIMIT errors instead of spinning until the timeout
+    assert len(receives) == ip_scan.RECV_ERROR_LIMIT and elapsed < 2
+    # Only the sweep itself was still running when the socket was closed
+    assert sockets[0].closed_with == {"sweep"}
+
+
+def test_tcp_fallback_without_icmp_sockets(monkeypatch):
+    monkeypatch.setattr(ip_scan, "print", lambda *a, **k: None, raising=False)
+
+    async def no_icmp(hosts, timeout):
+        return None
+
+    async def accept(reader, writer):
+        writer.close()
+
+    open_connection = asyncio.open_connection
+
+    async def silent_host(ip, port):
+        # Hosts outside loopback never answer (whatever the sandbox network does)
+        if not ip.startswith("127."):
+            await asyncio.sleep(3600)
+        return await open_connection(ip, port)
+
+    async def run():
+        monkeypatch.setattr(ip_scan.asyncio, "open_connection", silent_host)
+        server = await asyncio.start_server(accept, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        monkeypatch.setattr(ip_scan, "TCP_PORTS", (port,))
+        monkeypatch.setattr(ip_scan, "icmp_sweep", no_icmp)
+        async with server:
+            # 127.0.0.1 accepts, 127.0.0.2 refuses (also alive), TEST-NET does not answer
+            alive = await ip_scan.tcp_sweep(["127.0.0.1", "127.0.0.2", "192.0.2.1"], timeout=0.3)
+            swept = await ip_scan.sweep("127.0.0.0/30", timeout=0.3)
+        return alive, swept
+
+    alive, swept = asyncio.run(run())
+    assert alive == {"127.0.0.1", "127.0.0.2"}
+    assert swept == ["127.0.0.1", "127.0.0.2"]
+
+
+def test_arp_table_keeps_complete_entries(tmp_path):
+    path = tmp_path / "arp"
+    path.write_text(ARP)
+    assert ip_scan.read_arp_table(str(path)) == {
+        "192.168.188.1": "3c:a6:2f:11:22:33",
+        "192.168.188.30": "00:50:c2:aa:bb:cc",
+    }
+    assert ip_scan.read_arp_table(str(tmp_path / "missing")) == {}
+
+
+def test_cached_hosts_are_not_looked_up_again(monkeypatch):
+    lookups = []
+    monkeypatch.setattr(ip_scan, "get_hostname", lambda ip: lookups.append(ip) or f"host-{ip[-2:]}")
+    monkeypatch.setattr(ip_scan, "get_mac_address", lambda ip: lookups.append(("mac", ip)))
+    now = 1_750_000_000
+    cache = {
+        "3c:a6:2f:11:22:33": {"ip": "192.168.188.1", "hostname": "fritz.box", "city": "lokal",
+                              "country": "lokal", "updated": now - 60},
+        # Same device, but the IP changed since it was cached
+        "00:50:c2:aa:bb:cc": {"ip": "192.168.188.29", "hostname": "eta", "city": "lokal",
+                              "country": "lokal", "updated": now - 60},
+    }
+    arp = {"192.168.188.1": "3c:a6:2f:11:22:33", "192.168.188.30": "00:50:c2:aa:bb:cc"}
+
+    async def run():
+        semaphore = asyncio.Semaphore(ip_scan.ENRICH_CONCURRENCY)
+        return await asyncio.gather(*(ip_scan.enrich_host(ip, arp.get(ip), cache, semaphore, now)
+                                      for ip in ("192.168.188.1", "192.168.188.30", "192.168.188.50")))
+
+    router, eta, unknown = asyncio.run(run())
+    assert router["hostname"] == "fritz.box"
+    assert eta == {"ip": "192.168.188.30", "hostname": "host-30", "mac_address": "00:50:c2:aa:bb:cc",
+                   "city": "lokal", "country": "lokal"}
+    assert cache["00:50:c2:aa:bb:cc"]["ip"] == "192.168.188.30"
+    # Without an ARP entry the MAC is looked up per host; unknown MACs are not cached
+    assert unknown["mac_address"] == "unbekannt"
+    assert sorted(map(str, lookups)) == sorted(map(str, ["192.168.188.30", ("mac", "192.168.188.50"), "192.168.188.50"]))
+    assert len(cache) == 2
+    # An expired entry is looked up again
+    assert ip_scan.cached_entry(cache, "3c:a6:2f:11:22:33", "192.168.188.1", now + ip_scan.CACHE_TTL) is None
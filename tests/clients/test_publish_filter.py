@@ -0,0 +1,63 @@
+## @file test_publish_filter.py
+#  @brief Deadband, heartbeat and retain rules of the MQTT publish filter.
+
+from types import SimpleNamespace
+
+from mqtt_client.publish_filter import PublishFilter
+from mqtt_client.service import MQTTManager
+
+CONFIG = {
+    "heartbeat": 60,
+    "rules": {
+        "goodwe/+/ppv": {"deadband": 20},
+        "goodwe/+/pbattery": {"deadband": 10, "relative": 0.05, "heartbeat": 10},
+        "goodwe/+/battery_soc": {"retain": True},
+    },
+}
+
+
+def test_values_inside_the_deadband_are_suppressed():
+    f = PublishFilter(CONFIG)
+    assert f.select([["goodwe/a/ppv", 1000]], now=0) == [["goodwe/a/ppv", 1000]]
+    assert f.select([["goodwe/a/ppv", 1015]], now=1) == []
+    assert f.select([["goodwe/a/ppv", 985]], now=2) == []
+    # Compared against the last published value, not the last seen one
+    assert f.select([["goodwe/a/ppv", 1021]], now=3) == [["goodwe/a/ppv", 1021]]
+    # Relative deadband: 5 % of 1000 W beats the absolute 10 W
+    f.select([["goodwe/a/pbattery", 1000]], now=0)
+    assert f.select([["goodwe/a/pbattery", 1040]], now=1) == []
+    assert f.select([["goodwe/a/pbattery", 1060]], now=2) == [["goodwe/a/pbattery", 1060]]
+    # Topics without a rule are always published, non-numeric values on change
+    assert f.select([["goodwe/a/mode", "on"], ["goodwe/a/mode", "on"]], now=4) == [
+        ["goodwe/a/mode", "on"], ["goodwe/a/mode", "on"]]
+    f.select([["goodwe/a/battery_soc", "full"]], now=0)
+    assert f.select([["goodwe/a/battery_soc", "full"]], now=1) == []
+    assert f.select([["goodwe/a/battery_soc", "low"]], now=2) == [["goodwe/a/battery_soc", "low"]]
+
+
+def test_heartbeat_forces_a_publish():
+    f = PublishFilter(CONFIG)
+    f.select([["goodwe/a/ppv", 1000], ["goodwe/a/pbattery", 500]], now=0)
+    assert f.select([["goodwe/a/ppv", 1000], ["goodwe/a/pbattery", 500]], now=9.9) == []
+    # The rule's own heartbeat (10 s) overrides the global one (60 s)
+    assert f.select([["goodwe/a/ppv", 1000], ["goodwe/a/pbattery", 500]], now=10) == [
+        ["goodwe/a/pbattery", 500]]
+    assert f.select([["goodwe/a/ppv", 1000]], now=59.9) == []
+    assert f.select([["goodwe/a/ppv", 1000]], now=60) == [["goodwe/a/ppv", 1000]]
+    # After a reconnect everything is published again
+    f.reset()
+    assert f.select([["goodwe/a/ppv", 1000]], now=61) == [["goodwe/a/ppv", 1000]]
+
+
+def test_retain_is_set_per_topic():
+    sent = []
+    mqtt = SimpleNamespace(
+        publish_filter=PublishFilter(CONFIG),
+        publish=lambda topic, msg, qos=0, retain=False: sent.append((topic, retain)))
+    data = [["goodwe/a/battery_soc", 80], ["goodwe/a/ppv", 1000], ["goodwe/b/battery_soc", 75]]
+    MQTTManager._publish_all(mqtt, data, 0, False)
+    assert sent == [("goodwe/a/battery_soc", True), ("goodwe/a/ppv", False), ("goodwe/b/battery_soc", True)]
+    sent.clear()
+    # A retain requested by the caller is kept for every topic
+    MQTTManager._publish_all(mqtt, data[1:2], 0, True)
+    assert sent == [("goodwe/a/ppv", True)]
@@ -0,0 +1,96 @@
+## @file test_wallbox_distribution.py
+#  @brief distribute_surplus(): strategies, fuse limit and phase selection.
+
+import asyncio
+import json
+from goE import wallbox_manager
+from goE.wallbox_manager import STRATEGY_FAIR, STRATEGY_PRIORITY, WallboxManager, distribute_surplus
+
+VOLTAGE = 230
+
+
+def _charger(serial: str, priority: int = 1, phase: int = 1, min_current: int = 6,
+             max_current: int = 16, active_phases: int = 0) -> dict:
+    return {"serial": serial, "priority": priority, "phase": phase, "min_current": min_current,
+            "max_current": max_current, "active_phases": active_phases}
+
+
+def _phase_load(chargers: list[dict], targets: dict) -> list[int]:
+    load = [0, 0, 0]
+    for charger in chargers:
+        target = targets[charger["serial"]]
+        if target["phases"] == 3:
+            load = [x + target["ampere"] for x in load]
+        elif target["phases"] == 1:
+            load[charger["phase"] - 1] += target["ampere"]
+    return load
+
+
+def test_priority_fills_the_first_charger():
+    chargers = [_charger("b", priority=2, phase=2), _charger("a", priority=1)]
+    # 10 A on one phase: not enough for both minimums, the higher priority wins
+    targets = distribute_surplus(10 * VOLTAGE, chargers, 32, STRATEGY_PRIORITY, VOLTAGE)
+    assert targets == {"a": {"ampere": 10, "phases": 1}, "b": {"ampere": 0, "phases": 0}}
+    # 16 A: both run, the rest goes to the first one
+    targets = distribute_surplus(16 * VOLTAGE, chargers, 32, STRATEGY_PRIORITY, VOLTAGE)
+    assert targets == {"a": {"ampere": 10, "phases": 1}, "b": {"ampere": 6, "phases": 1}}
+
+
+def test_fair_splits_evenly():
+    chargers = [_charger("a", priority=1), _charger("b", priority=2, phase=2)]
+    targets = distribute_surplus(16 * VOLTAGE, chargers, 32, STRATEGY_FAIR, VOLTAGE)
+    assert targets == {"a": {"ampere": 8, "phases": 1}, "b": {"ampere": 8, "phases": 1}}
+    # An odd step goes to the charger raised first
+    targets = distribute_surplus(17 * VOLTAGE, chargers, 32, STRATEGY_FAIR, VOLTAGE)
+    assert targets["a"]["ampere"] + targets["b"]["ampere"] == 17
+    assert abs(targets["a"]["ampere"] - targets["b"]["ampere"]) <= 1
+
+
+def test_fuse_limit_caps_every_phase():
+    chargers = [_charger("a", priority=1), _charger("b", priority=2)]
+    for strategy in (STRATEGY_PRIORITY, STRATEGY_FAIR):
+        targets = distribute_surplus(30000, chargers, 16, strategy, VOLTAGE)
+        load = _phase_load(chargers, targets)
+        assert max(load) == 16
+        assert all(t["ampere"] <= 16 for t in targets.values())
+    # Under a 10 A fuse 3 phases at 10 A carry three times the power of 1 phase at 10 A
+    targets = distribute_surplus(30000, [_charger("a")], 10, STRATEGY_PRIORITY, VOLTAGE)
+    assert targets == {"a": {"ampere": 10, "phases": 3}}
+
+
+def test_low_surplus_falls_back_to_one_phase():
+    chargers = [_charger("a")]
+    # 3 phases at 6 A need 4140 W
+    assert distribute_surplus(3000, chargers, 32, voltage=VOLTAGE) == {"a": {"ampere": 13, "phases": 1}}
+    assert distribute_surplus(5000, chargers, 32, voltage=VOLTAGE) == {"a": {"ampere": 7, "phases": 3}}
+    assert distribute_surplus(1000, chargers, 32, voltage=VOLTAGE) == {"a": {"ampere": 0, "phases": 0}}
+
+
+class _Recorder:
+    """@brief MQTT stand-in that records the sent commands."""
+
+    connected = True
+
+    def __init__(self):
+        self.published: list = []
+
+    def subscribe_topics(self, topics, qos: int = 0) -> None:
+        pass
+
+    async def set_keys_async(self, data, qos: int = 0, retain: bool = False) -> None:
+        self.published.extend(data)
+
+
+def test_phase_mode_is_forced(tmp_path, monkeypatch):
+    monkeypatch.setattr(wallbox_manager, "print", lambda *args, **kwargs: None, raising=False)
+    path = tmp_path / "wallbox.json"
+    path.write_text(json.dumps({"chargers": [{"serial": "1"}]}))
+    mqtt = _Recorder()
+    manager = WallboxManager(path, mqtt)
+    charger = manager.chargers[0]
+    asyncio.run(manager._apply(charger, {"ampere": 8, "phases": 3}))
+    asyncio.run(manager._apply(charger, {"ampere": 10, "phases": 1}))
+    asyncio.run(manager._apply(charger, None))
+    psm = [value for topic, value in mqtt.published if topic.endswith("psm/set")]
+    # Forced 3 / forced 1 while charging, automatic again when stopped
+    assert psm == [2, 1, 0]
@@ -0,0 +1,22 @@
+## @file conftest.py
+#  @brief Common setup of all test suites.
+#
+#  Puts src/ on sys.path and runs every test from the src directory,
+#  because the modules open their config files with relative paths
+#  (main.py is started from src/ as well). The InfluxDB client only needs
+#  a token to be constructed; no test talks to a real server.
+
+import os
+import sys
+from pathlib import Path
+import pytest
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC))
+os.environ.setdefault("INFLUX_TOKEN", "tests")
+
+
+@pytest.fixture(autouse=True)
+def in_src(monkeypatch):
+    """@brief Modules open their config files relative to src/."""
+    monkeypatch.chdir(SRC)
@@ -0,0 +1,52 @@
+## @file test_archive.py
+#  @brief SampleArchive: completed hours and the final flush on shutdown.
+
+import asyncio
+from core import archive as archive_module
+from core.archive import SampleArchive, load
+
+HOUR = 1_750_000_000 - 1_750_000_000 % 3600
+
+
+def test_final_flush_writes_the_current_hour(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive_module, "print", lambda *args, **kwargs: None, raising=False)
+    archive = SampleArchive(tmp_path)
+    for i in range(3):
+        archive.add("inverter", HOUR + i * 2, {"ppv": 100 + i})
+    archive.add("inverter", HOUR + 3600, {"ppv": 200})
+
+    # The regular job only writes the completed hour
+    asyncio.run(archive.flush_async())
+    assert archive.files == 1
+    assert list(load("inverter", HOUR, HOUR + 7200, root=tmp_path)["ppv"]) == [100, 101, 102]
+
+    asyncio.run(archive.flush_async(final=True))
+    assert archive.files == 2
+    assert list(load("inverter", HOUR, HOUR + 7200, root=tmp_path)["ppv"]) == [100, 101, 102, 200]
+    assert archive.flush(final=True) == []
+
+
+def test_failed_write_keeps_the_hour(tmp_path, monkeypatch):
+    log = []
+    monkeypatch.setattr(archive_module, "print", lambda *args, **kwargs: log.append(args[0]), raising=False)
+    archive = SampleArchive(tmp_path)
+    for hour in range(3):
+        archive.add("inverter", HOUR + hour * 3600, {"ppv": hour})
+        archive.add("wallbox", HOUR + hour * 3600, {"power": hour})
+    write = archive._write
+
+    def failing(source, hour, rows):
+        if source == "inverter":
+            raise OSError("disk full")
+        return write(source, hour, rows)
+
+    monkeypatch.setattr(archive, "_write", failing)
+    paths = archive.flush()
+    # The wallbox hours are written, the failing inverter hours are kept
+    assert len(paths) == 2 and len(log) == 2
+    assert all("inverter" in line and "disk full" in line for line in log)
+
+    monkeypatch.setattr(archive, "_write", write)
+    assert len(archive.flush(final=True)) == 4
+    assert list(load("inverter", HOUR, HOUR + 3 * 3600, root=tmp_path)["ppv"]) == [0, 1, 2]
+    assert archive.flush(final=True) == []
@@ -0,0 +1,71 @@
+## @file test_energy.py
+#  @brief EnergyIntegrator: intervals across local midnight and the checkpoint restore.
+
+import pytest
+from core import energy as energy_module
+from core.energy import EnergyIntegrator
+
+START = 1_750_000_000
+MIDNIGHT = energy_module._next_midnight(START)
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(energy_module, "print", lambda *a, **k: None, raising=False)
+
+
+def test_interval_across_midnight_is_split(tmp_path):
+    energy = EnergyIntegrator(tmp_path / "energy.json")
+    energy.add(MIDNIGHT - 4, {"pv": 1000, "house": 0})
+    energy.add(MIDNIGHT - 2, {"pv": 1000, "house": 0})
+    energy.add(MIDNIGHT + 2, {"pv": 1000, "house": 400})    # house ramps 0 -> 400 W across midnight
+    energy.add(MIDNIGHT + 4, {"pv": 1000, "house": 400})
+
+    assert energy.day == energy_module._day(MIDNIGHT)
+    # 4 s of 1000 W before midnight, 4 s after
+    assert energy.yesterday["pv"] == pytest.approx(4000 / 3600)
+    assert energy.today["pv"] == pytest.approx(4000 / 3600)
+    assert energy.total["pv"] == pytest.approx(8000 / 3600)
+    # Linear interpolation: 200 W at midnight
+    assert energy.yesterday["house"] == pytest.approx(100 * 2 / 3600)
+    assert energy.today["house"] == pytest.approx((300 * 2 + 400 * 2) / 3600)
+    assert energy.gaps == 0
+
+
+def test_long_intervals_are_not_integrated(tmp_path):
+    energy = EnergyIntegrator(tmp_path / "energy.json", max_gap=10)
+    energy.add(START, {"pv": 1000})
+    energy.add(START + 30, {"pv": 1000})
+    energy.add(START + 32, {"pv": 1000, "wallbox": 2000})
+    assert energy.today == {"pv": pytest.approx(2000 / 3600)}
+    assert energy.gaps == 1
+
+
+def test_restart_continues_from_the_checkpoint(tmp_path):
+    path = tmp_path / "energy.json"
+    energy = EnergyIntegrator(path)
+    for t in range(0, 10, 2):
+        energy.add(MIDNIGHT - 3600 + t, {"pv": 3600})
+    energy.save()
+    assert not path.with_suffix(".tmp").exists()
+
+    restored = EnergyIntegrator(path)
+    assert restored.day == energy.day
+    assert restored.today == energy.today == {"pv": pytest.approx(8)}
+    assert restored.total == energy.total
+    # The first sample after the restart only starts a new interval
+    restored.add(MIDNIGHT - 1800, {"pv": 3600})
+    restored.add(MIDNIGHT - 1798, {"pv": 3600})
+    assert restored.today["pv"] == pytest.approx(10)
+    # The next day moves the restored day to 'yesterday'
+    restored.add(MIDNIGHT + 60, {"pv": 3600})
+    assert restored.yesterday == {"pv": pytest.approx(10)} and restored.today == {}
+    assert restored.total["pv"] == pytest.approx(10)
+
+
+def test_invalid_checkpoint_starts_at_zero(tmp_path):
+    path = tmp_path / "energy.json"
+    path.write_text("{truncated")
+    energy = EnergyIntegrator(path)
+    assert (energy.day, energy.today, energy.total) == ("", {}, {})
+    assert EnergyIntegrator(tmp_path / "missing.json").total == {}
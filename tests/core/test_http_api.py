@@ -0,0 +1,127 @@
+## @file test_http_api.py
+#  @brief LatestValuesServer: ETag / 304 handling and the long-poll timeout.
+
+import asyncio
+import time
+from aiohttp.test_utils import TestClient, TestServer
+from core import http_api
+from core.http_api import LatestValuesServer
+from core.state import LatestValues
+
+
+class FakeMQTT:
+    """@brief MQTTManager state store stand-in (version and snapshot)."""
+
+    def __init__(self):
+        self.version = 0
+        self.values = {"go-eCharger/254959/amp": 6}
+
+    def snapshot(self):
+        return self.version, dict(self.values)
+
+
+async def _client(state: LatestValues, mqtt=None) -> TestClient:
+    client = TestClient(TestServer(LatestValuesServer(state, mqtt).app))
+    await client.start_server()
+    return client
+
+
+def test_etag_and_not_modified():
+    async def run():
+        state = LatestValues()
+        state.update("computed", {"house_consumption": 450})
+        client = await _client(state, FakeMQTT())
+        try:
+            first = await client.get("/api/latest/computed")
+            etag = first.headers["ETag"]
+            body = await first.json()
+            same = await client.get("/api/latest/computed", headers={"If-None-Match": etag})
+            state.update("computed", {"house_consumption": 450})        # unchanged: same version
+            still = await client.get("/api/latest/computed", headers={"If-None-Match": etag})
+            state.update("computed", {"house_consumption": 500})
+            changed = await client.get("/api/latest/computed", headers={"If-None-Match": etag})
+            everything = await client.get("/api/latest")
+            return (first.status, etag, body, same.status, same.headers["ETag"], still.status,
+                    changed.status, changed.headers["ETag"], await changed.json(), await everything.json())
+        finally:
+            await client.close()
+
+    status, etag, body, same, same_etag, still, changed, new_etag, new_body, everything = asyncio.run(run())
+    assert (status, etag, body) == (200, '"s1"', {"house_consumption": 450})
+    assert (same, same_etag, still) == (304, etag, 304)
+    assert (changed, new_etag, new_body) == (200, '"s2"', {"house_consumption": 500})
+    assert everything["computed"] == new_body and everything["mqtt"] == {"go-eCharger/254959/amp": 6}
+
+
+def test_long_poll_times_out_with_304():
+    async def run():
+        state = LatestValues()
+        state.update("inverter", {"ppv": {"value": 1000, "unit": "W"}})
+        client = await _client(state)
+        try:
+            etag = (await client.get("/api/latest/inverter")).headers["ETag"]
+            start = time.monotonic()
+            response = await client.get("/api/latest/inverter?wait=0.3", headers={"If-None-Match": etag})
+            return response.status, response.headers["ETag"] == etag, time.monotonic() - start
+        finally:
+            await client.close()
+
+    status, same_etag, elapsed = asyncio.run(run())
+    assert status == 304 and same_etag
+    assert 0.3 <= elapsed < 1.5
+
+
+def test_long_poll_returns_on_change(monkeypatch):
+    monkeypatch.setattr(http_api, "POLL_STEP", 0.05)
+
+    async def run():
+        state, mqtt = LatestValues(), FakeMQTT()
+        state.update("inverter", {"ppv": {"value": 1000, "unit": "W"}})
+        client = await _client(state, mqtt)
+        try:
+            etag = (await client.get("/api/latest/inverter")).headers["ETag"]
+            mqtt_etag = (await client.get("/api/latest/mqtt")).headers["ETag"]
+
+            async def change():
+                await asyncio.sleep(0.1)
+                state.update("inverter", {"ppv": {"value": 1200, "unit": "W"}})
+                await asyncio.sleep(0.1)
+                mqtt.version += 1
+                mqtt.values["go-eCharger/254959/amp"] = 10
+
+            start = time.monotonic()
+            changer = asyncio.create_task(change())
+            inverter = await client.get("/api/latest/inverter?wait=30", headers={"If-None-Match": etag})
+            mqtt_response = await client.get("/api/latest/mqtt?wait=30", headers={"If-None-Match": mqtt_etag})
+            elapsed = time.monotonic() - start
+            await changer
+            return inverter.status, await inverter.json(), mqtt_response.status, await mqtt_response.json(), elapsed
+        finally:
+            await client.close()
+
+    status, body, mqtt_status, mqtt_body, elapsed = asyncio.run(run())
+    assert status == 200 and body == {"ppv": {"value": 1200, "unit": "W"}}
+    # MQTT changes have no event, they are noticed by the POLL_STEP re-check
+    assert mqtt_status == 200 and mqtt_body == {"go-eCharger/254959/amp": 10}
+    assert elapsed < 1.5
+
+
+def test_wait_is_bounded_and_validated(monkeypatch):
+    monkeypatch.setattr(http_api, "MAX_WAIT", 0.2)
+
+    async def run():
+        client = await _client(LatestValues())
+        try:
+            etag = (await client.get("/api/latest/computed")).headers["ETag"]
+            start = time.monotonic()
+            capped = await client.get("/api/latest/computed?wait=3600", headers={"If-None-Match": etag})
+            elapsed = time.monotonic() - start
+            invalid = await client.get("/api/latest/computed?wait=soon")
+            unknown = await client.get("/api/latest/battery")
+            return capped.status, elapsed, invalid.status, unknown.status
+        finally:
+            await client.close()
+
+    capped, elapsed, invalid, unknown = asyncio.run(run())
+    assert capped == 304 and elapsed < 1.5
+    assert (invalid, unknown) == (400, 404)
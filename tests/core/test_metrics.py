@@ -0,0 +1,67 @@
+## @file test_metrics.py
+#  @brief OpenMetrics rendering of counters, gauges and histograms.
+
+import pytest
+from core.metrics import Counter, Gauge, Histogram, MetricsRegistry, _Metric
+
+
+def test_render_counters_gauges_and_histograms():
+    registry = MetricsRegistry()
+    reconnects = Counter("reconnects", "Connection re-establishments", ("component",), registry=registry)
+    queue = Gauge("queue_depth", "Waiting batches", registry=registry)
+    runtime = Histogram("runtime_seconds", "Job run time", ("job",), registry=registry, buckets=(0.1, 1.0))
+    reconnects.labels("mqtt").inc()
+    reconnects.labels("mqtt").inc(2)
+    queue.inc()
+    for value in (0.05, 0.1, 0.5, 3.0):
+        runtime.labels("fast").observe(value)
+
+    assert registry.render().splitlines() == [
+        "# TYPE reconnects counter",
+        "# HELP reconnects Connection re-establishments",
+        'reconnects_total{component="mqtt"} 3.0',
+        "# TYPE queue_depth gauge",
+        "# HELP queue_depth Waiting batches",
+        "queue_depth 1.0",
+        "# TYPE runtime_seconds histogram",
+        "# HELP runtime_seconds Job run time",
+        'runtime_seconds_bucket{job="fast",le="0.1"} 2',
+        'runtime_seconds_bucket{job="fast",le="1.0"} 3',
+        'runtime_seconds_bucket{job="fast",le="+Inf"} 4',
+        'runtime_seconds_count{job="fast"} 4',
+        'runtime_seconds_sum{job="fast"} 3.65',
+        "# EOF",
+    ]
+    assert registry.render().endswith("# EOF\n")
+
+
+def test_label_values_and_help_are_escaped():
+    registry = MetricsRegistry()
+    counter = Counter("errors", 'Errors per "path"\nand C:\\dir', ("path",), registry=registry)
+    counter.labels('C:\\user\\"eta".json\n').inc()
+    lines = registry.render().splitlines()
+    assert lines[1] == '# HELP errors Errors per \\"path\\"\\nand C:\\\\dir'
+    assert lines[2] == 'errors_total{path="C:\\\\user\\\\\\"eta\\".json\\n"} 1.0'
+    assert lines[-1] == "# EOF"
+
+
+def test_gauge_function_and_label_checks():
+    registry = MetricsRegistry()
+    gauge = Gauge("lag_seconds", "Loop lag", registry=registry, func=lambda: 0.25)
+    assert gauge.get() == 0.25
+    gauge.set_function(lambda: 0.5)
+    assert "lag_seconds 0.5" in registry.render()
+    labelled = Counter("reads", "Reads", ("block", "device"), registry=registry)
+    with pytest.raises(ValueError):
+        labelled.labels("pv")
+    with pytest.raises(ValueError):
+        Counter("reads", "Duplicate", registry=registry)
+
+
+def test_metric_types_must_implement_children_and_samples():
+    class Incomplete(_Metric):
+        def _new_child(self):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "No samples()", registry=MetricsRegistry())
@@ -0,0 +1,117 @@
+## @file test_reload.py
+#  @brief ConfigWatcher: change detection, debounce and failing reloads.
+
+import asyncio
+import json
+import os
+from core import reload as reload_module
+from core.reload import ConfigWatcher
+
+
+def _write(path, config, mtime):
+    """@brief Write a config file with a fixed modification time [s]."""
+    path.write_text(json.dumps(config) if isinstance(config, dict) else config)
+    os.utime(path, ns=(mtime * 10**9, mtime * 10**9))
+
+
+def _loader(target):
+    """@brief Reload callback that replaces target['config'] like the clients do."""
+    def reload(path):
+        target["config"] = json.loads(path.read_text())
+        target["calls"] = target.get("calls", 0) + 1
+    return reload
+
+
+def test_one_change_gives_one_reload(tmp_path, monkeypatch):
+    monkeypatch.setattr(reload_module, "print", lambda *a, **k: None, raising=False)
+    path = tmp_path / "broker.json"
+    _write(path, {"broker": "a"}, 1000)
+    state = {}
+    watcher = ConfigWatcher()
+    watcher.watch(path, _loader(state))
+    assert watcher.check() == []
+
+    # An editor saves in two steps; only the finished file is loaded
+    _write(path, "", 1001)
+    assert watcher.check() == []
+    _write(path, {"broker": "b"}, 1002)
+    assert watcher.check() == []
+    assert watcher.check() == [path]
+    assert state == {"config": {"broker": "b"}, "calls": 1}
+    assert watcher.check() == [] and state["calls"] == 1
+
+    # Without debounce the change is applied on the first poll
+    watcher = ConfigWatcher(debounce=False)
+    watcher.watch(path, _loader(state))
+    _write(path, {"broker": "c"}, 1003)
+    assert watcher.check() == [path] and state["calls"] == 2
+    assert watcher.check() == [] and state["config"] == {"broker": "c"}
+
+
+def test_bad_config_keeps_the_old_one(tmp_path, monkeypatch):
+    log = []
+    monkeypatch.setattr(reload_module, "print", lambda *a, **k: log.append(a[0]), raising=False)
+    path = tmp_path / "wallbox.json"
+    other = tmp_path / "eta.json"
+    _write(path, {"max_current": 16}, 1000)
+    _write(other, {"interval": 30}, 1000)
+    state, other_state = {"config": {"max_current": 16}}, {}
+    watcher = ConfigWatcher(debounce=False)
+    watcher.watch(path, _loader(state))
+    watcher.watch(other, _loader(other_state))
+
+    _write(path, "{broken", 1001)
+    _write(other, {"interval": 60}, 1001)
+    assert watcher.check() == [path, other]
+    assert state["config"] == {"max_current": 16}
+    assert any("failed, keeping old configuration" in line for line in log)
+    # The other file's callback still ran
+    assert other_state["config"] == {"interval": 60}
+
+    # The broken file is not retried, but its next fix is picked up
+    assert watcher.check() == []
+    _write(path, {"max_current": 20}, 1002)
+    assert watcher.check() == [path] and state["config"] == {"max_current": 20}
+
+
+def test_raising_callback_does_not_stop_the_others(tmp_path, monkeypatch):
+    monkeypatch.setattr(reload_module, "print", lambda *a, **k: None, raising=False)
+    path = tmp_path / "inverter.json"
+    _write(path, {}, 1000)
+    calls = []
+
+    def fail(p):
+        calls.append("fail")
+        raise RuntimeError("boom")
+
+    watcher = ConfigWatcher(debounce=False)
+    watcher.watch(path, fail)
+    watcher.watch(path, lambda p: calls.append("ok"))
+    for mtime in (1001, 1002):
+        _write(path, {"n": mtime}, mtime)
+        assert watcher.check() == [path]
+    assert calls == ["fail", "ok", "fail", "ok"]
+
+
+def test_watcher_keeps_running_after_a_failed_reload(tmp_path, monkeypatch):
+    monkeypatch.setattr(reload_module, "print", lambda *a, **k: None, raising=False)
+    path = tmp_path / "derived.json"
+    _write(path, {}, 1000)
+    calls = []
+
+    def fail(p):
+        calls.append(p)
+        raise ValueError("bad")
+
+    async def run():
+        watcher = ConfigWatcher(interval=0.01)
+        watcher.watch(path, fail)
+        task = asyncio.create_task(watcher.run())
+        for mtime in (1001, 1002):
+            _write(path, {"n": mtime}, mtime)
+            await asyncio.sleep(0.1)
+        assert not task.done()
+        task.cancel()
+
+    asyncio.run(run())
+    assert calls == [path, path]
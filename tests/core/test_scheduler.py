@@ -0,0 +1,187 @@
+## @file test_scheduler.py
+#  @brief CycleScheduler tick alignment, overrun policies, job step attribution and
+#         the loop lag monitor.
+
+import asyncio
+import time
+from core import CycleScheduler, LoopLagMonitor
+from core import loop_monitor as loop_monitor_module
+from core.scheduler import OVERRUN_CATCH_UP, OVERRUN_DEGRADE, OVERRUN_SKIP, RECOVER_AFTER
+
+
+def _run(scheduler: CycleScheduler, monitor: LoopLagMonitor | None, seconds: float) -> None:
+    async def run():
+        if monitor is not None:
+            monitor.start()
+        scheduler.start()
+        await asyncio.sleep(seconds)
+        scheduler.shutdown()
+        if monitor is not None:
+            monitor.stop()
+
+    asyncio.run(run())
+
+
+def test_stall_is_blamed_on_the_blocking_job(monkeypatch):
+    monkeypatch.setattr(loop_monitor_module, "print", lambda *args, **kwargs: None, raising=False)
+
+    async def idle():
+        # Long-running job that is "current" most of the time but never blocks
+        await asyncio.sleep(0.9)
+
+    async def busy():
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)
+
+    async def blocking_child():
+        time.sleep(0.2)
+
+    async def parent():
+        await asyncio.gather(asyncio.sleep(0.01), blocking_child())
+
+    scheduler = CycleScheduler()
+    scheduler.add_job(idle, 0.1, id="idle")
+    scheduler.add_job(busy, 0.5, id="busy", offset=0.05)
+    scheduler.add_job(parent, 0.5, id="parent", offset=0.3)
+    monitor = LoopLagMonitor(scheduler, interval=0.02, threshold=0.1)
+    _run(scheduler, monitor, 1.6)
+
+    blamed = [job for _, lag, job in monitor.stalls]
+    assert "busy" in blamed and "parent" in blamed
+    assert "idle" not in blamed
+
+
+def test_longest_step_is_reset():
+    async def block():
+        time.sleep(0.05)
+
+    scheduler = CycleScheduler()
+    scheduler.add_job(block, 0.1, id="block")
+    _run(scheduler, None, 0.25)
+    wall, job = scheduler.take_longest_step()
+    assert job == "block" and wall >= 0.05
+    assert scheduler.take_longest_step() == (0.0, None)
+
+
+def test_task_factory_is_removed_on_shutdown():
+    async def noop():
+        pass
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        scheduler = CycleScheduler()
+        scheduler.add_job(noop, 0.1, id="noop")
+        scheduler.start()
+        installed = loop.get_task_factory()
+        scheduler.shutdown()
+        return installed, loop.get_task_factory()
+
+    installed, after = asyncio.run(run())
+    assert installed is not None and after is None
+
+
+def _spin(seconds: float) -> None:
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+def test_cpu_time_counts_only_the_job_steps():
+    async def light():
+        # Waits while 'spin' burns CPU on the same loop
+        await asyncio.sleep(0.3)
+
+    async def spin():
+        await asyncio.sleep(0.05)
+        _spin(0.15)
+
+    async def spawner():
+        async def child():
+            _spin(0.1)
+        await asyncio.gather(child())
+
+    scheduler = CycleScheduler()
+    scheduler.add_job(light, 0.5, id="light")
+    scheduler.add_job(spin, 0.5, id="spin", offset=0.1)
+    scheduler.add_job(spawner, 0.5, id="spawner", offset=0.2)
+    _run(scheduler, None, 1.6)
+
+    stats = scheduler.stats()
+    assert min(stats[job]["runs"] for job in ("light", "spin", "spawner")) >= 2
+    assert stats["light"]["cpu_max"] < 0.03
+    assert stats["spin"]["cpu_max"] >= 0.15
+    assert stats["spawner"]["cpu_max"] >= 0.1
+
+
+class _Clock:
+    """@brief Virtual clock for one job: sleeping and running only move the time."""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.now += delay
+        await asyncio.sleep(0)
+
+
+def _ticks(overrun: str, runtimes: list[float], start: float = 1000.3, interval: float = 2,
+           **kwargs) -> tuple[list[float], dict]:
+    """@brief Run one job for len(runtimes) runs; return the start times and the stats."""
+    clock = _Clock(start)
+    scheduler = CycleScheduler(clock.time, clock.sleep)
+    starts = []
+
+    async def job():
+        if len(starts) == len(runtimes):
+            raise asyncio.CancelledError
+        starts.append(clock.now)
+        clock.now += runtimes[len(starts) - 1]
+
+    scheduler.add_job(job, interval, id="job", overrun=overrun, **kwargs)
+
+    async def run():
+        try:
+            await scheduler._run_job("job")
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    return starts, scheduler.stats()["job"]
+
+
+def test_ticks_are_aligned_and_do_not_drift():
+    starts, stats = _ticks(OVERRUN_SKIP, [0.7] * 5)
+    assert starts == [1002, 1004, 1006, 1008, 1010]
+    assert stats["lateness_max"] == 0 and stats["overruns"] == 0
+    starts, _ = _ticks(OVERRUN_SKIP, [0.1] * 3, start=1000.3, interval=10, offset=0.5)
+    assert starts == [1000.5, 1010.5, 1020.5]
+
+
+def test_skip_drops_the_missed_ticks():
+    starts, stats = _ticks(OVERRUN_SKIP, [4.5, 0.1, 0.1])
+    # Ran 1002..1006.5: the ticks 1004 and 1006 are dropped
+    assert starts == [1002, 1008, 1010]
+    assert stats["overruns"] == 1 and stats["skipped"] == 2
+
+
+def test_catch_up_runs_the_missed_ticks():
+    starts, stats = _ticks(OVERRUN_CATCH_UP, [4.5, 0.1, 0.1, 0.1])
+    assert starts == [1002, 1006.5, 1006.6, 1008]
+    assert stats["skipped"] == 0
+    assert stats["lateness_max"] == 2.5
+    # Too many missed ticks: skipped instead
+    starts, stats = _ticks(OVERRUN_CATCH_UP, [9.5, 0.1], max_catch_up=3)
+    assert starts == [1002, 1012] and stats["skipped"] == 4
+
+
+def test_degrade_stretches_the_interval_until_runs_fit():
+    runtimes = [2.5] + [0.1] * (RECOVER_AFTER + 2)
+    starts, stats = _ticks(OVERRUN_DEGRADE, runtimes, degraded_interval=4)
+    assert starts[:3] == [1002, 1008, 1012]
+    # After RECOVER_AFTER in-time runs it is back on the 2 s grid
+    recovered = starts[RECOVER_AFTER + 1:]
+    assert recovered[1] - recovered[0] == 2
+    assert not stats["degraded"] and stats["overruns"] == 1
@@ -0,0 +1,63 @@
+## @file test_shm_ring.py
+#  @brief ShmRing: records read back as NumPy rows, overwritten records counted as lost.
+
+import math
+import os
+import numpy as np
+import pytest
+from core.shm_ring import ShmRing
+
+
+@pytest.fixture
+def ring():
+    ring = ShmRing.create(f"test_ring_{os.getpid()}", ["ppv", "soc"], capacity=4)
+    yield ring
+    ring.close()
+
+
+def test_read_since_returns_rows(ring):
+    ring.append(1.0, {"ppv": 100, "soc": 50})
+    ring.append(2.0, {"ppv": 200, "unknown": 1})
+    reader = ShmRing.attach(ring.shm.name)
+    try:
+        head, rows, lost = reader.read_since(0)
+        assert (head, lost) == (2, 0)
+        assert rows.dtype == np.float64 and rows.shape == (2, 3)
+        assert rows[0].tolist() == [1.0, 100.0, 50.0]
+        assert rows[1, :2].tolist() == [2.0, 200.0] and math.isnan(rows[1, 2])
+        # Rows are copies, not views into the segment
+        ring.append(3.0, {"ppv": 300})
+        ring.append(4.0, {"ppv": 400})
+        ring.append(5.0, {"ppv": 500})
+        assert rows[0, 0] == 1.0
+        head, rows, lost = reader.read_since(head)
+        assert head == 5 and lost == 0 and rows[:, 0].tolist() == [3.0, 4.0, 5.0]
+        assert reader.read_since(head)[1].shape == (0, 3)
+    finally:
+        reader.close()
+
+
+def test_overwritten_records_are_lost(ring):
+    for i in range(10):
+        ring.append(float(i), {"ppv": i})
+    head, rows, lost = ring.read_since(0)
+    assert head == 10 and lost == 6
+    assert rows[:, 0].tolist() == [6.0, 7.0, 8.0, 9.0]
+
+    # A slot rewritten while reading has the wrong stamp
+    ring.append(10.0, {"ppv": 10})
+    ring._stamps[10 % ring.capacity] = 0
+    head, rows, lost = ring.read_since(head)
+    assert head == 11 and lost == 1 and len(rows) == 0
+
+
+def test_foreign_segment_is_rejected():
+    from multiprocessing import shared_memory
+    shm = shared_memory.SharedMemory(name=f"test_foreign_{os.getpid()}", create=True, size=4096)
+    try:
+        shm.buf[:4] = b"ETAR"
+        with pytest.raises(ValueError):
+            ShmRing.attach(shm.name)
+    finally:
+        shm.close()
+        shm.unlink()
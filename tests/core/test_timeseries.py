@@ -0,0 +1,81 @@
+## @file test_timeseries.py
+#  @brief TimeSeriesBuffer: latest, window and resample queries, empty and wrapped buffers.
+
+import math
+import numpy as np
+import pytest
+from core.timeseries import TimeSeriesBuffer, TimeSeriesStore
+
+T0 = 1_750_000_000
+
+
+def _filled(capacity: int, samples: int) -> TimeSeriesBuffer:
+    """@brief Buffer with ppv = sample index, one sample every 2 s from T0."""
+    buf = TimeSeriesBuffer(capacity, period=2.0)
+    for i in range(samples):
+        buf.append(T0 + 2 * i, {"ppv": float(i)})
+    return buf
+
+
+def test_empty_buffer():
+    buf = TimeSeriesBuffer(10)
+    assert buf.latest() == {}
+    ts, values = buf.window("ppv", 60, now=T0)
+    assert ts.size == 0 and values.size == 0
+    assert math.isnan(buf.mean("ppv", 60, now=T0))
+    assert math.isnan(buf.max("ppv", 60, now=T0))
+    assert buf.integral("ppv", 60, now=T0) == 0.0
+    starts, means = buf.resample("ppv", 60, 20, now=T0)
+    assert list(starts) == [T0 - 60, T0 - 40, T0 - 20]
+    assert np.isnan(means).all()
+
+
+def test_latest_omits_missing_fields():
+    buf = TimeSeriesBuffer(4)
+    buf.append(T0, {"ppv": 1000, "pbattery1": -200})
+    buf.append(T0 + 2, {"ppv": 1100, "pbattery1": None, "mode": "auto", "flag": True})
+    assert buf.latest() == {"time": T0 + 2, "ppv": 1100.0}
+    assert set(buf.columns) == {"ppv", "pbattery1"}
+
+
+def test_window_across_the_wrap_around():
+    buf = _filled(capacity=10, samples=15)          # slots 0..4 were overwritten
+    now = T0 + 2 * 14
+    ts, values = buf.window("ppv", 14, now=now)
+    assert list(values) == [7, 8, 9, 10, 11, 12, 13, 14]
+    assert list(ts) == [T0 + 2 * i for i in range(7, 15)]
+    # Only the kept samples are returned, in time order
+    ts, values = buf.window("ppv", 3600, now=now)
+    assert list(values) == list(range(5, 15))
+    assert buf.min("ppv", 3600, now=now) == 5 and buf.max("ppv", 3600, now=now) == 14
+    assert buf.mean("ppv", 6, now=now) == pytest.approx(12.5)
+    assert buf.latest() == {"time": now, "ppv": 14.0}
+
+
+def test_resample_across_the_wrap_around():
+    buf = _filled(capacity=10, samples=15)
+    now = T0 + 2 * 14
+    starts, means = buf.resample("ppv", 20, 5, now=now)
+    assert list(starts) == [now - 20, now - 15, now - 10, now - 5]
+    # Bins [T0+8, T0+13), ..., [T0+23, T0+28]; the last bin includes 'now'
+    assert list(means) == [5.5, 7.5, 10.0, 13.0]
+    # Bins older than the kept samples are NaN
+    _, means = buf.resample("ppv", 60, 20, now=now)
+    assert np.isnan(means[:2]).all() and means[2] == 9.5
+
+
+def test_integral_skips_gaps():
+    buf = TimeSeriesBuffer(10, period=2.0)
+    for t in (0, 2, 4, 40, 42):
+        buf.append(T0 + t, {"ppv": 3600.0})
+    # 2 s + 2 s + 2 s at 3600 W; the 36 s gap is not integrated
+    assert buf.integral("ppv", 60, now=T0 + 42) == pytest.approx(6.0)
+
+
+def test_store_notifies_listeners():
+    store = TimeSeriesStore(hours=1, period=2.0)
+    seen = []
+    store.subscribe(lambda source, t, values: seen.append((source, t)))
+    store.append("eta", T0, {"boiler": 60.0}, period=30)
+    assert store.buffer("eta").capacity == 120 and store.buffer("eta").period == 30
+    assert seen == [("eta", T0)]
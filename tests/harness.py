@@ -0,0 +1,231 @@
+## @file harness.py
+#  @brief Simulated-clock harness driving main.py's jobs against local stand-ins.
+#
+#  Shared by all test suites (tests/ is on sys.path through tests/conftest.py).
+#
+#  - VirtualClock: clock/sleep pair for the CycleScheduler; time only moves
+#    when every job is waiting, so a simulated day takes seconds.
+#  - FakeModbus: answers register reads from a word map that is filled by
+#    encoding physical values with the real register maps.
+#  - FakeMQTT: MQTTManager stand-in with one simulated go-eCharger that
+#    reacts to amp/frc/psm commands, or with a fixed status.
+#  - SolarDay: synthetic PV production, house load and charger power.
+#  The Influx sink is captured by the test via influxConfig patches.
+
+import asyncio
+import heapq
+import itertools
+import json
+import math
+import struct
+
+
+class VirtualClock:
+    """@brief Discrete-event clock for asyncio code.
+
+    @param start  Start time (unix seconds).
+    """
+
+    def __init__(self, start: float):
+        self.now = start
+        self._waiters: list = []
+        self._seq = itertools.count()
+
+    def time(self) -> float:
+        return self.now
+
+    def time_ns(self) -> int:
+        return int(self.now * 1e9)
+
+    async def sleep(self, delay: float) -> None:
+        """@brief Suspend until the virtual time has advanced by delay."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (self.now + max(delay, 0), next(self._seq), future))
+        await future
+
+    async def run_until(self, end: float, sleepers: int, on_step=None) -> None:
+        """@brief Advance time from wake-up to wake-up until end.
+
+        @param end       Virtual end time.
+        @param sleepers  Number of tasks that wait on this clock when idle.
+        @param on_step   Optional callable(now) run before each wake-up.
+        """
+        while True:
+            for _ in range(10000):
+                if len(self._waiters) >= sleepers:
+                    break
+                await asyncio.sleep(0)
+            else:
+                raise RuntimeError("simulation stuck: a task is waiting on something else")
+            wake, _, future = heapq.heappop(self._waiters)
+            if wake > end:
+                heapq.heappush(self._waiters, (wake, next(self._seq), future))
+                return
+            self.now = wake
+            if on_step is not None:
+                on_step(self.now)
+            future.set_result(None)
+
+
+def encode(entry: dict, value: float) -> list[int]:
+    """@brief Raw register words for a physical value (inverse of modbus_client decoding)."""
+    if entry.get("floating"):
+        high, low = struct.unpack(">HH", struct.pack(">f", value))
+        return [high, low]
+    raw = round(value / entry.get("factor", 1))
+    if entry["count"] == 1:
+        return [raw & 0xFFFF]
+    raw &= 0xFFFFFFFF
+    return [raw >> 16, raw & 0xFFFF]
+
+
+class FakeResponse:
+    """@brief Minimal pymodbus read response."""
+
+    def __init__(self, registers: list[int]):
+        self.registers = registers
+
+    def isError(self) -> bool:
+        return False
+
+
+class FakeModbus:
+    """@brief AsyncModbusTcpClient stand-in serving values by register name.
+
+    Registers without a stored value answer with 0, or with
+    default(address) if a default is given.
+
+    @param *register_maps  Register config dicts of the modbus_client.
+    @param default         Optional callable(address) -> word for unset registers.
+    """
+    connected = True
+
+    def __init__(self, *register_maps: dict, default=None):
+        self.entries: dict[str, dict] = {}
+        for register in register_maps:
+            for name, entry in register.items():
+                if entry.get("block"):
+                    self.entries.update((n, e) for n, e in entry.items() if isinstance(e, dict))
+                else:
+                    self.entries[name] = entry
+        self.words: dict[int, int] = {}
+        self.default = default
+        self.reads = 0
+
+    def set_values(self, values: dict[str, float]) -> None:
+        """@brief Store physical values of named registers."""
+        for name, value in values.items():
+            entry = self.entries[name]
+            for i, word in enumerate(encode(entry, value)):
+                self.words[entry["address"] + i] = word
+
+    async def read_holding_registers(self, address: int, count: int = 1, device_id: int = 0):
+        self.reads += 1
+        if self.default is None:
+            return FakeResponse([self.words.get(address + i, 0) for i in range(count)])
+        return FakeResponse([self.words.get(a, self.default(a)) for a in range(address, address + count)])
+
+    def close(self) -> None:
+        pass
+
+
+class FakeMQTT:
+    """@brief MQTTManager stand-in with one simulated go-eCharger.
+
+    @param serial     Serial number of the simulated charger.
+    @param voltage    Grid voltage of the charger model.
+    @param status     Fixed (possibly incomplete) status returned instead of the simulated one.
+    @param connected  Broker connection flag seen by the clients.
+    """
+
+    def __init__(self, serial: str, voltage: int = 230, status: dict | None = None,
+                 connected: bool = True):
+        self.prefix = f"go-eCharger/{serial}/"
+        self.voltage = voltage
+        self.status = status
+        self.connected = connected
+        self.broker = "fake"
+        ## @brief Simulated charger state.
+        self.charger = {"amp": 6, "frc": 1, "psm": 0, "car": 1}
+        self.published: list = []
+        ## @brief (time, amp, frc, psm) of every command batch.
+        self.commands: list = []
+        self.clock = None
+
+    def subscribe_topics(self, topics, qos: int = 0) -> None:
+        pass
+
+    def charging_power(self) -> float:
+        """@brief Power drawn by the car with the current settings [W]."""
+        c = self.charger
+        if c["car"] not in (2, 3) or c["frc"] == 1:      # frc 1 = charging forbidden
+            return 0.0
+        phases = 1 if c["psm"] == 1 else 3
+        return c["amp"] * self.voltage * phases
+
+    def update_car(self) -> None:
+        """@brief car=2 (charging) while allowed, else 3 (waiting) if plugged in."""
+        if self.charger["car"] in (2, 3):
+            self.charger["car"] = 2 if self.charging_power() > 0 else 3
+
+    def messages_for(self, prefix: str) -> dict:
+        if prefix != self.prefix:
+            return {}
+        if self.status is not None:
+            return dict(self.status)
+        power = self.charging_power()
+        status = dict(self.charger)
+        status["nrg"] = [self.voltage] * 4 + [0] * 7 + [power] + [0] * 4
+        for key in ("alw", "cus", "dwo", "eto", "wh", "tma", "modelStatus"):
+            status.setdefault(key, 0)
+        return status
+
+    async def set_keys_async(self, data, qos: int = 0, retain: bool = False) -> None:
+        changed = False
+        for topic, value in data:
+            self.published.append((topic, value))
+            if topic.startswith(self.prefix) and topic.endswith("/set"):
+                key = topic[len(self.prefix):-len("/set")]
+                self.charger[key] = value
+                changed = True
+        if changed:
+            self.update_car()
+            now = self.clock.now if self.clock else 0
+            self.commands.append((now, self.charger["amp"], self.charger["frc"], self.charger["psm"]))
+
+    def set_keys(self, data, qos: int = 0, retain: bool = False) -> None:
+        asyncio.get_event_loop().create_task(self.set_keys_async(data))
+
+
+class SolarDay:
+    """@brief Synthetic clear-sky day: PV bell curve, base load and a midday load peak.
+
+    @param midnight  Unix time of the day's start.
+    @param peak      PV peak power [W].
+    """
+
+    def __init__(self, midnight: float, peak: float = 9000):
+        self.midnight = midnight
+        self.peak = peak
+
+    def pv(self, now: float) -> float:
+        hour = (now - self.midnight) / 3600
+        if not 6 <= hour <= 20:
+            return 0.0
+        return round(self.peak * math.sin(math.pi * (hour - 6) / 14))
+
+    def house(self, now: float) -> float:
+        hour = (now - self.midnight) / 3600
+        return 2400.0 if 12 <= hour < 12.5 else 400.0
+
+    def registers(self, now: float, charger_power: float) -> dict[str, float]:
+        """@brief Register values for the fake inverter at a point in time."""
+        pv = self.pv(now)
+        load = self.house(now) + charger_power
+        return {
+            "pv1_power": pv / 2, "pv2_power": pv / 2, "pv3_power": 0, "pv4_power": 0,
+            "pv1_voltage": 400 if pv else 0, "pv2_voltage": 400 if pv else 0,
+            "pbattery1": 0, "battery_soc": 50,
+            "active_power": max(-32000, min(32000, pv - load)),
+            "total_inverter_power": pv,
+        }
@@ -0,0 +1,164 @@
+## @file test_discovery.py
+#  @brief DeviceRegistry checks: probing, reported liveness, backoff, the run loop and
+#         endpoints surviving a config reload.
+
+import asyncio
+import json
+import pytest
+import ip_scan
+import main
+from core import AppContext
+from discovery import registry as registry_module
+from discovery.registry import DeviceRegistry
+from goE.wallbox_manager import WallboxManager
+from harness import FakeMQTT
+from inverter import readInverter
+
+CONFIG = {
+    "network": "192.168.188.0/24",
+    "check_interval": 10,
+    "rescan_interval": 900,
+    "roles": {
+        "inverter": {"ip": "192.168.188.200", "ports": [4196]},
+        "mqtt": {"ip": "192.168.188.97", "ports": [1883]},
+    },
+}
+
+
+@pytest.fixture
+def network(monkeypatch, tmp_path):
+    """@brief Fake network: which endpoints answer, plus a log of probes and sweeps."""
+    net = type("Net", (), {})()
+    net.up = {("192.168.188.200", 4196), ("192.168.188.97", 1883)}
+    net.probes, net.sweeps = [], []
+
+    async def port_open(ip, port, timeout=1.0):
+        net.probes.append((ip, port))
+        return (ip, port) in net.up
+
+    async def sweep(network):
+        net.sweeps.append(network)
+        return [ip for ip, _ in net.up]
+
+    monkeypatch.setattr(registry_module, "port_open", port_open)
+    monkeypatch.setattr(ip_scan, "sweep", sweep)
+    monkeypatch.setattr(ip_scan, "read_arp_table", lambda: {})
+    monkeypatch.setattr(registry_module, "print", lambda *args, **kwargs: None, raising=False)
+    path = tmp_path / "discovery.json"
+    path.write_text(json.dumps(CONFIG))
+    net.registry = DeviceRegistry(path, tmp_path / "devices.yaml")
+    return net
+
+
+def test_watched_role_is_not_probed(network):
+    registry = network.registry
+    registry.watch_liveness("inverter")
+    assert asyncio.run(registry.check()) == []
+    assert network.probes == [("192.168.188.97", 1883)]
+
+    registry.report("inverter", False)
+    network.probes.clear()
+    assert asyncio.run(registry.check()) == ["inverter"]
+    # mqtt answered the probe, the rediscovery only probes the missing role's port
+    assert network.probes[0] == ("192.168.188.97", 1883)
+    assert {port for _, port in network.probes[1:]} == {4196}
+
+
+def test_missing_role_backs_off(network):
+    registry = network.registry
+    network.up.discard(("192.168.188.97", 1883))
+    assert asyncio.run(registry.check()) == ["mqtt"]
+    assert registry._retry["mqtt"][1] == 10
+    # Not due yet: no second sweep
+    assert asyncio.run(registry.check()) == []
+    assert len(network.sweeps) == 1
+    delays = []
+    for _ in range(8):
+        registry._retry["mqtt"] = (0.0, registry._retry["mqtt"][1])
+        asyncio.run(registry.check())
+        delays.append(registry._retry["mqtt"][1])
+    assert delays == [20, 40, 80, 160, 320, 640, 900, 900]
+
+    network.up.add(("192.168.188.97", 1883))
+    registry._retry["mqtt"] = (0.0, 900)
+    asyncio.run(registry.check())
+    assert "mqtt" not in registry._retry
+
+
+def test_rescan_only_looks_for_unresolved_roles(network):
+    registry = network.registry
+    registry.watch_liveness("inverter")
+    # Startup: every endpoint is known and the gateway has not reported yet
+    asyncio.run(registry.rediscover())
+    assert network.sweeps == [] and network.probes == []
+
+    registry.report("inverter", True)
+    registry.apply_config({**CONFIG, "roles": {**CONFIG["roles"], "eta": {"ports": [8080]}}})
+    assert registry.unresolved() == ["eta"]
+    asyncio.run(registry.rediscover())
+    assert len(network.sweeps) == 1
+    assert {port for _, port in network.probes} == {8080}
+
+    registry.report("inverter", False)
+    assert registry.unresolved() == ["inverter", "eta"]
+
+
+def test_failed_startup_scan_is_retried(network, monkeypatch):
+    registry = network.registry
+    registry.check_interval = 0.01
+    calls = []
+
+    async def rediscover(roles=None):
+        calls.append(roles)
+        if len(calls) == 1:
+            raise OSError("network down")
+
+    monkeypatch.setattr(registry, "rediscover", rediscover)
+
+    async def run():
+        task = asyncio.create_task(registry.run())
+        while len(calls) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert calls == [None, None]
+
+
+def test_reload_keeps_discovered_endpoints(network, monkeypatch, tmp_path):
+    registry = network.registry
+    registry.apply_config({**CONFIG, "roles": {**CONFIG["roles"], "eta": {"ports": [8080]},
+                                               "goe_254959": {"ports": [80]}}})
+    broker = tmp_path / "broker.json"
+    broker.write_text(json.dumps({"broker_ip": "192.168.188.97", "goE": []}))
+    eta = tmp_path / "eta.json"
+    eta.write_text(json.dumps({"base_url": "http://ETA.fritz.box:8080/user", "varset": "v", "variables": []}))
+    wallbox = tmp_path / "wallbox.json"
+    wallbox.write_text(json.dumps({"chargers": [{"serial": "254959", "ip": "192.168.188.50"}]}))
+
+    ctx = AppContext(str(broker), str(wallbox), str(eta))
+    ctx._resources["discovery"] = registry
+    ctx._resources["wallboxes"] = WallboxManager(wallbox, FakeMQTT("254959"), ctx.history)
+    monkeypatch.setattr(main, "ctx", ctx)
+    monkeypatch.setattr(readInverter, "inverter", None)
+    monkeypatch.setattr(readInverter, "inverters", None)
+    monkeypatch.setattr(readInverter, "read_listeners", [])
+    main.bind_endpoints()
+
+    async def move_and_reload():
+        registry._set("mqtt", "192.168.188.98", 1883, None)
+        registry._set("eta", "192.168.188.30", 8080, None)
+        registry._set("goe_254959", "192.168.188.51", 80, None)
+        # Touching the files must not bring back the addresses written in them
+        main.reload_mqtt(broker)
+        main.reload_eta(eta)
+        main.reload_wallboxes(wallbox)
+        await ctx.eta.client.close()
+
+    asyncio.run(move_and_reload())
+    assert ctx.mqtt.broker == "192.168.188.98"
+    assert ctx.eta.client.base_url == "http://192.168.188.30:8080/user"
+    assert ctx.wallboxes.chargers[0]["ip"] == "192.168.188.51"
+    assert ctx.wallboxes.http["254959"].base_url.startswith("http://192.168.188.51")
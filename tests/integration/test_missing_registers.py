@@ -0,0 +1,126 @@
+## @file test_missing_registers.py
+#  @brief main.py's 2s and 60s jobs with register blocks that fail to read or slow sinks.
+
+import asyncio
+from types import SimpleNamespace
+import pytest
+import main
+from core import AppContext, EnergyIntegrator
+from core.energy import inverter_flows
+from goE import wallbox_manager
+from goE.wallbox_manager import WallboxManager
+from influx_bucket import influxConfig
+from inverter import readInverter
+from modbus import modbus_client
+from harness import FakeModbus, FakeMQTT, SolarDay
+
+SERIAL = "254959"
+NOON = 1_750_000_000 - 1_750_000_000 % 86400 + 12 * 3600
+
+## Start addresses that fail: fast 'block_energy' (pbattery1), battery_soc, slow 'block_meter'
+FAILING = {35180, 37007, 36001}
+
+
+class FailingModbus(FakeModbus):
+    """@brief FakeModbus that drops the connection on some start addresses."""
+
+    fail = False
+
+    async def read_holding_registers(self, address: int, count: int = 1, device_id: int = 0):
+        if self.fail and address in FAILING:
+            raise ConnectionError(f"no answer for {address}")
+        return await super().read_holding_registers(address, count, device_id)
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    """@brief main's ctx with fake Modbus/MQTT; returns (ctx, fake modbus, captured points, log)."""
+    points, log = [], []
+
+    async def capture(self, point):
+        points.append(point)
+
+    async def inline(func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    for module in (main, readInverter, wallbox_manager):
+        monkeypatch.setattr(module, "print", lambda *args, **kwargs: log.append(" ".join(map(str, args))),
+                            raising=False)
+    monkeypatch.setattr(influxConfig, "write_bucket_point_async", capture)
+    monkeypatch.setattr(wallbox_manager, "run_blocking", inline)
+
+    inverter = modbus_client("inverter", 0, 247, "inverter/register_config.json", "inverter/register_config_10s.json")
+    fake = FailingModbus(inverter.register, inverter.register2)
+    inverter.client = fake
+    monkeypatch.setattr(readInverter, "inverter", inverter)
+    monkeypatch.setattr(readInverter, "inverters", None)
+    monkeypatch.setattr(readInverter, "publisher", readInverter.make_publisher(readInverter.DEVICE))
+
+    day = SolarDay(NOON - 12 * 3600)
+    fake.set_values(day.registers(NOON, 0))
+    mqtt = FakeMQTT(SERIAL)
+    ctx = AppContext()
+    ctx._resources.update(mqtt=mqtt, inverter=inverter, energy=EnergyIntegrator(tmp_path / "energy.json"))
+    ctx._resources["wallboxes"] = WallboxManager("goE/wallbox_config.json", mqtt, ctx.history)
+    monkeypatch.setattr(main, "ctx", ctx)
+    return SimpleNamespace(ctx=ctx, modbus=fake, mqtt=mqtt, points=points, log=log)
+
+
+def test_failed_block_keeps_the_names():
+    inverter = modbus_client("inverter", 0, 247, "inverter/register_config.json", "inverter/register_config_10s.json")
+    fake = FailingModbus(inverter.register)
+    fake.fail = True
+    inverter.client = fake
+    data = asyncio.run(inverter.get_register1())
+    assert set(data) >= {"vbattery1", "ibattery1", "pbattery1", "battery_mode", "battery_soc"}
+    assert data["pbattery1"] is None and data["battery_soc"] is None
+    assert data["pv1_voltage"]["value"] is not None
+
+
+def test_jobs_skip_the_missing_registers(app):
+    asyncio.run(main.task_2s())
+    soc = app.ctx.wallboxes.battery_soc
+    published = {topic.rsplit("/", 1)[1]: value for topic, value in app.mqtt.published}
+    app.points.clear()
+    app.mqtt.published.clear()
+
+    app.modbus.fail = True
+    asyncio.run(main.task_2s())
+    asyncio.run(main.task_60s())
+
+    assert not any(line.startswith("Error") for line in app.log), app.log
+    inverter = [p for p in app.points if p._name == "inverter_data"]
+    fast = next(p for p in inverter if "ppv" in p._fields)
+    slow = next(p for p in inverter if "e_total" in p._fields)
+    assert "vpv1" in fast._fields and "ppv" in fast._fields
+    assert not {"pbattery1", "vbattery1", "battery_soc"} & fast._fields.keys()
+    assert "e_total" in slow._fields
+    assert not {"rssi", "meter_freq"} & slow._fields.keys()
+    assert any(p._name == "energy_flows" for p in app.points)
+    # Last known values are kept instead of publishing or controlling with None
+    assert app.ctx.wallboxes.battery_soc == soc
+    republished = {topic.rsplit("/", 1)[1]: value for topic, value in app.mqtt.published}
+    assert republished["battery_soc"] == published["battery_soc"]
+    assert republished["pbattery"] == published["pbattery"]
+
+
+def test_slow_sinks_do_not_time_out_the_read(app, monkeypatch):
+    reports = []
+    monkeypatch.setattr(readInverter, "read_listeners", [lambda device, ok: reports.append(ok)])
+
+    async def slow_write(self, point):
+        await asyncio.sleep(readInverter.READ_TIMEOUT + 0.1)
+        app.points.append(point)
+
+    monkeypatch.setattr(influxConfig, "write_bucket_point_async", slow_write)
+    results = asyncio.run(readInverter.read_inverters(app.mqtt))
+    assert readInverter.DEVICE in results and reports == [True]
+    assert any("ppv" in p._fields for p in app.points)
+    assert app.mqtt.published
+    assert not any("timed out" in line for line in app.log), app.log
+
+
+def test_flows_without_battery_and_grid():
+    flows = inverter_flows({"ppv": 1200, "house_consumption": 800, "pbattery1": None})
+    assert flows["pv"] == 1200 and flows["house"] == 800
+    assert flows["battery_charge"] is None and flows["grid_export"] is None
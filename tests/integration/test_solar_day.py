@@ -0,0 +1,135 @@
+## @file test_solar_day.py
+#  @brief Runs main.py's jobs through a simulated 24 h solar day.
+
+import asyncio
+import math
+import time
+from pathlib import Path
+from types import SimpleNamespace
+import pytest
+import main
+from core import AppContext, CycleScheduler, EnergyIntegrator
+from goE import wallbox_control, wallbox_manager
+from goE.wallbox_manager import WallboxManager
+from influx_bucket import influxConfig
+from inverter import readInverter
+from modbus import modbus_client
+from harness import FakeModbus, FakeMQTT, SolarDay, VirtualClock
+
+SRC = Path(__file__).resolve().parents[2] / "src"
+MIDNIGHT = 1_750_000_000 - 1_750_000_000 % 86400
+DAY = 86400
+SERIAL = "254959"
+
+
+def _quiet(*args, **kwargs):
+    pass
+
+
+@pytest.fixture(scope="module")
+def simulation(tmp_path_factory):
+    """@brief Run one simulated day; returns the captured points, commands and samples."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(SRC)
+        yield _simulate(monkeypatch, tmp_path_factory.mktemp("state"))
+
+
+def _simulate(monkeypatch, state_dir) -> SimpleNamespace:
+    clock = VirtualClock(MIDNIGHT)
+    monkeypatch.setattr(time, "time", clock.time)
+    monkeypatch.setattr(time, "time_ns", clock.time_ns)
+    for module in (main, wallbox_manager, wallbox_control, readInverter):
+        monkeypatch.setattr(module, "print", _quiet, raising=False)
+
+    points = []
+
+    async def capture(self, point):
+        points.append((self.INFLUX_BUCKET, point))
+
+    async def inline(func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    monkeypatch.setattr(influxConfig, "write_bucket_point_async", capture)
+    monkeypatch.setattr(influxConfig, "write_bucket_point", lambda self, point: points.append((self.INFLUX_BUCKET, point)))
+    monkeypatch.setattr(wallbox_manager, "run_blocking", inline)
+
+    inverter = modbus_client("inverter", 0, 247, "inverter/register_config.json", "inverter/register_config_10s.json")
+    fake_modbus = FakeModbus(inverter.register, inverter.register2)
+    inverter.client = fake_modbus
+    monkeypatch.setattr(readInverter, "inverter", inverter)
+
+    mqtt = FakeMQTT(SERIAL)
+    mqtt.clock = clock
+    mqtt.charger["car"] = 3                       # car plugged in all day
+    ctx = AppContext()
+    ctx._resources.update(
+        mqtt=mqtt,
+        inverter=inverter,
+        energy=EnergyIntegrator(state_dir / "energy.json"),
+        eta=SimpleNamespace(interval=60, poll=lambda: asyncio.sleep(0, {})),
+    )
+    ctx._resources["wallboxes"] = WallboxManager("goE/wallbox_config.json", mqtt, ctx.history)
+    scheduler = CycleScheduler(clock=clock.time, sleep=clock.sleep)
+    monkeypatch.setattr(main, "ctx", ctx)
+    monkeypatch.setattr(main, "scheduler", scheduler)
+
+    day = SolarDay(MIDNIGHT)
+    samples = []
+
+    def step(now: float) -> None:
+        fake_modbus.set_values(day.registers(now, mqtt.charging_power()))
+        samples.append((now, day.pv(now), mqtt.charging_power()))
+
+    async def run() -> None:
+        main.add_jobs()
+        scheduler.start()
+        await clock.run_until(MIDNIGHT + DAY, sleepers=len(scheduler.jobs), on_step=step)
+        scheduler.shutdown()
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    return SimpleNamespace(points=points, commands=mqtt.commands, samples=samples, ctx=ctx, day=day,
+                           scheduler=scheduler, elapsed=time.perf_counter() - started)
+
+
+def test_day_runs_faster_than_real_time(simulation):
+    assert simulation.elapsed < 60
+    stats = simulation.scheduler.stats()
+    assert stats["task_2s"]["runs"] == DAY // 2
+    assert stats["task_30s"]["runs"] == DAY // 30
+    assert stats["task_60s"]["runs"] == DAY // 60
+    assert all(s["errors"] == 0 for s in stats.values())
+
+
+def test_data_is_complete(simulation):
+    inverter = [p for bucket, p in simulation.points if bucket == "goodwe" and p._name == "inverter_data"]
+    fast = [p for p in inverter if "house_consumption" in p._fields]
+    slow = [p for p in inverter if "e_total" in p._fields]
+    energy = [p for bucket, p in simulation.points if p._name == "energy_flows"]
+    assert len(fast) == DAY // 2
+    assert len(slow) == len(energy) == DAY // 60
+    stamps = sorted(p._time for p in fast)
+    assert max(b - a for a, b in zip(stamps, stamps[1:])) == 2 * 10**9
+
+
+def test_charging_follows_the_sun(simulation):
+    max_current = simulation.ctx.wallboxes.chargers[0]["max_current"]
+    night = [c for t, pv, c in simulation.samples if pv == 0]
+    noon = [c for t, pv, c in simulation.samples if 13 * 3600 <= t - MIDNIGHT < 14 * 3600]
+    assert not any(night)
+    assert all(c > 0 for c in noon)
+    assert all(6 <= amp <= max_current for _, amp, frc, _ in simulation.commands if frc != 1)
+    # The car never draws more than the PV production of the last control cycle allows
+    assert all(c <= pv + 230 * 3 for t, pv, c in simulation.samples if c)
+
+
+def test_energy_balance(simulation):
+    energy = simulation.ctx.energy
+    # Clear-sky bell curve: peak * 14 h * 2 / pi
+    expected_pv = simulation.day.peak * 14 * 2 / math.pi
+    assert energy.total["pv"] == pytest.approx(expected_pv, rel=0.01)
+    assert energy.total["house"] == pytest.approx(
+        energy.total["pv"] + energy.total["grid_import"] - energy.total["grid_export"], rel=0.01)
+    assert energy.total["wallbox"] > 0
+    assert energy.gaps == 0
+    assert (energy.state_path.parent / "energy.json").exists()